@@ -21,6 +21,12 @@ if st.session_state.token is None:
     except Exception as e:
         st.error(f"Error de conexión: {str(e)}")
 
+def iter_sse_events(response):
+    """Recorre los eventos Server-Sent Events de una respuesta en streaming."""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith('data: '):
+            yield json.loads(line[len('data: '):])
+
 st.title('Sistema Experto Holístico')
 
 # Añadida key única al text_area
@@ -34,8 +40,9 @@ query = st.text_area(
 if st.button('Enviar Consulta', key="submit_button"):  # Añadida key aquí también
     if query and st.session_state.token:
         try:
-            response = requests.post(
-                'http://localhost:8000/api/v1/medical/query',
+            # Variante en streaming: los resultados se muestran según llegan
+            with requests.post(
+                'http://localhost:8000/api/v1/medical/query/stream',
                 headers={
                     'Content-Type': 'application/json',
                     'Authorization': f'Bearer {st.session_state.token}'
@@ -44,22 +51,43 @@ if st.button('Enviar Consulta', key="submit_button"):  # Añadida key aquí tamb
                     'query': query,
                     'user_id': 'test-user',
                     'context': {}
-                }
-            )
-            
-            if response.ok:
-                result = response.json()
-                st.subheader('Respuesta Integrada')
-                st.write(result['response'])
-                if 'sources' in result:
+                },
+                stream=True
+            ) as response:
+                if response.ok:
+                    st.subheader('Respuesta Integrada')
+                    answer_placeholder = st.empty()
+                    st.subheader('Fuentes Externas')
+                    sources_area = st.container()
                     st.subheader('Análisis por Dominios')
-                    for domain, info in result['sources'].items():
-                        # Añadida key única para cada expander
-                        with st.expander(f"Análisis {domain.capitalize()}"):
-                            st.write(info['response'])
-                            st.progress(info['confidence'])
-            else:
-                st.error(f'Error en la consulta: {response.text}')
+                    domains_area = st.container()
+
+                    answer = ""
+                    for event in iter_sse_events(response):
+                        kind = event.get('event')
+                        if kind == 'api_result':
+                            timing = event.get('timing', {})
+                            sources_area.write(
+                                f"{event['source'].upper()}: {timing.get('status')} "
+                                f"({timing.get('elapsed_ms')} ms)"
+                            )
+                        elif kind == 'agent_result':
+                            info = event.get('data', {})
+                            with domains_area.expander(f"Análisis {event['domain'].capitalize()}"):
+                                if 'response' in info:
+                                    st.write(info['response'])
+                                    st.progress(info.get('confidence', 0.0))
+                                else:
+                                    st.write(info)
+                        elif kind == 'token':
+                            answer += event['data']
+                            answer_placeholder.markdown(answer)
+                        elif kind == 'done':
+                            answer_placeholder.markdown(event['data']['response'])
+                        elif kind == 'error':
+                            st.error(f"Error en la consulta: {event.get('detail')}")
+                else:
+                    st.error(f'Error en la consulta: {response.text}')
         except Exception as e:
             st.error(f'Error: {str(e)}')
     elif not st.session_state.token:
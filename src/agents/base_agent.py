@@ -1,11 +1,18 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from src.utils.exceptions import AgentError
 from src.utils.logger import setup_logger
+from src.utils.config import settings
 
 logger = setup_logger()
 
 class BaseAgent(ABC):
+    # Dominios de los agentes cuya salida consume este agente
+    depends_on: Tuple[str, ...] = ()
+    # Máximo de ejecuciones simultáneas de este tipo de agente (None = valor global)
+    max_concurrency: Optional[int] = None
+
     def __init__(self):
         self.logger = logger
 
@@ -17,6 +24,30 @@ class BaseAgent(ABC):
     async def validate_response(self, response: Dict[str, Any]) -> bool:
         pass
     
+    async def fetch_external(
+        self,
+        context: Optional[Dict[str, Any]],
+        api: str,
+        query: str,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Ejecuta una llamada externa reutilizando el FetchContext de la consulta
+        (context["fetch_context"]) si existe, para no repetir peticiones que ya
+        hizo el orchestrator u otro agente.
+
+        La espera se limita al mismo plazo por fuente que aplica el
+        orchestrator: la tarea compartida sigue viva tras su timeout y, sin
+        este límite, una fuente lenta retendría al agente indefinidamente.
+        """
+        fetch_context = (context or {}).get("fetch_context")
+        timeout = settings.API_SOURCE_TIMEOUTS.get(api, settings.API_DEFAULT_TIMEOUT)
+        fetch = call() if fetch_context is None else fetch_context.fetch(api, query, call)
+        try:
+            return await asyncio.wait_for(fetch, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise AgentError(f"Plazo agotado ({timeout}s) consultando {api}")
+
     def handle_error(self, error: Exception) -> Dict[str, Any]:
         """Maneja y registra errores"""
         self.logger.error(f"Error en {self.__class__.__name__}: {str(error)}")
@@ -1,5 +1,5 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from src.external_apis.biological_api import UniProtAPI
 import logging
 
@@ -7,14 +7,17 @@ logger = logging.getLogger(__name__)
 
 
 class BiologicalAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, uniprot_api: Optional[UniProtAPI] = None):
         super().__init__()
-        self.uniprot_api = UniProtAPI()
+        self.uniprot_api = uniprot_api or UniProtAPI()
 
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         try:
             # Obtener información biológica de UniProt
-            protein_data = await self.uniprot_api.search_proteins(query)
+            protein_data = await self.fetch_external(
+                context, 'uniprot', query,
+                lambda: self.uniprot_api.search_proteins(query)
+            )
             
             # Construir la respuesta directamente
             response = {
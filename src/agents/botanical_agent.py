@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
 import logging
 from src.external_apis.trefle_api import TrefleAPI
@@ -6,14 +6,17 @@ from src.external_apis.trefle_api import TrefleAPI
 logger = logging.getLogger(__name__)
 
 class BotanicalAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, trefle_api: Optional[TrefleAPI] = None):
         super().__init__()
-        self.trefle_api = TrefleAPI()
+        self.trefle_api = trefle_api or TrefleAPI()
 
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         try:
             # Obtener datos botánicos de Trefle
-            plant_data = await self.trefle_api.search_plants(query)
+            plant_data = await self.fetch_external(
+                context, 'trefle', query,
+                lambda: self.trefle_api.search_plants(query)
+            )
             
             # Asegurar una respuesta válida
             response = {
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
 from src.external_apis.pubchem_api import PubChemAPI
 import logging
@@ -7,14 +7,17 @@ logger = logging.getLogger(__name__)
 
 
 class ChemicalAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, pubchem_api: Optional[PubChemAPI] = None):
         super().__init__()
-        self.pubchem_api = PubChemAPI()
+        self.pubchem_api = pubchem_api or PubChemAPI()
 
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         try:
             # Obtener información química de PubChem
-            chemical_data = await self.pubchem_api.search_compound(query)
+            chemical_data = await self.fetch_external(
+                context, 'pubchem', query,
+                lambda: self.pubchem_api.search_compound(query)
+            )
             
             # Construir la respuesta directamente
             response = {
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
 from src.external_apis.pubmed_api import PubMedAPI
 import logging
@@ -7,14 +7,17 @@ logger = logging.getLogger(__name__)
 
 
 class MedicalAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, pubmed_api: Optional[PubMedAPI] = None):
         super().__init__()
-        self.pubmed_api = PubMedAPI()
+        self.pubmed_api = pubmed_api or PubMedAPI()
 
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         try:
             # Obtener información de PubMed
-            scientific_articles = await self.pubmed_api.search_articles(query)
+            scientific_articles = await self.fetch_external(
+                context, 'pubmed', query,
+                lambda: self.pubmed_api.search_articles(query)
+            )
             
             # Incorporar la información en el contexto
             enriched_context = {
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
 import logging
 from src.external_apis.nasa_api import NASAAPI
@@ -7,14 +7,17 @@ logger = logging.getLogger(__name__)
 
 
 class PhysicalAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, nasa_api: Optional[NASAAPI] = None):
         super().__init__()
-        self.nasa_api = NASAAPI()
+        self.nasa_api = nasa_api or NASAAPI()
 
     async def process_query(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         try:
             # Obtener datos relevantes de la NASA
-            nasa_data = await self.nasa_api.get_relevant_data(query)
+            nasa_data = await self.fetch_external(
+                context, 'nasa', query,
+                lambda: self.nasa_api.get_relevant_data(query)
+            )
             
             # Asegurar una respuesta válida
             response = {
@@ -0,0 +1,76 @@
+from typing import Any, Dict, Optional
+import logging
+from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.semantic_cache import get_semantic_cache
+from src.external_apis.http_client import get_http_client, close_http_client
+from src.external_apis.cache import get_response_cache
+from src.external_apis.pubmed_api import PubMedAPI
+from src.external_apis.pubchem_api import PubChemAPI
+from src.external_apis.nasa_api import NASAAPI
+from src.external_apis.biological_api import UniProtAPI
+from src.external_apis.trefle_api import TrefleAPI
+from src.utils.translator import TranslationService
+from src.utils.audit_log import get_audit_log
+from src.utils.database import get_engine, dispose_engine, get_async_engine, dispose_async_engine
+
+logger = logging.getLogger(__name__)
+
+class AppContainer:
+    """
+    Objetos compartidos por todas las peticiones de un proceso: un cliente
+    HTTP, una caché de respuestas, un traductor, un cliente por API externa,
+    un orchestrator con su caché semántica, el registro de consultas y los
+    engines (síncrono y asíncrono) de base de datos.
+    """
+
+    def __init__(self):
+        self.http_client = get_http_client()
+        self.response_cache = get_response_cache()
+        self.translator = TranslationService()
+        self.external_apis: Dict[str, Any] = {
+            'pubmed': PubMedAPI(http_client=self.http_client, cache=self.response_cache, translator=self.translator),
+            'pubchem': PubChemAPI(http_client=self.http_client, cache=self.response_cache, translator=self.translator),
+            'nasa': NASAAPI(http_client=self.http_client, cache=self.response_cache, translator=self.translator),
+            'uniprot': UniProtAPI(http_client=self.http_client, cache=self.response_cache, translator=self.translator),
+            'trefle': TrefleAPI(http_client=self.http_client, cache=self.response_cache, translator=self.translator)
+        }
+        self.audit_log = get_audit_log()
+        self.semantic_cache = get_semantic_cache()
+        self.orchestrator = Orchestrator(
+            external_apis=self.external_apis,
+            translator=self.translator,
+            audit_log=self.audit_log,
+            semantic_cache=self.semantic_cache
+        )
+        self.db_engine = get_engine()
+        self.async_db_engine = get_async_engine()
+
+    async def aclose(self):
+        # Primero se escriben los registros pendientes, con la base de datos abierta
+        await self.audit_log.close()
+        await self.orchestrator.groq_client.aclose()
+        await close_http_client()
+        self.response_cache.close()
+        dispose_engine()
+        await dispose_async_engine()
+
+_container: Optional[AppContainer] = None
+
+def get_container() -> AppContainer:
+    """Devuelve el contenedor de la aplicación (uno por proceso)."""
+    global _container
+    if _container is None:
+        _container = AppContainer()
+        logger.info("Contenedor de la aplicación inicializado")
+    return _container
+
+def get_orchestrator() -> Orchestrator:
+    """Dependencia de FastAPI con el orchestrator compartido."""
+    return get_container().orchestrator
+
+async def close_container():
+    """Libera los recursos del contenedor al apagar la API."""
+    global _container
+    if _container is not None:
+        await _container.aclose()
+        _container = None
@@ -4,11 +4,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from .middleware.auth import AuthMiddleware
 from .routes import medical_routes, botanical_routes, chemical_routes, biological_routes, physical_routes
 import logging
+from typing import Optional
 from src.utils.logger import setup_logger
-from src.orchestrator.orchestrator import Orchestrator
+from src.api.dependencies import get_container, close_container
+from src.utils.database import init_db
 from dotenv import load_dotenv
 import os
-from .routes import auth_routes
+from .routes import auth_routes, history_routes
 
 load_dotenv()
 
@@ -24,17 +26,16 @@ logger = setup_logger()
 async def lifespan(app: FastAPI):
     # Código que se ejecuta al iniciar
     logger.info("API starting up...")
-    from src.utils.database import init_db
+    # Creación del esquema: una sola vez, no en cada petición
     init_db()
-    
-    # Inicializar Orchestrator como variable global
-    global orchestrator
-    orchestrator = Orchestrator()
+    # Un único orchestrator, conjunto de clientes y engine por proceso
+    get_container()
     
     yield
     
     # Código que se ejecuta al cerrar
     logger.info("API shutting down...")
+    await close_container()
 
 app = FastAPI(
     title="Medical Expert System API",
@@ -64,6 +65,42 @@ app.include_router(chemical_routes.router)
 app.include_router(biological_routes.router)
 app.include_router(physical_routes.router)
 app.include_router(auth_routes.router)
+app.include_router(history_routes.router)
+
+@app.get("/api/v1/health/cache")
+async def cache_stats():
+    """Contadores de la caché de respuestas de APIs externas."""
+    return get_container().response_cache.stats()
+
+@app.get("/api/v1/health/semantic-cache")
+async def semantic_cache_stats():
+    """Aciertos y entradas de la caché semántica de respuestas."""
+    return get_container().semantic_cache.stats()
+
+@app.get("/api/v1/health/result-cache")
+async def result_cache_stats():
+    """Aciertos de la caché exacta y cálculos en curso compartidos."""
+    orchestrator = get_container().orchestrator
+    return {
+        **orchestrator.result_cache.stats(),
+        "in_flight": orchestrator.single_flight.in_flight(),
+        "coalesced": orchestrator.single_flight.coalesced
+    }
+
+@app.delete("/api/v1/cache/semantic")
+async def invalidate_semantic_cache(domain: Optional[str] = None):
+    """
+    Invalida las respuestas cacheadas de un dominio (o todas). La caché
+    exacta, de TTL corto, se vacía entera.
+    """
+    container = get_container()
+    container.orchestrator.result_cache.clear()
+    return {"invalidated": container.semantic_cache.invalidate(domain)}
+
+@app.get("/api/v1/health/audit-log")
+async def audit_log_stats():
+    """Estado de la cola de escritura diferida de consultas."""
+    return get_container().audit_log.stats()
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -1,16 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import Dict, Any
 from src.orchestrator.orchestrator import Orchestrator
+from src.api.streaming import event_stream_response
+from src.api.dependencies import get_orchestrator
 import logging
-from src.utils.database import get_session, Query, QueryResult
 
 router = APIRouter(prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
 
-orchestrator = Orchestrator()
-
 
 class BiologicalQuery(BaseModel):
     query: str
@@ -21,45 +20,47 @@ class BiologicalResponse(BaseModel):
     response: str
     sources: list = []
     confidence: float
+    metadata: Dict[str, Any] = {}
 
 @router.post("/biological/query", response_model=BiologicalResponse)
-async def process_biological_query(query: BiologicalQuery):
-    session = get_session()
+async def process_biological_query(
+    query: BiologicalQuery,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
     try:
-        # Guardar la consulta
-        db_query = Query(
-            user_id=query.user_id,
-            query_text=query.query
-        )
-        session.add(db_query)
-        
         # Procesar con orchestrator
         result = await orchestrator.process_query(
             query=query.query,
             user_id=query.user_id,
-            context=query.context
-        )
-        
-        # Guardar resultado
-        db_result = QueryResult(
-            query=db_query,
-            response=result['response'],
-            confidence=result['confidence'],
+            context=query.context,
             domain='biological'
         )
-        session.add(db_result)
-        session.commit()
         
         return BiologicalResponse(
             response=result['response'],
             confidence=result['confidence'],
             sources=result.get('sources', {}),
-            api_sources=result.get('api_sources', {})
+            api_sources=result.get('api_sources', {}),
+            metadata=result.get('metadata', {})
         )
 
     except Exception as e:
-        session.rollback()
         logger.error(f"Error processing biological query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
\ No newline at end of file
+
+@router.post("/biological/query/stream")
+async def stream_biological_query(
+    query: BiologicalQuery,
+    request: Request,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
+    """Versión en streaming (SSE) de /biological/query."""
+    return event_stream_response(
+        orchestrator.stream_query(
+            query=query.query,
+            user_id=query.user_id,
+            context=query.context,
+            domain='biological'
+        ),
+        request
+    )
@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import Dict, Any
 from src.orchestrator.orchestrator import Orchestrator
+from src.api.streaming import event_stream_response
+from src.api.dependencies import get_orchestrator
 import logging
-from src.utils.database import get_session, Query, QueryResult
 
 router = APIRouter(prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
-orchestrator = Orchestrator()
-
 
 class BotanicalQuery(BaseModel):
     query: str
@@ -20,45 +19,47 @@ class BotanicalResponse(BaseModel):
     response: str
     sources: list = []
     confidence: float
+    metadata: Dict[str, Any] = {}
 
 @router.post("/botanical/query", response_model=BotanicalResponse)
-async def process_botanical_query(query: BotanicalQuery):
-    session = get_session()
+async def process_botanical_query(
+    query: BotanicalQuery,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
     try:
-        # Guardar la consulta
-        db_query = Query(
-            user_id=query.user_id,
-            query_text=query.query
-        )
-        session.add(db_query)
-        
         # Procesar con orchestrator
         result = await orchestrator.process_query(
             query=query.query,
             user_id=query.user_id,
-            context=query.context
-        )
-        
-        # Guardar resultado
-        db_result = QueryResult(
-            query=db_query,
-            response=result['response'],
-            confidence=result['confidence'],
+            context=query.context,
             domain='botanical'
         )
-        session.add(db_result)
-        session.commit()
         
         return BotanicalResponse(
             response=result['response'],
             confidence=result['confidence'],
             sources=result.get('sources', {}),
-            api_sources=result.get('api_sources', {})
+            api_sources=result.get('api_sources', {}),
+            metadata=result.get('metadata', {})
         )
 
     except Exception as e:
-        session.rollback()
         logger.error(f"Error processing botanical query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
\ No newline at end of file
+
+@router.post("/botanical/query/stream")
+async def stream_botanical_query(
+    query: BotanicalQuery,
+    request: Request,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
+    """Versión en streaming (SSE) de /botanical/query."""
+    return event_stream_response(
+        orchestrator.stream_query(
+            query=query.query,
+            user_id=query.user_id,
+            context=query.context,
+            domain='botanical'
+        ),
+        request
+    )
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import logging
+from src.utils.database import get_async_db
+from src.utils.history import get_user_history
+
+router = APIRouter(prefix="/api/v1")
+logger = logging.getLogger(__name__)
+
+@router.get("/history/{user_id}")
+async def get_history(
+    user_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    domain: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_db)
+):
+    """
+    Historial paginado de un usuario. Para la página siguiente se envía el
+    `next_cursor` de la respuesta anterior.
+    """
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit debe ser positivo")
+    try:
+        return await get_user_history(session, user_id, limit=limit, cursor=cursor, domain=domain)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import Dict, Any, List
 from src.orchestrator.orchestrator import Orchestrator
+from src.api.streaming import event_stream_response
+from src.api.dependencies import get_orchestrator
 import logging
-from src.utils.database import get_session, Query, QueryResult
 
 router = APIRouter(prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
-orchestrator = Orchestrator()
-
 class MedicalQuery(BaseModel):
     query: str
     user_id: str
@@ -22,36 +21,31 @@ class MedicalResponse(BaseModel):
     confidence: float
 
 @router.post("/medical/query")
-async def process_medical_query(query: MedicalQuery):
-    session = get_session()
-    try:
-        # Guardar la consulta
-        db_query = Query(
-            user_id=query.user_id,
-            query_text=query.query
-        )
-        session.add(db_query)
-        
-        # Procesar la consulta con el orchestrator
-        result = await orchestrator.process_query(
+async def process_medical_query(
+    query: MedicalQuery,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
+    # Procesar la consulta con el orchestrator (que también la registra)
+    return await orchestrator.process_query(
+        query=query.query,
+        user_id=query.user_id,
+        context=query.context,
+        domain='medical'
+    )
+
+@router.post("/medical/query/stream")
+async def stream_medical_query(
+    query: MedicalQuery,
+    request: Request,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
+    """Versión en streaming (SSE) de /medical/query."""
+    return event_stream_response(
+        orchestrator.stream_query(
             query=query.query,
             user_id=query.user_id,
-            context=query.context
-        )
-        
-        # Guardar el resultado
-        db_result = QueryResult(
-            query=db_query,
-            response=result['response'],
-            confidence=result['confidence'],
+            context=query.context,
             domain='medical'
-        )
-        session.add(db_result)
-        session.commit()
-        
-        return result
-    except Exception as e:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+        ),
+        request
+    )
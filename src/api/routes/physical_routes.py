@@ -1,15 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import Dict, Any
 from src.orchestrator.orchestrator import Orchestrator
+from src.api.streaming import event_stream_response
+from src.api.dependencies import get_orchestrator
 import logging
-from src.utils.database import get_session, Query, QueryResult
 
 router = APIRouter(prefix="/api/v1")
 logger = logging.getLogger(__name__)
 
-orchestrator = Orchestrator()
-
 class PhysicalQuery(BaseModel):
     query: str
     user_id: str
@@ -19,45 +18,47 @@ class PhysicalResponse(BaseModel):
     response: str
     sources: list = []
     confidence: float
+    metadata: Dict[str, Any] = {}
 
 @router.post("/physical/query", response_model=PhysicalResponse)
-async def process_physical_query(query: PhysicalQuery):
-    session = get_session()
+async def process_physical_query(
+    query: PhysicalQuery,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
     try:
-        # Guardar la consulta
-        db_query = Query(
-           user_id=query.user_id,
-           query_text=query.query
-        )
-        session.add(db_query)
-       
        # Procesar con orchestrator
         result = await orchestrator.process_query(
            query=query.query,
            user_id=query.user_id,
-           context=query.context
-        )
-       
-       # Guardar resultado
-        db_result = QueryResult(
-           query=db_query,
-           response=result['response'],
-           confidence=result['confidence'],
+           context=query.context,
            domain='physical'
         )
-        session.add(db_result)
-        session.commit()
        
         return PhysicalResponse(
            response=result['response'],
            confidence=result['confidence'],
            sources=result.get('sources', {}),
-           api_sources=result.get('api_sources', {})
+           api_sources=result.get('api_sources', {}),
+           metadata=result.get('metadata', {})
         )
 
     except Exception as e:
-        session.rollback()
         logger.error(f"Error processing physical query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
\ No newline at end of file
+
+@router.post("/physical/query/stream")
+async def stream_physical_query(
+    query: PhysicalQuery,
+    request: Request,
+    orchestrator: Orchestrator = Depends(get_orchestrator)
+):
+    """Versión en streaming (SSE) de /physical/query."""
+    return event_stream_response(
+        orchestrator.stream_query(
+            query=query.query,
+            user_id=query.user_id,
+            context=query.context,
+            domain='physical'
+        ),
+        request
+    )
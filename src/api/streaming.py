@@ -0,0 +1,39 @@
+from typing import Any, AsyncIterator, Dict
+import json
+import logging
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serializa un evento del orchestrator en formato Server-Sent Events."""
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"event: {event.get('event', 'message')}\ndata: {data}\n\n"
+
+def event_stream_response(
+    events: AsyncIterator[Dict[str, Any]],
+    request: Request
+) -> StreamingResponse:
+    """
+    Envía los eventos como text/event-stream. Si el cliente se desconecta se
+    cierra el generador, lo que cancela el procesamiento pendiente.
+    """
+    async def body():
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    logger.info("Cliente desconectado; se detiene el streaming")
+                    break
+                yield format_sse(event)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
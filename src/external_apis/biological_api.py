@@ -1,42 +1,49 @@
-import requests
-from typing import Dict
+from typing import Dict, Optional
 import logging
 from src.utils.translator import TranslationService
+from src.external_apis.http_client import AsyncHTTPClient, get_http_client
+from src.external_apis.cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 class UniProtAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        cache: Optional[ResponseCache] = None,
+        translator: Optional[TranslationService] = None
+    ):
         self.base_url = "https://rest.uniprot.org/uniprotkb/search"
-        self.translator = TranslationService()
+        self.translator = translator or TranslationService()
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
         
     async def search_proteins(self, query: str) -> Dict:
         try:
             # Traducir la consulta al inglés
-            english_query = self.translator.to_english(query)
+            english_query = await self.translator.to_english_async(query)
             logger.info(f"Consulta traducida: {english_query}")
 
-            response = requests.get(
-                self.base_url,
-                params={
-                    "query": english_query,
-                    "format": "json"
-                }
+            data = await self.cache.get_or_fetch(
+                'uniprot',
+                english_query.lower(),
+                lambda: self._fetch_proteins(english_query)
             )
             
-            if response.ok:
-                data = response.json()
-                # Traducir los resultados relevantes
-                translated_results = []
-                
-                for result in data.get('results', []):
-                    translated_result = {
-                        "nombre": self.translator.to_spanish(result.get('proteinDescription', {}).get('recommendedName', {}).get('fullName', {}).get('value', '')),
-                        "funcion": self.translator.to_spanish(result.get('comments', [{}])[0].get('text', [{}])[0].get('value', '')),
-                        "organismo": self.translator.to_spanish(result.get('organism', {}).get('scientificName', '')),
-                        "id": result.get('primaryAccession', '')
+            if data:
+                # Traducir los resultados relevantes en un único lote
+                results = data.get('results', [])
+                translated_results = await self.translator.to_spanish_async([
+                    {
+                        "nombre": result.get('proteinDescription', {}).get('recommendedName', {}).get('fullName', {}).get('value', ''),
+                        "funcion": result.get('comments', [{}])[0].get('text', [{}])[0].get('value', ''),
+                        "organismo": result.get('organism', {}).get('scientificName', '')
                     }
-                    translated_results.append(translated_result)
+                    for result in results
+                ])
+                
+                for translated_result, result in zip(translated_results, results):
+                    translated_result["id"] = result.get('primaryAccession', '')
                 
                 return translated_results
             
@@ -44,4 +51,17 @@ class UniProtAPI:
 
         except Exception as e:
             logger.error(f"Error accessing UniProt: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    async def _fetch_proteins(self, query: str) -> Optional[Dict]:
+        """Busca proteínas en UniProt; devuelve None si no hay resultados."""
+        response = await self.http.get(
+            self.base_url,
+            params={
+                "query": query,
+                "format": "json"
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data if data.get('results') else None
\ No newline at end of file
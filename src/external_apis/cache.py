@@ -0,0 +1,256 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from src.utils.config import settings
+from src.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Entrada de caché: (valor, momento de almacenamiento, es "no encontrado")
+CacheEntry = Tuple[Any, float, bool]
+
+class CachePolicy:
+    """
+    Política de caché de una API externa.
+
+    - ttl: segundos durante los que una respuesta se considera fresca.
+    - negative_ttl: segundos durante los que se recuerda un "no encontrado".
+    - stale_ttl: ventana tras `ttl` en la que se sirve la respuesta caducada
+      mientras se revalida en segundo plano (stale-while-revalidate).
+    - date_scoped: la clave incluye la fecha UTC, de modo que el valor
+      solo vale para el día en curso (APOD de la NASA).
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float,
+        stale_ttl: float = 0.0,
+        date_scoped: bool = False
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.date_scoped = date_scoped
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    'pubmed': CachePolicy(ttl=DAY, negative_ttl=HOUR, stale_ttl=7 * DAY),
+    'pubchem': CachePolicy(ttl=7 * DAY, negative_ttl=DAY, stale_ttl=30 * DAY),
+    'uniprot': CachePolicy(ttl=7 * DAY, negative_ttl=DAY, stale_ttl=30 * DAY),
+    'trefle': CachePolicy(ttl=7 * DAY, negative_ttl=DAY, stale_ttl=30 * DAY),
+    'nasa': CachePolicy(ttl=DAY, negative_ttl=HOUR, date_scoped=True)
+}
+
+class SQLiteCacheStore:
+    """
+    Nivel persistente de la caché: una tabla SQLite con los valores en JSON.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    key TEXT PRIMARY KEY,
+                    api TEXT NOT NULL,
+                    value TEXT,
+                    stored_at REAL NOT NULL,
+                    negative INTEGER NOT NULL
+                )
+                """
+            )
+            self._connection.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, stored_at, negative FROM api_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, stored_at, negative = row
+        return json.loads(value), stored_at, bool(negative)
+
+    def set(self, key: str, api: str, entry: CacheEntry):
+        value, stored_at, negative = entry
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO api_cache (key, api, value, stored_at, negative) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, api, json.dumps(value), stored_at, int(negative))
+            )
+            self._connection.commit()
+
+    def purge(self, api: str, older_than: float) -> int:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM api_cache WHERE api = ? AND stored_at < ?",
+                (api, older_than)
+            )
+            self._connection.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+class ResponseCache:
+    """
+    Caché de respuestas de las APIs científicas externas.
+
+    Tiene un nivel en memoria (LRU) y otro opcional en disco (SQLite). Las
+    funciones de obtención devuelven el JSON de la API o None cuando el
+    recurso no existe; ese "no encontrado" también se cachea, con su propio
+    TTL. Los errores transitorios se propagan y no se cachean.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        memory_entries: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.default_policy = CachePolicy(ttl=HOUR, negative_ttl=HOUR)
+        self.enabled = settings.API_CACHE_ENABLED if enabled is None else enabled
+        self.clock = clock
+        self._memory = LRUCache(memory_entries or settings.API_CACHE_MEMORY_ENTRIES)
+        self._disk = SQLiteCacheStore(disk_path) if disk_path and self.enabled else None
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, api: str, counter: str):
+        counters = self._counters.setdefault(api, {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0
+        })
+        counters[counter] += 1
+
+    def _cache_key(self, api: str, key: str, policy: CachePolicy) -> str:
+        if policy.date_scoped:
+            day = datetime.fromtimestamp(self.clock(), tz=timezone.utc).date().isoformat()
+            return f"{api}:{day}:{key}"
+        return f"{api}:{key}"
+
+    async def _load(self, cache_key: str) -> Optional[CacheEntry]:
+        entry = self._memory.get(cache_key)
+        if entry is None and self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, cache_key)
+            if entry is not None:
+                self._memory.set(cache_key, entry)
+        return entry
+
+    async def _store(self, api: str, cache_key: str, value: Any):
+        entry = (value, self.clock(), value is None)
+        self._memory.set(cache_key, entry)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.set, cache_key, api, entry)
+            except Exception as e:
+                logger.error(f"Error guardando en caché persistente {cache_key}: {str(e)}")
+
+    async def get_or_fetch(
+        self,
+        api: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Devuelve la respuesta cacheada para (api, key) o la obtiene con `fetch`.
+        """
+        if not self.enabled:
+            return await fetch()
+
+        policy = self.policies.get(api, self.default_policy)
+        cache_key = self._cache_key(api, key, policy)
+        entry = await self._load(cache_key)
+
+        if entry is not None:
+            value, stored_at, negative = entry
+            age = self.clock() - stored_at
+            if age <= (policy.negative_ttl if negative else policy.ttl):
+                self._count(api, "negative_hits" if negative else "hits")
+                return value
+            if not negative and age <= policy.ttl + policy.stale_ttl:
+                self._count(api, "stale_hits")
+                self._revalidate(api, cache_key, fetch)
+                return value
+
+        self._count(api, "misses")
+        value = await fetch()
+        await self._store(api, cache_key, value)
+        return value
+
+    def _revalidate(self, api: str, cache_key: str, fetch: Callable[[], Awaitable[Any]]):
+        """Refresca una entrada caducada en segundo plano (una sola vez a la vez)."""
+        if cache_key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                await self._store(api, cache_key, await fetch())
+            except Exception as e:
+                logger.warning(f"Error revalidando {cache_key}: {str(e)}")
+            finally:
+                self._refreshing.pop(cache_key, None)
+
+        self._refreshing[cache_key] = asyncio.ensure_future(refresh())
+
+    def purge_expired(self) -> int:
+        """Elimina del disco las entradas que ya no se pueden servir."""
+        if self._disk is None:
+            return 0
+        now = self.clock()
+        removed = 0
+        for api, policy in self.policies.items():
+            max_age = max(policy.ttl + policy.stale_ttl, policy.negative_ttl)
+            removed += self._disk.purge(api, now - max_age)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos y fallos por API."""
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "persistent": self._disk is not None,
+            "apis": {api: dict(counters) for api, counters in self._counters.items()}
+        }
+
+    def close(self):
+        for task in self._refreshing.values():
+            task.cancel()
+        if self._disk is not None:
+            self._disk.close()
+
+_shared_cache: Optional[ResponseCache] = None
+
+def get_response_cache() -> ResponseCache:
+    """Devuelve la caché de respuestas compartida del proceso."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ResponseCache(disk_path=settings.API_CACHE_PATH or None)
+        try:
+            _shared_cache.purge_expired()
+        except Exception as e:
+            logger.error(f"Error purgando la caché de APIs: {str(e)}")
+    return _shared_cache
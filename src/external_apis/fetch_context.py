@@ -0,0 +1,49 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import logging
+from src.utils.text import normalize_query
+
+logger = logging.getLogger(__name__)
+
+class FetchContext:
+    """
+    Memoiza las llamadas a APIs externas durante una única consulta.
+
+    La clave es (api, consulta normalizada): la primera llamada lanza la
+    petición y las siguientes, ya sea del orchestrator o de un agente,
+    reutilizan la misma tarea, esté en curso o terminada.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def fetch(
+        self,
+        api: str,
+        query: str,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        key = (api, normalize_query(query))
+        task = self._calls.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+        else:
+            self.hits += 1
+            logger.debug(f"Reutilizando llamada a {api} para '{key[1]}'")
+
+        # shield: si quien espera se cancela (p. ej. por su plazo), la
+        # petición sigue disponible para el resto de consumidores
+        return await asyncio.shield(task)
+
+    def cancel_pending(self):
+        """Cancela las peticiones que sigan en curso al terminar la consulta."""
+        for task in self._calls.values():
+            if not task.done():
+                task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
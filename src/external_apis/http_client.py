@@ -0,0 +1,146 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import importlib.util
+import logging
+import socket
+import httpx
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    """httpx solo negocia HTTP/2 si el paquete h2 está instalado."""
+    return importlib.util.find_spec("h2") is not None
+
+class AsyncHTTPClient:
+    """
+    Transporte HTTP asíncrono compartido por los clientes de src/external_apis.
+
+    Mantiene un httpx.AsyncClient por host remoto, cada uno con su propio pool
+    de conexiones keep-alive, de modo que las peticiones no bloquean el event
+    loop y las conexiones TLS se reutilizan entre consultas.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        self.timeout = httpx.Timeout(timeout or settings.HTTP_TIMEOUT)
+        wants_http2 = settings.HTTP2_ENABLED if http2 is None else http2
+        self.http2 = wants_http2 and _http2_available()
+        if wants_http2 and not self.http2:
+            logger.info("Paquete h2 no instalado; se usará HTTP/1.1")
+        self.transport = transport
+        self._clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient, AsyncIterator]] = {}
+
+    async def _client_for(self, url: str) -> httpx.AsyncClient:
+        """
+        Devuelve el cliente del host de la URL, creándolo si es necesario.
+        Los pools están ligados al event loop en el que se crearon: si el
+        loop cambia, el cliente anterior se cierra (ver _discard).
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        loop = asyncio.get_running_loop()
+
+        entry = self._clients.get(host)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            if entry is not None:
+                self._discard(entry[0], entry[1])
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                follow_redirects=True,
+                transport=self.transport
+            )
+            closer = _close_with_loop(client)
+            await closer.__anext__()
+            self._clients[host] = (loop, client, closer)
+            return client
+        return entry[1]
+
+    def _discard(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """
+        Cierra el cliente creado en otro event loop. Si ese loop sigue en
+        marcha (en otro hilo) el cierre se programa en él. Si terminó sin
+        cerrar sus generadores asíncronos (loop.close() sin asyncio.run) ya
+        no se puede esperar a aclose, y se cierran los sockets del pool.
+        """
+        if client.is_closed:
+            return
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            _close_sockets(client)
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> httpx.Response:
+        client = await self._client_for(url)
+        return await client.get(url, params=params, **kwargs)
+
+    async def aclose(self):
+        """Cierra todos los pools de conexiones."""
+        loop = asyncio.get_running_loop()
+        for client_loop, client, closer in self._clients.values():
+            if client_loop is loop:
+                await closer.aclose()
+            else:
+                self._discard(client_loop, client)
+        self._clients.clear()
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """
+    Generador asíncrono que queda suspendido mientras viva el loop del
+    cliente. Al terminar, asyncio.run cierra los generadores pendientes
+    (shutdown_asyncgens) y con él el cliente, aún dentro de su loop.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+def _close_sockets(client: httpx.AsyncClient):
+    """Cierra los sockets de las conexiones del pool sin pasar por su event loop."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    for connection in getattr(pool, "connections", []):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        sock = stream.get_extra_info("socket") if stream is not None else None
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        # asyncio expone un TransportSocket que no permite close()
+        getattr(sock, "_sock", sock).close()
+
+_shared_client: Optional[AsyncHTTPClient] = None
+
+def get_http_client() -> AsyncHTTPClient:
+    """Devuelve el transporte compartido del proceso."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncHTTPClient()
+    return _shared_client
+
+async def close_http_client():
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
@@ -1,23 +1,31 @@
-import requests
 from typing import Dict, Optional
 import logging
 import os
 from datetime import datetime
 from src.utils.translator import TranslationService
+from src.external_apis.http_client import AsyncHTTPClient, get_http_client
+from src.external_apis.cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 class NASAAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        cache: Optional[ResponseCache] = None,
+        translator: Optional[TranslationService] = None
+    ):
         self.api_key = os.getenv("NASA_API_KEY")
         self.base_url = "https://api.nasa.gov"
-        self.translator = TranslationService()
+        self.translator = translator or TranslationService()
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
 
     async def get_relevant_data(self, query: str) -> Dict:
         """Obtiene datos relevantes basados en la consulta"""
         try:
             # Traducir la consulta al inglés
-            english_query = self.translator.to_english(query)
+            english_query = await self.translator.to_english_async(query)
             logger.info(f"Consulta traducida: {english_query}")
 
             data = {}
@@ -25,18 +33,18 @@ class NASAAPI:
             # APOD para información general
             apod_data = await self.get_astronomy_picture()
             if apod_data:
-                data['apod'] = {
-                    'titulo': self.translator.to_spanish(apod_data.get('title', '')),
-                    'explicacion': self.translator.to_spanish(apod_data.get('explanation', '')),
-                    'fecha': apod_data.get('date', '')
-                }
+                data['apod'] = await self.translator.to_spanish_async({
+                    'titulo': apod_data.get('title', ''),
+                    'explicacion': apod_data.get('explanation', '')
+                })
+                data['apod']['fecha'] = apod_data.get('date', '')
 
             # Datos de la Tierra si son relevantes
             if any(term in english_query.lower() for term in ['earth', 'radiation', 'magnetic field', 'atmosphere']):
                 earth_data = await self.get_earth_data()
                 if earth_data:
                     data['earth'] = {
-                        'datos': self.translator.to_spanish(earth_data)
+                        'datos': await self.translator.to_spanish_async(earth_data)
                     }
 
             return data if data else {"mensaje": "No se encontraron datos relevantes"}
@@ -47,22 +55,33 @@ class NASAAPI:
 
     async def get_astronomy_picture(self) -> Optional[Dict]:
         try:
-            response = requests.get(
-                f"{self.base_url}/planetary/apod",
-                params={"api_key": self.api_key}
+            # APOD cambia una vez al día: la política de 'nasa' usa claves por fecha
+            return await self.cache.get_or_fetch(
+                'nasa',
+                "apod",
+                lambda: self._fetch_json("/planetary/apod")
             )
-            return response.json() if response.ok else None
         except Exception as e:
             logger.error(f"Error getting APOD: {str(e)}")
             return None
 
     async def get_earth_data(self) -> Optional[Dict]:
         try:
-            response = requests.get(
-                f"{self.base_url}/EPIC/api/natural",
-                params={"api_key": self.api_key}
+            return await self.cache.get_or_fetch(
+                'nasa',
+                "epic:natural",
+                lambda: self._fetch_json("/EPIC/api/natural")
             )
-            return response.json() if response.ok else None
         except Exception as e:
             logger.error(f"Error getting Earth data: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    async def _fetch_json(self, path: str) -> Optional[Dict]:
+        response = await self.http.get(
+            f"{self.base_url}{path}",
+            params={"api_key": self.api_key}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json() or None
\ No newline at end of file
@@ -1,37 +1,54 @@
-import requests
-from typing import Dict
+from typing import Dict, Optional
 import logging
 from src.utils.translator import TranslationService
+from src.external_apis.http_client import AsyncHTTPClient, get_http_client
+from src.external_apis.cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 class PubChemAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        cache: Optional[ResponseCache] = None,
+        translator: Optional[TranslationService] = None
+    ):
         self.base_url = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
-        self.translator = TranslationService()
+        self.translator = translator or TranslationService()
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
         
     async def search_compound(self, query: str) -> Dict:
         try:
             # Traducir la consulta al inglés
-            english_query = self.translator.to_english(query)
+            english_query = await self.translator.to_english_async(query)
             logger.info(f"Consulta traducida: {english_query}")
 
             # Búsqueda por nombre
-            response = requests.get(
-                f"{self.base_url}/compound/name/{english_query}/JSON"
+            data = await self.cache.get_or_fetch(
+                'pubchem',
+                english_query.lower(),
+                lambda: self._fetch_compound(english_query)
             )
             
-            if response.ok:
-                data = response.json()
-                # Traducir la información relevante al español
-                translated_data = {
-                    "nombre": self.translator.to_spanish(data.get("PC_Compounds", [])[0].get("PC_Compounds_id_name", "")),
-                    "descripcion": self.translator.to_spanish(data.get("PC_Compounds", [])[0].get("PC_Compounds_props", {}).get("description", "")),
-                    "id": data.get("PC_Compounds", [])[0].get("id", {}).get("id", {}).get("cid", "")
-                }
+            if data:
+                # Traducir la información relevante al español en un único lote
+                translated_data = await self.translator.to_spanish_async({
+                    "nombre": data.get("PC_Compounds", [])[0].get("PC_Compounds_id_name", ""),
+                    "descripcion": data.get("PC_Compounds", [])[0].get("PC_Compounds_props", {}).get("description", "")
+                })
+                translated_data["id"] = data.get("PC_Compounds", [])[0].get("id", {}).get("id", {}).get("cid", "")
                 return translated_data
-            return {"error": "No se encontraron datos", "details": response.text}
+            return {"error": "No se encontraron datos"}
 
         except Exception as e:
             logger.error(f"Error accessing PubChem: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    async def _fetch_compound(self, name: str) -> Optional[Dict]:
+        """Busca un compuesto por nombre; devuelve None si PubChem no lo conoce."""
+        response = await self.http.get(f"{self.base_url}/compound/name/{name}/JSON")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
\ No newline at end of file
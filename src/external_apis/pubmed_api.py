@@ -1,56 +1,88 @@
-import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 from src.utils.translator import TranslationService
+from src.external_apis.http_client import AsyncHTTPClient, get_http_client
+from src.external_apis.cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 class PubMedAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        cache: Optional[ResponseCache] = None,
+        translator: Optional[TranslationService] = None
+    ):
         self.base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-        self.translator = TranslationService()
+        self.translator = translator or TranslationService()
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
         
     async def search_articles(self, query: str, max_results: int = 5) -> List[Dict]:
         try:
             # Traducir la consulta al inglés
-            english_query = self.translator.to_english(query)
+            english_query = await self.translator.to_english_async(query)
             logger.info(f"Consulta traducida: {english_query}")
 
             # Búsqueda en PubMed
-            search_url = f"{self.base_url}esearch.fcgi"
-            params = {
-                "db": "pubmed",
-                "term": english_query,
-                "retmax": max_results,
-                "retmode": "json"
-            }
-            response = requests.get(search_url, params=params)
-            ids = response.json()["esearchresult"]["idlist"]
+            ids = await self.cache.get_or_fetch(
+                'pubmed',
+                f"esearch:{max_results}:{english_query}",
+                lambda: self._search_ids(english_query, max_results)
+            )
+            if not ids:
+                return []
             
             # Obtener detalles de los artículos
-            details_url = f"{self.base_url}esummary.fcgi"
-            params = {
-                "db": "pubmed",
-                "id": ",".join(ids),
-                "retmode": "json"
-            }
-            details = requests.get(details_url, params=params)
+            summaries = await self.cache.get_or_fetch(
+                'pubmed',
+                f"esummary:{','.join(ids)}",
+                lambda: self._fetch_summaries(ids)
+            )
             
-            # Traducir los resultados al español
-            results = [details.json()["result"][id] for id in ids]
-            translated_results = []
-            
-            for result in results:
-                translated_result = {
-                    "title": self.translator.to_spanish(result.get("title", "")),
-                    "abstract": self.translator.to_spanish(result.get("abstract", "")),
-                    "id": result.get("uid", ""),
-                    "url": f"https://pubmed.ncbi.nlm.nih.gov/{result.get('uid', '')}"
+            # Traducir los resultados al español en un único lote
+            results = [summaries[id] for id in ids if id in summaries]
+            translated_results = await self.translator.to_spanish_async([
+                {
+                    "title": result.get("title", ""),
+                    "abstract": result.get("abstract", "")
                 }
-                translated_results.append(translated_result)
+                for result in results
+            ])
+            
+            for translated_result, result in zip(translated_results, results):
+                translated_result["id"] = result.get("uid", "")
+                translated_result["url"] = f"https://pubmed.ncbi.nlm.nih.gov/{result.get('uid', '')}"
             
             return translated_results
 
         except Exception as e:
             logger.error(f"Error accessing PubMed: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    async def _search_ids(self, term: str, max_results: int) -> Optional[List[str]]:
+        """Ejecuta esearch; devuelve None si no hay artículos."""
+        response = await self.http.get(
+            f"{self.base_url}esearch.fcgi",
+            params={
+                "db": "pubmed",
+                "term": term,
+                "retmax": max_results,
+                "retmode": "json"
+            }
+        )
+        response.raise_for_status()
+        return response.json()["esearchresult"]["idlist"] or None
+
+    async def _fetch_summaries(self, ids: List[str]) -> Dict:
+        """Ejecuta esummary para los IDs dados."""
+        response = await self.http.get(
+            f"{self.base_url}esummary.fcgi",
+            params={
+                "db": "pubmed",
+                "id": ",".join(ids),
+                "retmode": "json"
+            }
+        )
+        response.raise_for_status()
+        return response.json()["result"]
\ No newline at end of file
@@ -1,45 +1,58 @@
-import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 import logging
 from src.utils.translator import TranslationService
+from src.external_apis.http_client import AsyncHTTPClient, get_http_client
+from src.external_apis.cache import ResponseCache, get_response_cache
 
 logger = logging.getLogger(__name__)
 
 class TrefleAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[AsyncHTTPClient] = None,
+        cache: Optional[ResponseCache] = None,
+        translator: Optional[TranslationService] = None
+    ):
         self.api_key = os.getenv("TREFLE_API_KEY")
         self.base_url = "https://trefle.io/api/v1"
-        self.translator = TranslationService()
+        self.translator = translator or TranslationService()
+        self.http = http_client or get_http_client()
+        self.cache = cache or get_response_cache()
         
     async def search_plants(self, query: str) -> List[Dict]:
         try:
             # Traducir la consulta al inglés
-            english_query = self.translator.to_english(query)
+            english_query = await self.translator.to_english_async(query)
             logger.info(f"Consulta traducida: {english_query}")
 
-            response = requests.get(
-                f"{self.base_url}/plants/search",
-                params={
-                    "token": self.api_key,
-                    "q": english_query
-                }
+            data = await self.cache.get_or_fetch(
+                'trefle',
+                english_query.lower(),
+                lambda: self._fetch_plants(english_query)
             )
             
-            if response.ok:
-                data = response.json()
-                # Traducir los resultados relevantes
-                translated_results = []
+            if data:
+                # Traducir los resultados relevantes en un único lote
+                plants = data.get('data', [])
+                translated_fields = await self.translator.to_spanish_async([
+                    {
+                        "nombre_comun": plant.get('common_name', ''),
+                        "familia": plant.get('family', ''),
+                        "usos": plant.get('uses', [])
+                    }
+                    for plant in plants
+                ])
                 
-                for plant in data.get('data', []):
-                    translated_plant = {
-                        "nombre_comun": self.translator.to_spanish(plant.get('common_name', '')),
+                translated_results = []
+                for fields, plant in zip(translated_fields, plants):
+                    translated_results.append({
+                        "nombre_comun": fields["nombre_comun"],
                         "nombre_cientifico": plant.get('scientific_name', ''),
-                        "familia": self.translator.to_spanish(plant.get('family', '')),
-                        "usos": self.translator.to_spanish(plant.get('uses', [])),
+                        "familia": fields["familia"],
+                        "usos": fields["usos"],
                         "id": plant.get('id', '')
-                    }
-                    translated_results.append(translated_plant)
+                    })
                 
                 return translated_results
             
@@ -47,4 +60,17 @@ class TrefleAPI:
 
         except Exception as e:
             logger.error(f"Error accessing Trefle: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    async def _fetch_plants(self, query: str) -> Optional[Dict]:
+        """Busca plantas en Trefle; devuelve None si no hay resultados."""
+        response = await self.http.get(
+            f"{self.base_url}/plants/search",
+            params={
+                "token": self.api_key,
+                "q": query
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data if data.get('data') else None
\ No newline at end of file
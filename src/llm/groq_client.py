@@ -1,7 +1,7 @@
-from groq import Groq
+from groq import AsyncGroq
 import os
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, List, AsyncIterator
 from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
@@ -12,7 +12,7 @@ class GroqClient:
         if not self.api_key:
             raise ValueError("GROQ_API_KEY no encontrada en variables de entorno")
         
-        self.client = Groq(api_key=self.api_key)
+        self.client = AsyncGroq(api_key=self.api_key)
         self.model = "llama-3.3-70b-versatile"  # El modelo específico que nos proporcionan
         
     async def generate_response(
@@ -23,15 +23,8 @@ class GroqClient:
         context: Optional[Dict] = None
     ) -> str:
         try:
-            messages = [{"role": "user", "content": prompt}]
-            if context:
-                messages.insert(0, {
-                    "role": "system",
-                    "content": str(context)
-                })
-
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
+            chat_completion = await self.client.chat.completions.create(
+                messages=self._build_messages(prompt, context),
                 model=self.model,
                 temperature=temperature,
                 max_tokens=max_tokens
@@ -43,6 +36,55 @@ class GroqClient:
             logger.error(f"Error generando respuesta con Groq: {str(e)}")
             raise
 
+    async def stream_response(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        context: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Genera la respuesta token a token.
+
+        Si el consumidor deja de iterar o su tarea se cancela (por ejemplo,
+        porque el cliente HTTP se ha desconectado), se cierra el stream con
+        Groq y la generación se interrumpe.
+        """
+        try:
+            stream = await self.client.chat.completions.create(
+                messages=self._build_messages(prompt, context),
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+        except Exception as e:
+            logger.error(f"Error iniciando stream con Groq: {str(e)}")
+            raise
+
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+        finally:
+            await stream.close()
+
+    def _build_messages(self, prompt: str, context: Optional[Dict] = None) -> List[Dict]:
+        messages = [{"role": "user", "content": prompt}]
+        if context:
+            messages.insert(0, {
+                "role": "system",
+                "content": str(context)
+            })
+        return messages
+
+    async def aclose(self):
+        """Cierra las conexiones del cliente de Groq."""
+        await self.client.close()
+
     async def get_embedding(self, text: str) -> list:
         """
         Obtiene embeddings para el texto dado.
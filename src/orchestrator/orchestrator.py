@@ -1,13 +1,19 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator
+import asyncio
+import copy
 import logging
+import time
 from src.agents.medical_agent import MedicalAgent
 from src.agents.botanical_agent import BotanicalAgent
 from src.agents.chemical_agent import ChemicalAgent
 from src.agents.physical_agent import PhysicalAgent
 from src.agents.biological_agent import BiologicalAgent
+from src.orchestrator.scheduler import AgentScheduler
+from src.orchestrator.semantic_cache import SemanticCache, get_semantic_cache
+from src.orchestrator.result_cache import ResultCache, SingleFlight, result_key
 from src.validation.validator import Validator
 from src.llm.groq_client import GroqClient
-from src.utils.database import get_session, Query, QueryResult
+from src.utils.audit_log import AuditLogWriter, get_audit_log
 from src.llm.prompt_templates.medical_prompts import MedicalPrompts
 from src.llm.prompt_templates.botanical_prompts import BotanicalPrompts
 from src.llm.prompt_templates.chemical_prompts import ChemicalPrompts
@@ -18,33 +24,50 @@ from src.external_apis.pubchem_api import PubChemAPI
 from src.external_apis.nasa_api import NASAAPI
 from src.external_apis.biological_api import UniProtAPI
 from src.external_apis.trefle_api import TrefleAPI
+from src.external_apis.fetch_context import FetchContext
 from src.utils.translator import TranslationService
+from src.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
+STREAMING_LANGUAGE_INSTRUCTION = "\n\nWrite the whole answer in Spanish."
+
 class Orchestrator:
-    def __init__(self):
-        self.groq_client = GroqClient()
+    def __init__(
+        self,
+        external_apis: Optional[Dict[str, Any]] = None,
+        translator: Optional[TranslationService] = None,
+        groq_client: Optional[GroqClient] = None,
+        audit_log: Optional[AuditLogWriter] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        result_cache: Optional[ResultCache] = None
+    ):
+        self.groq_client = groq_client or GroqClient()
+        self.audit_log = audit_log or get_audit_log()
+        self.semantic_cache = semantic_cache or get_semantic_cache()
+        self.result_cache = result_cache or ResultCache()
+        self.single_flight = SingleFlight()
         self.validator = Validator()
-        self.translator = TranslationService()
-
-        # Inicializar APIs externas
-        self.external_apis = {
-            'pubmed': PubMedAPI(),
-            'pubchem': PubChemAPI(),
-            'nasa': NASAAPI(),
-            'uniprot': UniProtAPI(),
-            'trefle': TrefleAPI()
+        self.translator = translator or TranslationService()
+
+        # Inicializar APIs externas (compartidas con los agentes)
+        self.external_apis = external_apis or {
+            'pubmed': PubMedAPI(translator=self.translator),
+            'pubchem': PubChemAPI(translator=self.translator),
+            'nasa': NASAAPI(translator=self.translator),
+            'uniprot': UniProtAPI(translator=self.translator),
+            'trefle': TrefleAPI(translator=self.translator)
         }
         
         # Inicializar agentes con sus APIs correspondientes
         self.agents = {
-            'medical': MedicalAgent(),
-            'botanical': BotanicalAgent(),
-            'chemical': ChemicalAgent(),
-            'physical': PhysicalAgent(),
-            'biological': BiologicalAgent()
+            'medical': MedicalAgent(self.external_apis['pubmed']),
+            'botanical': BotanicalAgent(self.external_apis['trefle']),
+            'chemical': ChemicalAgent(self.external_apis['pubchem']),
+            'physical': PhysicalAgent(self.external_apis['nasa']),
+            'biological': BiologicalAgent(self.external_apis['uniprot'])
         }
+        self.scheduler = AgentScheduler(self.agents)
         
         # Inicializar prompts
         self.prompts = {
@@ -59,101 +82,355 @@ class Orchestrator:
         self,
         query: str,
         user_id: str,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        domain: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Procesa una consulta coordinando múltiples agentes y APIs externas.
+
+        La consulta y su resultado se registran en el audit log; si se indica
+        `domain` (la ruta que atiende la consulta) se guarda también una fila
+        con ese dominio.
         """
         logger.info(f"Procesando consulta: {query}")
         try:
-            # Iniciar sesión de base de datos
-            session = get_session()
-            
-            # Guardar consulta inicial
-            db_query = Query(
-                user_id=user_id,
-                query_text=query
+            key = result_key(query, context)
+            integrated_response = self.result_cache.get(key)
+            if integrated_response is None:
+                # Las peticiones idénticas simultáneas comparten un único cálculo
+                shared_response, coalesced = await self.single_flight.do(
+                    key,
+                    lambda: self._answer(query, context)
+                )
+                integrated_response = copy.deepcopy(shared_response)
+                if coalesced:
+                    integrated_response.setdefault("metadata", {})["coalesced"] = True
+
+            # Guardar consulta y resultado (escritura diferida)
+            await self._record(query, user_id, integrated_response, domain)
+
+            return integrated_response
+
+        except Exception as e:
+            logger.error(f"Error en orchestrator: {str(e)}")
+            raise
+
+    async def _answer(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        # Una consulta casi idéntica ya respondida evita todo el proceso
+        cached = await self._semantic_lookup(query, context)
+        if cached is not None:
+            return cached
+
+        # Recopilar datos de APIs y respuestas de los agentes
+        validated_responses, integration_context, api_data, metadata = \
+            await self._collect_responses(query, context)
+
+        # Integrar respuestas
+        integrated_response = await self._integrate_responses(
+            validated_responses,
+            query,
+            integration_context
+        )
+
+        # Añadir fuentes de APIs a la respuesta
+        integrated_response["api_sources"] = api_data
+        integrated_response["metadata"] = metadata
+
+        await self._cache_response(query, context, integrated_response)
+        return integrated_response
+
+    async def _cached_response(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        cached = self.result_cache.get(result_key(query, context))
+        if cached is not None:
+            return cached
+        return await self._semantic_lookup(query, context)
+
+    async def _semantic_lookup(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        # Con contexto de usuario la respuesta deja de depender solo de la consulta
+        if context:
+            return None
+        return await self.semantic_cache.lookup(query)
+
+    async def _cache_response(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        integrated_response: Dict[str, Any]
+    ):
+        self.result_cache.set(result_key(query, context), integrated_response)
+        if context:
+            return
+        domains = [
+            name for name, response in integrated_response.get("sources", {}).items()
+            if not (isinstance(response, dict) and "error" in response)
+        ]
+        domains += [
+            name for name, data in integrated_response.get("api_sources", {}).items()
+            if data and not (isinstance(data, dict) and "error" in data)
+        ]
+        await self.semantic_cache.store(query, integrated_response, domains)
+
+    async def _record(
+        self,
+        query: str,
+        user_id: str,
+        integrated_response: Dict[str, Any],
+        domain: Optional[str] = None
+    ):
+        domains = ['integrated'] + ([domain] if domain else [])
+        await self.audit_log.record(
+            user_id=user_id,
+            query_text=query,
+            results=[
+                {
+                    "response": integrated_response['response'],
+                    "confidence": integrated_response['confidence'],
+                    "domain": name
+                }
+                for name in domains
+            ]
+        )
+
+    async def stream_query(
+        self,
+        query: str,
+        user_id: str,
+        context: Optional[Dict[str, Any]] = None,
+        domain: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante de process_query que emite eventos a medida que se producen:
+        "api_result" por cada fuente externa, "agent_result" por cada agente,
+        "token" por cada fragmento de la respuesta integrada y, al final,
+        "done" con la respuesta completa (o "error"). `domain` se registra en
+        el audit log igual que en process_query.
+
+        Si el consumidor deja de iterar, el procesamiento se cancela.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.ensure_future(
+            self._produce_stream_events(query, user_id, context, domain, events)
+        )
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _produce_stream_events(
+        self,
+        query: str,
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        domain: Optional[str],
+        events: asyncio.Queue
+    ):
+        logger.info(f"Procesando consulta en streaming: {query}")
+        try:
+            cached = await self._cached_response(query, context)
+            if cached is not None:
+                await self._record(query, user_id, cached, domain)
+                events.put_nowait({"event": "done", "data": cached})
+                return
+
+            validated_responses, integration_context, api_data, metadata = \
+                await self._collect_responses(
+                    query,
+                    context,
+                    on_source=lambda name, data, timing: events.put_nowait({
+                        "event": "api_result",
+                        "source": name,
+                        "data": data,
+                        "timing": timing
+                    }),
+                    on_agent=lambda domain, response: events.put_nowait({
+                        "event": "agent_result",
+                        "domain": domain,
+                        "data": response
+                    })
+                )
+
+            integration_prompt = self._create_integration_prompt(
+                validated_responses,
+                query,
+                integration_context
             )
-            session.add(db_query)
-            
+            english_prompt = await self.translator.to_english_async(integration_prompt)
+
+            # Se pide la respuesta directamente en español para poder mostrar
+            # los tokens según llegan; la traducción final la omite
+            tokens = []
+            async for token in self.groq_client.stream_response(
+                english_prompt + STREAMING_LANGUAGE_INSTRUCTION,
+                temperature=0.7
+            ):
+                tokens.append(token)
+                events.put_nowait({"event": "token", "data": token})
+
+            integrated_response = {
+                "response": await self.translator.to_spanish_async("".join(tokens)),
+                "confidence": self._calculate_average_confidence(validated_responses),
+                "sources": validated_responses,
+                "api_sources": api_data,
+                "metadata": metadata
+            }
+
+            await self._record(query, user_id, integrated_response, domain)
+            await self._cache_response(query, context, integrated_response)
+
+            events.put_nowait({"event": "done", "data": integrated_response})
+
+        except asyncio.CancelledError:
+            logger.info("Consulta en streaming cancelada por el cliente")
+            raise
+        except Exception as e:
+            logger.error(f"Error en orchestrator (streaming): {str(e)}")
+            events.put_nowait({"event": "error", "detail": str(e)})
+        finally:
+            events.put_nowait(None)
+
+    async def _collect_responses(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        on_source: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None,
+        on_agent: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """
+        Recopila los datos de las APIs externas y las respuestas validadas de
+        los agentes. Devuelve las respuestas validadas, el contexto para la
+        integración, los datos de las APIs y los metadatos de la consulta.
+        """
+        # Contexto de peticiones compartido por orchestrator y agentes
+        fetch_context = FetchContext()
+        try:
             # Recopilar datos de APIs externas
-            api_data = await self._gather_api_data(query)
-            
+            api_data, api_timings = await self._gather_api_data(query, fetch_context, on_source)
+
             # Enriquecer el contexto con datos de APIs
             enriched_context = {
                 **(context or {}),
-                "api_data": api_data
+                "api_data": api_data,
+                "fetch_context": fetch_context
             }
-            
-            # Obtener respuestas de cada agente
-            responses = {}
-            for domain, agent in self.agents.items():
-                try:
-                    agent_response = await agent.process_query(query, enriched_context)
-                    responses[domain] = agent_response
-                except Exception as e:
-                    logger.error(f"Error en agente {domain}: {str(e)}")
-                    responses[domain] = {"error": str(e)}
+
+            # Obtener respuestas de los agentes (concurrentes salvo dependencias)
+            responses = await self.scheduler.run(query, enriched_context, on_result=on_agent)
 
             # Validar respuestas
             validated_responses = self.validator.validate_responses(responses)
+        finally:
+            # Las peticiones memorizadas que nadie esperó no deben seguir vivas,
+            # tampoco si algún paso anterior falla
+            fetch_context.cancel_pending()
 
-            # Integrar respuestas
-            integrated_response = await self._integrate_responses(
-                validated_responses,
-                query,
-                enriched_context
-            )
+        integration_context = {
+            key: value for key, value in enriched_context.items()
+            if key != "fetch_context"
+        }
+        metadata = {
+            "gather_mode": settings.API_GATHER_MODE,
+            "api_timings": api_timings,
+            "fetch_dedup": fetch_context.stats()
+        }
+        return validated_responses, integration_context, api_data, metadata
 
-            # Añadir fuentes de APIs a la respuesta
-            integrated_response["api_sources"] = api_data
+    async def _gather_api_data(
+        self,
+        query: str,
+        fetch_context: Optional[FetchContext] = None,
+        on_source: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """
+        Recopila datos de todas las APIs externas.
 
-            # Guardar resultado
-            result = QueryResult(
-                query=db_query,
-                response=integrated_response['response'],
-                confidence=integrated_response['confidence'],
-                domain='integrated'
-            )
-            session.add(result)
-            session.commit()
+        En modo concurrente todas las fuentes se lanzan a la vez y cada una
+        tiene su propio plazo; una fuente lenta o fallida devuelve un resultado
+        parcial ({"error": ...}) sin bloquear ni vaciar al resto.
+        Las llamadas pasan por el FetchContext de la consulta para que los
+        agentes reutilicen los resultados en lugar de repetir las peticiones.
+        `on_source` se invoca en cuanto termina cada fuente.
+        Devuelve los datos y los tiempos de cada fuente.
+        """
+        fetch_context = fetch_context or FetchContext()
+        calls = {
+            'pubmed': lambda: self.external_apis['pubmed'].search_articles(query),
+            'pubchem': lambda: self.external_apis['pubchem'].search_compound(query),
+            'nasa': lambda: self.external_apis['nasa'].get_relevant_data(query),
+            'uniprot': lambda: self.external_apis['uniprot'].search_proteins(query),
+            'trefle': lambda: self.external_apis['trefle'].search_plants(query)
+        }
+        sources = {
+            name: (lambda name=name, call=call: fetch_context.fetch(name, query, call))
+            for name, call in calls.items()
+        }
 
-            return integrated_response
+        if settings.API_GATHER_MODE == "sequential":
+            outcomes = [
+                await self._fetch_source(name, fetch, on_source)
+                for name, fetch in sources.items()
+            ]
+        else:
+            outcomes = await asyncio.gather(*(
+                self._fetch_source(name, fetch, on_source)
+                for name, fetch in sources.items()
+            ))
 
-        except Exception as e:
-            logger.error(f"Error en orchestrator: {str(e)}")
-            if 'session' in locals():
-                session.rollback()
-            raise
-        finally:
-            if 'session' in locals():
-                session.close()
+        api_data = {}
+        api_timings = {}
+        for name, data, timing in outcomes:
+            api_data[name] = data
+            api_timings[name] = timing
+
+        return api_data, api_timings
 
-    async def _gather_api_data(self, query: str) -> Dict[str, Any]:
+    async def _fetch_source(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[Any]],
+        on_source: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None
+    ) -> Tuple[str, Any, Dict[str, Any]]:
         """
-        Recopila datos de todas las APIs externas.
+        Consulta una fuente externa respetando su plazo configurado.
         """
-        api_data = {}
+        timeout = settings.API_SOURCE_TIMEOUTS.get(name, settings.API_DEFAULT_TIMEOUT)
+        start = time.perf_counter()
         try:
-            # Obtener datos de PubMed
-            api_data['pubmed'] = await self.external_apis['pubmed'].search_articles(query)
-            
-            # Obtener datos de PubChem
-            api_data['pubchem'] = await self.external_apis['pubchem'].search_compound(query)
-            
-            # Obtener datos de NASA
-            api_data['nasa'] = await self.external_apis['nasa'].get_space_weather()
-            
-            # Obtener datos de UniProt
-            api_data['uniprot'] = await self.external_apis['uniprot'].search_proteins(query)
-            
-            # Obtener datos de Trefle
-            api_data['trefle'] = await self.external_apis['trefle'].search_plants(query)
-            
+            data = await asyncio.wait_for(fetch(), timeout=timeout)
+            status = "ok"
+        except asyncio.TimeoutError:
+            logger.warning(f"Plazo agotado consultando {name} ({timeout}s)")
+            data = {"error": f"Plazo agotado ({timeout}s)"}
+            status = "timeout"
         except Exception as e:
-            logger.error(f"Error recopilando datos de APIs: {str(e)}")
-        
-        return api_data
+            logger.error(f"Error recopilando datos de {name}: {str(e)}")
+            data = {"error": str(e)}
+            status = "error"
+
+        timing = {
+            "status": status,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+            "timeout_s": timeout
+        }
+        if on_source:
+            on_source(name, data, timing)
+        return name, data, timing
 
     async def _integrate_responses(
         self,
@@ -170,7 +447,7 @@ class Orchestrator:
             )
 
             # Traducir el prompt si es necesario para Groq
-            english_prompt = self.translator.to_english(integration_prompt)
+            english_prompt = await self.translator.to_english_async(integration_prompt)
 
             # Obtener respuesta integrada del LLM
             english_response = await self.groq_client.generate_response(
@@ -179,7 +456,7 @@ class Orchestrator:
             )
 
             # Traducir la respuesta de vuelta a español
-            spanish_response = self.translator.to_spanish(english_response)
+            spanish_response = await self.translator.to_spanish_async(english_response)
 
             # Calcular confianza promedio
             confidence = self._calculate_average_confidence(responses)
@@ -1,14 +1,14 @@
 from typing import Dict, Any, List, Optional
 import logging
-import re
 from src.rag.retriever.document_retriever import DocumentRetriever
+from src.utils.text import normalize_query
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class QueryProcessor:
-    def __init__(self):
-        self.document_retriever = DocumentRetriever()
+    def __init__(self, document_retriever: Optional[DocumentRetriever] = None):
+        self.document_retriever = document_retriever or DocumentRetriever()
 
     async def process_query(
         self,
@@ -46,16 +46,7 @@ class QueryProcessor:
         """
         Limpia y normaliza la consulta.
         """
-        # Convertir a minúsculas
-        query = query.lower()
-        
-        # Eliminar caracteres especiales
-        query = re.sub(r'[^\w\s]', ' ', query)
-        
-        # Eliminar espacios múltiples
-        query = re.sub(r'\s+', ' ', query).strip()
-        
-        return query
+        return normalize_query(query)
 
     def _identify_domains(self, query: str) -> List[str]:
         """
@@ -90,22 +81,13 @@ class QueryProcessor:
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Recupera documentos relevantes para la consulta de cada dominio.
+        Todos los dominios se consultan en una sola búsqueda multidominio.
         """
-        relevant_docs = {}
-        
-        for domain in domains:
-            try:
-                docs = await self.document_retriever.get_relevant_documents(
-                    query=query,
-                    domain=domain,
-                    num_documents=3  # Ajustar según necesidades
-                )
-                relevant_docs[domain] = docs
-            except Exception as e:
-                logger.error(f"Error recuperando documentos para {domain}: {str(e)}")
-                relevant_docs[domain] = []
-
-        return relevant_docs
+        return await self.document_retriever.retrieve_multi_domain(
+            query=query,
+            domains=domains,
+            n_results=3  # Ajustar según necesidades
+        )
 
     def _structure_data(
         self,
@@ -137,4 +119,4 @@ class QueryProcessor:
         """
         Obtiene el timestamp actual en formato ISO.
         """
-        return datetime.datetime.now().isoformat()
\ No newline at end of file
+        return datetime.now().isoformat()
\ No newline at end of file
@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+from src.utils.config import settings
+from src.utils.lru import LRUCache
+from src.utils.text import normalize_query
+
+logger = logging.getLogger(__name__)
+
+def result_key(query: str, context: Optional[Dict[str, Any]] = None) -> str:
+    """Clave exacta de una consulta: texto normalizado más hash del contexto."""
+    serialized = json.dumps(context or {}, sort_keys=True, ensure_ascii=False, default=str)
+    context_hash = hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+    return f"{normalize_query(query)}:{context_hash}"
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave: la primera lanza el
+    cálculo y las demás esperan a la misma tarea en lugar de repetirlo.
+    El resultado no se guarda; al terminar, la clave queda libre.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Devuelve (resultado, compartido). `compartido` es True si la llamada
+        se unió a un cálculo que ya estaba en curso.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+            logger.debug(f"Uniendo petición a cálculo en curso: {key}")
+        else:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # shield: si el primer solicitante se cancela, el resto sigue esperando
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+class ResultCache:
+    """
+    Caché exacta de respuestas integradas (LRU con TTL). Devuelve copias para
+    que ningún llamador modifique la respuesta guardada.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.enabled = settings.RESULT_CACHE_ENABLED if enabled is None else enabled
+        self._entries = LRUCache(
+            max_entries or settings.RESULT_CACHE_MAX_ENTRIES,
+            ttl=ttl or settings.RESULT_CACHE_TTL,
+            clock=clock
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        response = self._entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        response = copy.deepcopy(response)
+        response["metadata"] = {**response.get("metadata", {}), "result_cache": {"hit": True}}
+        return response
+
+    def set(self, key: str, response: Dict[str, Any]):
+        if self.enabled:
+            self._entries.set(key, copy.deepcopy(response))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
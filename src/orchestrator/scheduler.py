@@ -0,0 +1,113 @@
+from typing import Dict, Any, List, Optional, Callable
+import asyncio
+import logging
+from src.agents.base_agent import BaseAgent
+from src.utils.config import settings
+from src.utils.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+class AgentScheduler:
+    """
+    Ejecuta los agentes de forma concurrente respetando sus dependencias.
+
+    Un agente declara en `depends_on` los dominios cuya salida necesita; solo
+    se lanza cuando esos agentes han terminado y recibe sus respuestas en
+    `context["agent_outputs"]`. Los agentes independientes se ejecutan a la
+    vez, limitados por un semáforo por tipo de agente.
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, BaseAgent],
+        default_max_concurrency: Optional[int] = None
+    ):
+        self.agents = agents
+        self.default_max_concurrency = default_max_concurrency or settings.AGENT_MAX_CONCURRENCY
+        self.dependencies = {
+            domain: tuple(getattr(agent, 'depends_on', ()))
+            for domain, agent in agents.items()
+        }
+        self.execution_order = self._resolve_order()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        for agent in agents.values():
+            agent_type = type(agent).__name__
+            if agent_type not in self._semaphores:
+                limit = getattr(agent, 'max_concurrency', None) or self.default_max_concurrency
+                self._semaphores[agent_type] = asyncio.Semaphore(limit)
+
+    def _resolve_order(self) -> List[str]:
+        """
+        Ordena los dominios topológicamente y detecta dependencias inválidas.
+        """
+        order = []
+        state = {}
+
+        def visit(domain: str, path: List[str]):
+            if state.get(domain) == "done":
+                return
+            if state.get(domain) == "visiting":
+                cycle = " -> ".join(path + [domain])
+                raise ConfigurationError(f"Dependencia circular entre agentes: {cycle}")
+            state[domain] = "visiting"
+            for dependency in self.dependencies[domain]:
+                if dependency not in self.agents:
+                    raise ConfigurationError(
+                        f"El agente {domain} depende de un agente desconocido: {dependency}"
+                    )
+                visit(dependency, path + [domain])
+            state[domain] = "done"
+            order.append(domain)
+
+        for domain in self.agents:
+            visit(domain, [])
+        return order
+
+    async def run(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta todos los agentes y devuelve sus respuestas por dominio.
+
+        Un agente que falla devuelve {"error": ...} y sus dependientes se
+        ejecutan igualmente con esa salida.
+        """
+        context = context or {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_agent(domain: str) -> Dict[str, Any]:
+            agent = self.agents[domain]
+            agent_context = context
+            dependencies = self.dependencies[domain]
+            if dependencies:
+                outputs = await asyncio.gather(*(tasks[dep] for dep in dependencies))
+                agent_context = {
+                    **context,
+                    "agent_outputs": dict(zip(dependencies, outputs))
+                }
+
+            async with self._semaphores[type(agent).__name__]:
+                try:
+                    response = await agent.process_query(query, agent_context)
+                except Exception as e:
+                    logger.error(f"Error en agente {domain}: {str(e)}")
+                    response = {"error": str(e)}
+
+            if on_result:
+                on_result(domain, response)
+            return response
+
+        for domain in self.execution_order:
+            tasks[domain] = asyncio.ensure_future(run_agent(domain))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        return {domain: tasks[domain].result() for domain in self.agents}
@@ -0,0 +1,204 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from collections import OrderedDict
+import asyncio
+import copy
+import logging
+import threading
+import time
+import numpy as np
+from src.utils.config import settings
+from src.utils.lru import LRUCache
+from src.utils.text import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Embeddings de consultas recientes que se conservan entre lookup y store
+RECENT_VECTORS = 256
+
+class SemanticCache:
+    """
+    Caché de respuestas integradas indexada por el embedding de la consulta.
+
+    Una consulta reutiliza la respuesta de otra anterior cuando la similitud
+    coseno entre sus embeddings (de la consulta normalizada) supera
+    `threshold`. Cada entrada caduca a los `ttl` segundos y recuerda los
+    dominios que contribuyeron a la respuesta, para poder invalidar solo las
+    afectadas cuando cambian los datos de un dominio.
+
+    Los vectores viven en una matriz float32 preasignada de `max_entries`
+    filas; al llenarse se expulsa la entrada más antigua. Los embeddings de
+    las últimas consultas se recuerdan aparte, de modo que el store que
+    sigue a un lookup fallido no vuelve a calcular el de la misma consulta.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Any] = None,
+        threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.threshold = threshold or settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl or settings.SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.enabled = settings.SEMANTIC_CACHE_ENABLED if enabled is None else enabled
+        self.clock = clock
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._stored_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._order: "OrderedDict[int, None]" = OrderedDict()  # Slots por antigüedad
+        self._recent_vectors = LRUCache(RECENT_VECTORS)
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            # Importación diferida: carga transformers/torch solo si se usa
+            from src.rag.embeddings.embedding_manager import EmbeddingManager
+            self._embedder = EmbeddingManager()
+        return self._embedder
+
+    def _embed(self, embedder: Any, normalized_query: str) -> np.ndarray:
+        vector = np.asarray(embedder.get_embedding(normalized_query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    async def _embed_async(self, query: str) -> Optional[np.ndarray]:
+        normalized_query = normalize_query(query)
+        vector = self._recent_vectors.get(normalized_query)
+        if vector is not None:
+            return vector
+        try:
+            embedder = await asyncio.to_thread(self._get_embedder)
+        except Exception as e:
+            # Sin modelo de embeddings la caché se desactiva y no bloquea consultas
+            logger.error(f"Caché semántica desactivada: {str(e)}")
+            self.enabled = False
+            return None
+        try:
+            vector = await asyncio.to_thread(self._embed, embedder, normalized_query)
+        except Exception as e:
+            logger.error(f"Error calculando el embedding de la consulta, se omite la caché: {str(e)}")
+            return None
+        self._recent_vectors.set(normalized_query, vector)
+        return vector
+
+    async def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve una copia de la respuesta cacheada más parecida a `query`
+        (con metadata["semantic_cache"]) o None si ninguna supera el umbral.
+        """
+        if not self.enabled:
+            return None
+        vector = await self._embed_async(query)
+        if vector is None:
+            return None
+
+        with self._lock:
+            match = self._best_match(vector)
+            if match is None:
+                self._counters["misses"] += 1
+                return None
+            slot, similarity = match
+            entry = self._entries[slot]
+            self._counters["hits"] += 1
+
+        response = copy.deepcopy(entry["response"])
+        response["metadata"] = {
+            **response.get("metadata", {}),
+            "semantic_cache": {
+                "hit": True,
+                "similarity": round(similarity, 4),
+                "cached_query": entry["query"]
+            }
+        }
+        return response
+
+    def _best_match(self, vector: np.ndarray) -> Optional[tuple]:
+        if self._vectors is None or not self._valid.any():
+            return None
+        alive = self._valid & (self.clock() - self._stored_at <= self.ttl)
+        # Liberar las entradas caducadas
+        for slot in np.flatnonzero(self._valid & ~alive):
+            self._free(int(slot))
+        if not alive.any():
+            return None
+        scores = self._vectors @ vector
+        scores[~alive] = -np.inf
+        slot = int(np.argmax(scores))
+        similarity = float(scores[slot])
+        if similarity < self.threshold:
+            return None
+        return slot, similarity
+
+    async def store(self, query: str, response: Dict[str, Any], domains: Iterable[str]):
+        """Guarda la respuesta integrada de `query` y los dominios que la forman."""
+        if not self.enabled:
+            return
+        vector = await self._embed_async(query)
+        if vector is None:
+            return
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            slot = self._free_slot()
+            self._vectors[slot] = vector
+            self._stored_at[slot] = self.clock()
+            self._valid[slot] = True
+            self._entries[slot] = {
+                "query": query,
+                "response": copy.deepcopy(response),
+                "domains": set(domains)
+            }
+            self._order[slot] = None
+            self._counters["stores"] += 1
+
+    def _free_slot(self) -> int:
+        free = np.flatnonzero(~self._valid)
+        if len(free):
+            return int(free[0])
+        oldest = next(iter(self._order))
+        self._free(oldest)
+        return oldest
+
+    def _free(self, slot: int):
+        self._valid[slot] = False
+        self._entries[slot] = None
+        self._order.pop(slot, None)
+
+    def invalidate(self, domain: Optional[str] = None) -> int:
+        """
+        Elimina las respuestas en las que participó `domain` (todas si no se
+        indica). Devuelve cuántas se eliminaron.
+        """
+        with self._lock:
+            slots = [
+                slot for slot in list(self._order)
+                if domain is None or domain in self._entries[slot]["domains"]
+            ]
+            for slot in slots:
+                self._free(slot)
+            self._counters["invalidated"] += len(slots)
+        return len(slots)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": int(self._valid.sum()),
+            "threshold": self.threshold,
+            **self._counters
+        }
+
+_shared_cache: Optional[SemanticCache] = None
+
+def get_semantic_cache() -> SemanticCache:
+    """Devuelve la caché semántica compartida del proceso."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SemanticCache()
+    return _shared_cache
@@ -0,0 +1,280 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import numpy as np
+from src.utils.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Clave de una entrada: (modelo, motor de inferencia, hash del texto)
+CacheKey = Tuple[str, str, str]
+
+# Bytes del hash del texto (blake2b), que también se guarda junto a cada fila
+DIGEST_SIZE = 16
+
+# Ficheros alternativos que prueba un proceso si el de la caché está en uso
+MAX_CACHE_FILES = 16
+
+def text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+class EmbeddingCache:
+    """
+    Caché de embeddings de un modelo, acotada en bytes.
+
+    Los vectores float32 se guardan en una matriz preasignada de
+    `max_bytes / (dimension * 4)` filas; un índice LRU relaciona cada clave
+    (modelo, motor, hash del texto) con su fila. El motor (`encoder_name`,
+    p. ej. "torch" u "onnx-int8") forma parte de la clave porque la
+    cuantización cambia los vectores. Con `path` la matriz es un fichero
+    mapeado en memoria y el índice se guarda al lado (`path + ".index.json"`),
+    de modo que un reinicio conserva los embeddings ya calculados.
+
+    Cada fila lleva además el hash de su texto (`path + ".keys"`), que se
+    comprueba al leer: si el proceso termina entre una expulsión y el
+    siguiente volcado del índice, las entradas cuya fila se reutilizó se
+    descartan en vez de devolver el vector de otro texto. Cada fichero lo
+    usa un solo proceso (bloqueo con flock); con varios workers sobre el
+    mismo directorio, cada uno toma el primer fichero libre de
+    `path`, `path.1`, ... y, si no queda ninguno, trabaja solo en memoria.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dimension: int,
+        max_bytes: Optional[int] = None,
+        path: Optional[str] = None,
+        flush_every: int = 256,
+        encoder_name: str = "torch"
+    ):
+        self.model_name = model_name
+        self.encoder_name = encoder_name
+        self.dimension = dimension
+        self.max_bytes = max_bytes or settings.EMBEDDING_CACHE_MAX_BYTES
+        self.capacity = max(1, self.max_bytes // (dimension * 4))
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[CacheKey, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._dirty = 0
+        self._lock_file = None
+        self.hits = 0
+        self.misses = 0
+
+        self.path = self._acquire(path) if path else None
+        if self.path:
+            self._vectors, self._keys, reused = self._open_memmap(self.path)
+            if reused:
+                self._load_index()
+            atexit.register(self.close)
+        else:
+            self._vectors = np.zeros((self.capacity, dimension), dtype=np.float32)
+            self._keys = np.zeros((self.capacity, DIGEST_SIZE), dtype=np.uint8)
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def _acquire(self, path: str) -> Optional[str]:
+        """Bloquea para este proceso el primer fichero libre de la caché."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if fcntl is None:
+            return path
+        root, extension = os.path.splitext(path)
+        for n in range(MAX_CACHE_FILES):
+            candidate = path if n == 0 else f"{root}.{n}{extension}"
+            lock_file = open(f"{candidate}.lock", "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            return candidate
+        logger.warning(f"Todos los ficheros de la caché de embeddings están en uso, se usa memoria: {path}")
+        return None
+
+    def _open_memmap(self, path: str) -> Tuple[np.ndarray, np.ndarray, bool]:
+        keys_path = f"{path}.keys"
+        reused = (
+            os.path.exists(path) and os.path.getsize(path) == self.capacity * self.dimension * 4
+            and os.path.exists(keys_path) and os.path.getsize(keys_path) == self.capacity * DIGEST_SIZE
+        )
+        mode = "r+" if reused else "w+"
+        vectors = np.memmap(path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dimension))
+        keys = np.memmap(keys_path, dtype=np.uint8, mode=mode, shape=(self.capacity, DIGEST_SIZE))
+        return vectors, keys, reused
+
+    @property
+    def _index_path(self) -> str:
+        return f"{self.path}.index.json"
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        try:
+            with open(self._index_path, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+            if (index["model"], index.get("encoder"), index["dimension"], index["capacity"]) != \
+                    (self.model_name, self.encoder_name, self.dimension, self.capacity):
+                logger.warning(f"Índice de embeddings incompatible, se descarta: {self._index_path}")
+                return
+            for digest, slot in index["entries"]:
+                if self._stored(slot, digest):
+                    self._slots[(self.model_name, self.encoder_name, digest)] = slot
+            logger.info(f"Caché de embeddings cargada: {len(self._slots)} entradas")
+        except Exception as e:
+            logger.error(f"Error cargando el índice de embeddings: {str(e)}")
+            self._slots.clear()
+
+    def _key(self, text: str) -> CacheKey:
+        return (self.model_name, self.encoder_name, text_digest(text))
+
+    def _stored(self, slot: int, digest: str) -> bool:
+        """Si la fila `slot` contiene el embedding del texto con ese hash."""
+        return 0 <= slot < self.capacity and self._keys[slot].tobytes() == bytes.fromhex(digest)
+
+    def _lookup(self, key: CacheKey) -> Optional[int]:
+        slot = self._slots.get(key)
+        if slot is not None and not self._stored(slot, key[-1]):
+            del self._slots[key]
+            return None
+        return slot
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Copia del embedding de `text`, o None si no está en la caché."""
+        key = self._key(text)
+        with self._lock:
+            slot = self._lookup(key)
+            if slot is None:
+                self.misses += 1
+                return None
+            self._slots.move_to_end(key)
+            self.hits += 1
+            return np.array(self._vectors[slot])
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Devuelve una matriz con los embeddings cacheados de `texts` y la lista
+        de posiciones que faltan (sus filas quedan sin rellenar).
+        """
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self._key(text)
+                slot = self._lookup(key)
+                if slot is None:
+                    missing.append(i)
+                    continue
+                self._slots.move_to_end(key)
+                result[i] = self._vectors[slot]
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return result, missing
+
+    def put(self, text: str, vector: np.ndarray):
+        self.put_many([text], np.asarray(vector, dtype=np.float32).reshape(1, -1))
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self._key(text)
+                slot = self._slots.get(key)
+                if slot is None:
+                    slot = self._free.pop() if self._free else self._evict()
+                # La fila queda sin hash mientras se escribe el vector
+                self._keys[slot] = 0
+                self._vectors[slot] = vector
+                self._keys[slot] = np.frombuffer(bytes.fromhex(key[-1]), dtype=np.uint8)
+                self._slots[key] = slot
+                self._slots.move_to_end(key)
+            self._dirty += len(texts)
+            should_flush = self.path is not None and self._dirty >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def _evict(self) -> int:
+        _, slot = self._slots.popitem(last=False)
+        return slot
+
+    def flush(self):
+        """Escribe a disco la matriz y el índice (solo con `path`)."""
+        if self.path is None:
+            return
+        with self._lock:
+            self._vectors.flush()
+            self._keys.flush()
+            index = {
+                "model": self.model_name,
+                "encoder": self.encoder_name,
+                "dimension": self.dimension,
+                "capacity": self.capacity,
+                "entries": [[digest, slot] for (*_, digest), slot in self._slots.items()]
+            }
+            self._dirty = 0
+        temporary = f"{self._index_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary, self._index_path)
+
+    def close(self):
+        """Vuelca la caché a disco y libera su fichero para otros procesos."""
+        self.flush()
+        atexit.unregister(self.close)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            self._free = list(range(self.capacity - 1, -1, -1))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "bytes": self.capacity * self.dimension * 4,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+def cache_path_for(
+    model_name: str,
+    encoder_name: str = "torch",
+    directory: Optional[str] = None
+) -> Optional[str]:
+    """Fichero de la caché persistente de un modelo y motor, o None si no hay directorio."""
+    directory = settings.EMBEDDING_CACHE_DIR if directory is None else directory
+    if not directory:
+        return None
+    return os.path.join(directory, re.sub(r"[^\w.-]", "_", f"{model_name}.{encoder_name}") + ".f32")
+
+_shared_caches: Dict[Tuple[str, str, int], EmbeddingCache] = {}
+_shared_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str, dimension: int, encoder_name: str = "torch") -> EmbeddingCache:
+    """Caché compartida por todos los EmbeddingManager de un mismo modelo y motor."""
+    with _shared_lock:
+        key = (model_name, encoder_name, dimension)
+        if key not in _shared_caches:
+            _shared_caches[key] = EmbeddingCache(
+                model_name,
+                dimension,
+                path=cache_path_for(model_name, encoder_name),
+                encoder_name=encoder_name
+            )
+        return _shared_caches[key]
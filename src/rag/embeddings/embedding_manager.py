@@ -1,87 +1,99 @@
-from typing import List, Union
+from typing import List, Optional, Union
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
-import torch
+from transformers import AutoTokenizer
 import logging
-from functools import lru_cache
+from src.utils.batching import length_sorted_batches
+from src.utils.config import settings
+from src.rag.embeddings.embedding_cache import EmbeddingCache, get_embedding_cache
+from src.rag.embeddings.encoder_backends import EncoderBackend, create_encoder
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingManager:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: Optional[int] = None,
+        max_length: int = 512,
+        cache: Optional[EmbeddingCache] = None,
+        backend: Optional[str] = None,
+        encoder: Optional[EncoderBackend] = None
+    ):
         """
         Inicializa el gestor de embeddings usando un modelo de sentence-transformers.
+
+        El motor de inferencia se elige con `backend` (por defecto
+        EMBEDDING_BACKEND): "torch" o "onnx" (grafo cuantizado int8 para CPU).
         """
         try:
+            self.model_name = model_name
+            self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+            self.max_length = max_length
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModel.from_pretrained(model_name)
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model.to(self.device)
-            logger.info(f"EmbeddingManager inicializado con modelo {model_name}")
+            self.encoder = encoder if encoder is not None else create_encoder(model_name, backend)
+            self.dimension = self.encoder.dimension
+            self.cache = cache if cache is not None else get_embedding_cache(
+                model_name, self.dimension, self.encoder.name
+            )
+            logger.info(f"EmbeddingManager inicializado con modelo {model_name} ({self.encoder.name})")
         except Exception as e:
             logger.error(f"Error inicializando EmbeddingManager: {str(e)}")
             raise
 
-    @lru_cache(maxsize=1000)
     def get_embedding(self, text: str) -> List[float]:
         """
         Genera embeddings para un texto dado.
         """
         try:
-            # Preprocesar y tokenizar el texto
-            inputs = self.tokenizer(
-                text,
-                padding=True,
-                truncation=True,
-                max_length=512,
-                return_tensors="pt"
-            ).to(self.device)
-
-            # Generar embeddings
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                embeddings = self._mean_pooling(outputs, inputs['attention_mask'])
-                
-            # Convertir a lista y normalizar
-            return self._normalize(embeddings[0]).tolist()
+            return self.get_embeddings_batch([text])[0].tolist()
 
         except Exception as e:
             logger.error(f"Error generando embedding: {str(e)}")
             raise
 
-    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    def get_embeddings_batch(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
         """
         Genera embeddings para una lista de textos.
+
+        Los textos ya cacheados no se recalculan. El resto se tokeniza una
+        sola vez y se agrupa por longitud en tokens, de modo que cada lote
+        rellena lo mínimo. Devuelve una matriz float32 contigua
+        (len(texts), dimension) en el orden de entrada.
         """
         try:
-            # Procesar en lotes para eficiencia
-            embeddings = []
-            batch_size = 32
-            
-            for i in range(0, len(texts), batch_size):
-                batch_texts = texts[i:i + batch_size]
-                batch_embeddings = [self.get_embedding(text) for text in batch_texts]
-                embeddings.extend(batch_embeddings)
-            
+            embeddings, missing = self.cache.get_many(texts)
+            if missing:
+                # Cada texto distinto se calcula una sola vez
+                pending = list(dict.fromkeys(texts[i] for i in missing))
+                computed = self._compute_embeddings(pending, batch_size)
+                self.cache.put_many(pending, computed)
+                rows = {text: row for row, text in enumerate(pending)}
+                embeddings[missing] = computed[[rows[texts[i]] for i in missing]]
             return embeddings
 
         except Exception as e:
             logger.error(f"Error generando embeddings en lote: {str(e)}")
             raise
 
-    def _mean_pooling(self, model_output, attention_mask) -> torch.Tensor:
-        """
-        Realiza mean pooling sobre los tokens del último hidden state.
-        """
-        token_embeddings = model_output.last_hidden_state
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
-        return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+    def _compute_embeddings(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        batch_size = batch_size or self.batch_size
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return embeddings
 
-    def _normalize(self, embeddings: torch.Tensor) -> torch.Tensor:
-        """
-        Normaliza los embeddings.
-        """
-        return embeddings / embeddings.norm(dim=-1, keepdim=True)
+        encodings = self.tokenizer(
+            list(texts),
+            truncation=True,
+            max_length=self.max_length
+        )
+        for indices, batch in length_sorted_batches(self.tokenizer, encodings, batch_size):
+            embeddings[indices] = self.encoder.encode(batch)
+
+        return embeddings
 
     def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
@@ -0,0 +1,196 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+import logging
+import os
+import re
+import numpy as np
+from src.utils.config import settings
+from src.utils.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# Entradas que aceptan los codificadores tipo BERT, en el orden del grafo ONNX
+MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+class EncoderBackend(ABC):
+    """
+    Motor de inferencia usado por EmbeddingManager.
+
+    encode recibe un lote ya tokenizado y rellenado (arrays numpy int64 con
+    las claves de MODEL_INPUTS que produzca el tokenizador) y devuelve una
+    matriz float32 (lote, dimension) con el mean pooling normalizado.
+
+    `name` identifica el motor y su variante (p. ej. "onnx-int8"); la caché
+    de embeddings lo usa para no mezclar vectores de motores distintos.
+    """
+
+    name: str = "base"
+    dimension: int
+
+    @abstractmethod
+    def encode(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        pass
+
+class TorchEncoder(EncoderBackend):
+    """Modelo PyTorch en precisión completa (GPU si está disponible)."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        import torch
+        from transformers import AutoModel
+
+        self.model = AutoModel.from_pretrained(model_name).eval()
+        self.dimension = self.model.config.hidden_size
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+        if settings.EMBEDDING_NUM_THREADS:
+            torch.set_num_threads(settings.EMBEDDING_NUM_THREADS)
+
+    def encode(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        import torch
+
+        batch = {
+            key: torch.from_numpy(np.asarray(value)).to(self.device)
+            for key, value in features.items() if key in MODEL_INPUTS
+        }
+        with torch.inference_mode():
+            outputs = self.model(**batch)
+            pooled = mean_pooling(outputs.last_hidden_state, batch["attention_mask"])
+            pooled = pooled / pooled.norm(dim=-1, keepdim=True)
+        return pooled.float().cpu().numpy()
+
+def mean_pooling(token_embeddings, attention_mask):
+    """Media de los embeddings de los tokens reales (sin relleno)."""
+    import torch
+
+    mask = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).to(token_embeddings.dtype)
+    return torch.sum(token_embeddings * mask, 1) / torch.clamp(mask.sum(1), min=1e-9)
+
+class OnnxEncoder(EncoderBackend):
+    """
+    Grafo ONNX ejecutado con onnxruntime en CPU.
+
+    El grafo incluye el pooling y la normalización, y por defecto se
+    cuantiza a int8 (cuantización dinámica de pesos), lo que reduce memoria
+    y latencia en nodos sin GPU. Si el fichero no existe en
+    EMBEDDING_ONNX_DIR se exporta una vez desde el modelo PyTorch; para que
+    el arranque no cargue torch conviene exportarlo antes del despliegue
+    (python -m src.rag.embeddings.encoder_backends <modelo>).
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        num_threads: Optional[int] = None
+    ):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ConfigurationError(f"El backend de embeddings 'onnx' requiere onnxruntime: {str(e)}")
+
+        quantize = settings.EMBEDDING_ONNX_QUANTIZE if quantize is None else quantize
+        self.path = onnx_model_path(model_name, model_dir, quantize)
+        # Los vectores del grafo int8 difieren de los del float32
+        self.name = "onnx-int8" if quantize else "onnx"
+        if not os.path.exists(self.path):
+            export_onnx(model_name, self.path, quantize=quantize)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        num_threads = settings.EMBEDDING_NUM_THREADS if num_threads is None else num_threads
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            self.path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        logger.info(f"Modelo ONNX de embeddings cargado: {self.path}")
+
+    def encode(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        inputs = {name: np.asarray(features[name], dtype=np.int64) for name in self.input_names}
+        return self.session.run(None, inputs)[0].astype(np.float32, copy=False)
+
+def onnx_model_path(model_name: str, model_dir: Optional[str] = None, quantize: bool = True) -> str:
+    """Fichero ONNX de un modelo dentro de EMBEDDING_ONNX_DIR."""
+    model_dir = model_dir or settings.EMBEDDING_ONNX_DIR
+    filename = "model_int8.onnx" if quantize else "model.onnx"
+    return os.path.join(model_dir, re.sub(r"[^\w.-]", "_", model_name), filename)
+
+def export_onnx(model_name: str, output_path: str, quantize: bool = True) -> str:
+    """
+    Exporta el modelo con pooling y normalización a ONNX (ejes de lote y
+    secuencia dinámicos) y, con `quantize`, aplica cuantización dinámica
+    int8 a los pesos. Devuelve la ruta del fichero generado.
+    """
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError as e:
+        raise ConfigurationError(f"La exportación a ONNX requiere torch y onnxruntime: {str(e)}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # Atención "eager": las variantes fusionadas no siempre se pueden exportar
+    model = AutoModel.from_pretrained(model_name, attn_implementation="eager").eval()
+    sample = tokenizer(["texto de ejemplo", "otro texto"], padding=True, return_tensors="pt")
+    input_names = [name for name in MODEL_INPUTS if name in sample]
+
+    class _PooledEncoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            features = dict(zip(input_names, inputs))
+            outputs = self.model(**features)
+            pooled = mean_pooling(outputs.last_hidden_state, features["attention_mask"])
+            return pooled / pooled.norm(dim=-1, keepdim=True)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    float_path = output_path if not quantize else f"{output_path}.float.onnx"
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["sentence_embedding"] = {0: "batch"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            _PooledEncoder(),
+            tuple(sample[name] for name in input_names),
+            float_path,
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+
+    if quantize:
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+        os.remove(float_path)
+    logger.info(f"Modelo de embeddings exportado a ONNX: {output_path}")
+    return output_path
+
+BACKENDS = {
+    TorchEncoder.name: TorchEncoder,
+    OnnxEncoder.name: OnnxEncoder
+}
+
+def create_encoder(model_name: str, backend: Optional[str] = None) -> EncoderBackend:
+    """Crea el motor indicado (por defecto EMBEDDING_BACKEND) para `model_name`."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    encoder_class = BACKENDS.get(backend)
+    if encoder_class is None:
+        raise ConfigurationError(f"Backend de embeddings desconocido: {backend}")
+    return encoder_class(model_name)
+
+if __name__ == "__main__":
+    # Exportación previa al despliegue: python -m src.rag.embeddings.encoder_backends [modelo]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    name = sys.argv[1] if len(sys.argv) > 1 else "sentence-transformers/all-MiniLM-L6-v2"
+    export_onnx(name, onnx_model_path(name, quantize=settings.EMBEDDING_ONNX_QUANTIZE),
+                quantize=settings.EMBEDDING_ONNX_QUANTIZE)
@@ -1,84 +1,244 @@
+import asyncio
 import logging
-from typing import List, Dict, Optional
-import numpy as np
+from typing import List, Dict, Optional, Tuple, Union
+from src.rag.retriever.reranker import CrossEncoderReranker, get_reranker
 from src.rag.vector_store.vector_db import VectorDB
+from src.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fusiona varias listas ordenadas de ids sumando 1 / (k + posición) de
+    cada lista en la que aparece un id. Solo usa posiciones, por lo que no
+    hace falta que las puntuaciones de origen sean comparables.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for position, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Similitud a partir de la distancia de Chroma en el espacio del índice:
+    1 - d para cosine e ip, y 1 - d / 2 para l2 (distancia al cuadrado, que
+    entre vectores unitarios vale 2 - 2·cos).
+    """
+    if space in ("cosine", "ip"):
+        return 1 - distance
+    if space == "l2":
+        return 1 - distance / 2
+    raise ValueError(f"Espacio no soportado: {space}")
+
 class DocumentRetriever:
-    def __init__(self):
-        self.vector_db = VectorDB()
+    def __init__(
+        self,
+        vector_db: Optional[VectorDB] = None,
+        reranker: Optional[CrossEncoderReranker] = None
+    ):
+        self.vector_db = vector_db or VectorDB()
+        self._reranker = reranker
+
+    @property
+    def reranker(self) -> CrossEncoderReranker:
+        if self._reranker is None:
+            self._reranker = get_reranker()
+        return self._reranker
 
-    def retrieve_documents(
+    @staticmethod
+    def _candidates(n_results: int, rerank: bool) -> int:
+        """Candidatos de la primera etapa: más si después se reordenan."""
+        return max(n_results, settings.RERANKER_CANDIDATES) if rerank else n_results
+
+    @staticmethod
+    def _resolve_mode(mode: Optional[str]) -> str:
+        mode = mode or settings.RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Modo de recuperación no válido: {mode}")
+        return mode
+
+    async def retrieve_documents(
         self,
         query: str,
         domain: str,
         n_results: int = 5,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None
     ) -> List[Dict]:
         """
         Recupera documentos relevantes para una consulta.
+
+        `mode` (por defecto RETRIEVAL_MODE) puede ser "vector" (embeddings),
+        "lexical" (BM25) o "hybrid" (ambas listas fusionadas con reciprocal
+        rank fusion). El umbral de similitud solo se aplica a los resultados
+        vectoriales: un acierto léxico es una coincidencia exacta de términos.
+
+        Con `rerank` (por defecto RERANKER_ENABLED) la primera etapa trae
+        RERANKER_CANDIDATES candidatos y el cross-encoder se queda con los
+        `n_results` más relevantes.
         """
         try:
             if domain not in self.vector_db.collections:
                 raise ValueError(f"Dominio no válido: {domain}")
+            mode = self._resolve_mode(mode)
+            rerank = settings.RERANKER_ENABLED if rerank is None else rerank
+            candidates = self._candidates(n_results, rerank)
 
-            results = self.vector_db.search(
-                query=query,
-                domain=domain,
-                n_results=n_results
-            )
-
-            # Procesamos los resultados
-            documents = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results["documents"],
-                results["metadatas"],
-                results["distances"]
-            )):
-                # Convertir distancia a similitud
-                similarity = 1 - (distance / np.sqrt(2))
-                
-                if similarity >= similarity_threshold:
-                    documents.append({
-                        'content': doc,
-                        'metadata': metadata,
-                        'similarity': float(similarity),
-                        'rank': i + 1
-                    })
+            if mode != "vector":
+                documents = (await self._retrieve_fused(
+                    query, [domain], {domain: candidates}, similarity_threshold, mode
+                ))[domain]
+            else:
+                results = await self.vector_db.search(
+                    query=query,
+                    domain=domain,
+                    n_results=candidates
+                )
+                documents = self._to_documents(results, domain, similarity_threshold)
 
+            if rerank:
+                documents = await self.reranker.rerank(query, documents, top_k=n_results)
             return documents
 
         except Exception as e:
             logger.error(f"Error recuperando documentos: {str(e)}")
             raise
 
-    def retrieve_multi_domain(
+    def _to_documents(self, results: Dict, domain: str, similarity_threshold: float) -> List[Dict]:
+        """
+        Convierte un resultado de VectorDB en documentos con su similitud,
+        según el espacio del índice del dominio, descartando los que no
+        llegan al umbral.
+        """
+        space = self.vector_db.get_index_config(domain).space
+        documents = []
+        for i, (doc_id, doc, metadata, distance) in enumerate(zip(
+            results["ids"],
+            results["documents"],
+            results["metadatas"],
+            results["distances"]
+        )):
+            similarity = distance_to_similarity(distance, space)
+
+            if similarity >= similarity_threshold:
+                documents.append({
+                    'id': doc_id,
+                    'content': doc,
+                    'metadata': metadata,
+                    'similarity': float(similarity),
+                    'rank': i + 1
+                })
+
+        return documents
+
+    async def retrieve_multi_domain(
         self,
         query: str,
         domains: Optional[List[str]] = None,
-        n_results: int = 3
+        n_results: Union[int, Dict[str, int]] = 3,
+        similarity_threshold: float = 0.7,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None
     ) -> Dict[str, List[Dict]]:
         """
-        Recupera documentos de múltiples dominios.
+        Recupera documentos de múltiples dominios con una sola búsqueda
+        (VectorDB.search_multi_domain). `n_results` es la cuota por dominio.
+        Con `rerank`, los candidatos de todos los dominios se reordenan en
+        una sola pasada del cross-encoder, con un único presupuesto de tiempo.
         """
         if domains is None:
-            domains = list(self.vector_db.collections.keys())
+            domains = list(n_results) if isinstance(n_results, dict) else list(self.vector_db.collections)
+        quotas = n_results if isinstance(n_results, dict) else dict.fromkeys(domains, n_results)
+        mode = self._resolve_mode(mode)
+        rerank = settings.RERANKER_ENABLED if rerank is None else rerank
+        candidates = {domain: self._candidates(quota, rerank) for domain, quota in quotas.items()}
 
-        results = {}
-        for domain in domains:
-            try:
-                domain_docs = self.retrieve_documents(
+        try:
+            if mode != "vector":
+                documents = await self._retrieve_fused(query, domains, candidates, similarity_threshold, mode)
+            else:
+                results = await self.vector_db.search_multi_domain(
                     query=query,
-                    domain=domain,
-                    n_results=n_results
+                    domains=domains,
+                    n_results=candidates
                 )
-                results[domain] = domain_docs
-            except Exception as e:
-                logger.error(f"Error en dominio {domain}: {str(e)}")
-                results[domain] = []
+                documents = {
+                    domain: self._to_documents(domain_results, domain, similarity_threshold)
+                    for domain, domain_results in results.items()
+                }
+        except Exception as e:
+            logger.error(f"Error en búsqueda multidominio: {str(e)}")
+            return {domain: [] for domain in domains}
+
+        if rerank:
+            documents = await self.reranker.rerank_groups(query, documents, quotas)
+        return documents
+
+    async def _retrieve_fused(
+        self,
+        query: str,
+        domains: List[str],
+        quotas: Dict[str, int],
+        similarity_threshold: float,
+        mode: str
+    ) -> Dict[str, List[Dict]]:
+        """Recuperación léxica, o híbrida con ambas búsquedas en paralelo."""
+        if mode == "hybrid":
+            dense_results, lexical_results = await asyncio.gather(
+                self.vector_db.search_multi_domain(query, domains, quotas),
+                self.vector_db.search_lexical(query, domains, quotas)
+            )
+        else:
+            dense_results = {}
+            lexical_results = await self.vector_db.search_lexical(query, domains, quotas)
+
+        documents = {}
+        for domain in domains:
+            dense = self._to_documents(dense_results[domain], domain, similarity_threshold) \
+                if domain in dense_results else []
+            documents[domain] = await self._fuse(domain, dense, lexical_results[domain], quotas.get(domain, 0))
+        return documents
+
+    async def _fuse(
+        self,
+        domain: str,
+        dense: List[Dict],
+        lexical: List[Dict],
+        n_results: int
+    ) -> List[Dict]:
+        dense_by_id = {document['id']: document for document in dense}
+        lexical_by_id = {hit['id']: hit for hit in lexical}
+        fused = reciprocal_rank_fusion(
+            [list(dense_by_id), list(lexical_by_id)],
+            k=settings.RETRIEVAL_RRF_K
+        )[:n_results]
+
+        # Los aciertos solo léxicos no traen metadatos del índice vectorial
+        lexical_only = [doc_id for doc_id, _ in fused if doc_id not in dense_by_id]
+        metadatas = await self.vector_db.get_metadatas(lexical_only, domain) if lexical_only else {}
 
-        return results
+        documents = []
+        for rank, (doc_id, score) in enumerate(fused, 1):
+            document = dict(dense_by_id.get(doc_id) or {
+                'id': doc_id,
+                'content': lexical_by_id[doc_id]['document'],
+                'metadata': metadatas.get(doc_id),
+                'similarity': None
+            })
+            document['rank'] = rank
+            document['score'] = score
+            document['sources'] = [
+                source for source, ids in (("vector", dense_by_id), ("lexical", lexical_by_id))
+                if doc_id in ids
+            ]
+            if doc_id in lexical_by_id:
+                document['bm25'] = lexical_by_id[doc_id]['score']
+            documents.append(document)
+        return documents
 
     def get_document_by_id(self, document_id: str, domain: str) -> Optional[Dict]:
         """
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import threading
+import time
+import numpy as np
+from src.utils.batching import length_sorted_batches
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CrossEncoderReranker:
+    """
+    Segunda etapa de recuperación: puntúa cada par (consulta, fragmento) con
+    un cross-encoder y reordena los candidatos de la primera etapa.
+
+    La inferencia va en lotes ordenados por longitud en CPU. Cada petición
+    tiene un presupuesto de tiempo; si se agota antes de puntuar todos los
+    candidatos se conserva el orden de la primera etapa. El modelo se carga
+    la primera vez que se usa.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_length: int = 256,
+        time_budget: Optional[float] = None
+    ):
+        self.model_name = model_name or settings.RERANKER_MODEL
+        self.batch_size = batch_size or settings.RERANKER_BATCH_SIZE
+        self.max_length = max_length
+        self.time_budget = settings.RERANKER_TIME_BUDGET if time_budget is None else time_budget
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._counters = {"reranked": 0, "budget_exceeded": 0, "errors": 0}
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from transformers import AutoModelForSequenceClassification, AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+                logger.info(f"Cross-encoder cargado: {self.model_name}")
+        return self._tokenizer, self._model
+
+    def score(
+        self,
+        query: str,
+        passages: List[str],
+        deadline: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Relevancia de cada fragmento para la consulta (mayor es mejor).
+        Devuelve None si `deadline` (time.monotonic) vence entre dos lotes.
+        """
+        import torch
+
+        tokenizer, model = self._load()
+        scores = np.empty(len(passages), dtype=np.float32)
+        if not passages:
+            return scores
+
+        encodings = tokenizer(
+            [query] * len(passages),
+            list(passages),
+            truncation="only_second",
+            max_length=self.max_length
+        )
+        for indices, batch in length_sorted_batches(tokenizer, encodings, self.batch_size, return_tensors="pt"):
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            with torch.inference_mode():
+                logits = model(**batch).logits
+            # Un solo logit: relevancia; dos o más: probabilidad de la clase "relevante"
+            batch_scores = logits[:, 0] if logits.shape[1] == 1 else logits.softmax(-1)[:, -1]
+            scores[indices] = batch_scores.float().numpy()
+
+        return scores
+
+    async def rerank(
+        self,
+        query: str,
+        documents: List[Dict],
+        top_k: Optional[int] = None,
+        time_budget: Optional[float] = None
+    ) -> List[Dict]:
+        """Reordena los documentos de un dominio (ver rerank_groups)."""
+        reranked = await self.rerank_groups(query, {"_": documents}, {"_": top_k or len(documents)}, time_budget)
+        return reranked["_"]
+
+    async def rerank_groups(
+        self,
+        query: str,
+        groups: Dict[str, List[Dict]],
+        top_k: Dict[str, int],
+        time_budget: Optional[float] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Reordena los documentos de varios dominios con una sola pasada del
+        cross-encoder y devuelve los `top_k[dominio]` mejores de cada uno,
+        con 'rerank_score' y 'rank' actualizados.
+
+        Si el presupuesto de tiempo se agota o el modelo falla, cada dominio
+        conserva el orden de la primera etapa (recortado a su top_k).
+        """
+        budget = self.time_budget if time_budget is None else time_budget
+        flat = [(domain, document) for domain, documents in groups.items() for document in documents]
+        if not flat:
+            return {domain: [] for domain in groups}
+
+        scores = None
+        try:
+            deadline = time.monotonic() + budget
+            scores = await asyncio.wait_for(
+                asyncio.to_thread(self.score, query, [document.get('content') or "" for _, document in flat], deadline),
+                timeout=budget
+            )
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            self._counters["errors"] += 1
+            logger.error(f"Error en el reranking: {str(e)}")
+            return {domain: documents[:top_k.get(domain, len(documents))] for domain, documents in groups.items()}
+
+        if scores is None:
+            self._counters["budget_exceeded"] += 1
+            logger.warning(f"Presupuesto de reranking agotado ({budget}s): se mantiene el orden inicial")
+            return {domain: documents[:top_k.get(domain, len(documents))] for domain, documents in groups.items()}
+
+        self._counters["reranked"] += 1
+        scored: Dict[str, List[Dict]] = {domain: [] for domain in groups}
+        for (domain, document), score in zip(flat, scores):
+            scored[domain].append({**document, 'rerank_score': float(score)})
+
+        results = {}
+        for domain, documents in scored.items():
+            # sort estable: a igual puntuación se mantiene el orden inicial
+            documents.sort(key=lambda document: document['rerank_score'], reverse=True)
+            documents = documents[:top_k.get(domain, len(documents))]
+            for rank, document in enumerate(documents, 1):
+                document['rank'] = rank
+            results[domain] = documents
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._counters)
+
+_shared_reranker: Optional[CrossEncoderReranker] = None
+
+def get_reranker() -> CrossEncoderReranker:
+    """Devuelve el reranker compartido del proceso."""
+    global _shared_reranker
+    if _shared_reranker is None:
+        _shared_reranker = CrossEncoderReranker()
+    return _shared_reranker
@@ -0,0 +1,228 @@
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import json
+import logging
+import time
+import numpy as np
+from src.rag.vector_store.vector_db import VectorDB
+
+logger = logging.getLogger(__name__)
+
+def pairwise_distances(queries: np.ndarray, vectors: np.ndarray, space: str) -> np.ndarray:
+    """Distancias con la misma definición que Chroma para cada espacio."""
+    if space == "l2":
+        # Chroma devuelve la distancia L2 al cuadrado
+        return (
+            np.sum(queries ** 2, axis=1)[:, None]
+            - 2 * queries @ vectors.T
+            + np.sum(vectors ** 2, axis=1)[None, :]
+        )
+    if space == "cosine":
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return 1 - queries @ vectors.T
+    if space == "ip":
+        return 1 - queries @ vectors.T
+    raise ValueError(f"Espacio no soportado: {space}")
+
+def exact_search(
+    vector_db: VectorDB,
+    domain: str,
+    queries: np.ndarray,
+    k: int,
+    batch_size: int = 10000
+) -> List[List[str]]:
+    """
+    Vecinos exactos de cada consulta por fuerza bruta. La colección se
+    recorre por páginas conservando solo los k mejores de cada consulta,
+    así que la memoria no depende del tamaño de la colección.
+    """
+    space = vector_db.get_index_config(domain).space
+    best_ids = np.empty((len(queries), 0), dtype=object)
+    best_distances = np.empty((len(queries), 0), dtype=np.float64)
+
+    for page in vector_db.iter_collection(domain, batch_size, include=["embeddings"]):
+        distances = pairwise_distances(queries, np.asarray(page["embeddings"], dtype=np.float64), space)
+        ids = np.broadcast_to(np.asarray(page["ids"], dtype=object), distances.shape)
+        best_distances = np.concatenate([best_distances, distances], axis=1)
+        best_ids = np.concatenate([best_ids, ids], axis=1)
+        if best_distances.shape[1] > k:
+            keep = np.argpartition(best_distances, k - 1, axis=1)[:, :k]
+            best_distances = np.take_along_axis(best_distances, keep, axis=1)
+            best_ids = np.take_along_axis(best_ids, keep, axis=1)
+
+    order = np.argsort(best_distances, axis=1)
+    return np.take_along_axis(best_ids, order, axis=1).tolist()
+
+def sample_queries(
+    vector_db: VectorDB,
+    domain: str,
+    n_queries: int,
+    noise: float = 0.05,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Consultas sintéticas: embeddings de la colección elegidos al azar con
+    ruido gaussiano (relativo a su norma), para que no coincidan exactamente
+    con un elemento indexado.
+    """
+    queries = vector_db.sample_embeddings(domain, n_queries, seed=seed)
+    if len(queries) == 0:
+        raise ValueError(f"La colección de {domain} está vacía")
+    rng = np.random.default_rng(seed + 1)
+    scale = noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+    return (queries + rng.normal(size=queries.shape) * scale).astype(np.float32)
+
+def recall_at_k(approximate: Sequence[Sequence[str]], exact: Sequence[Sequence[str]]) -> float:
+    """Fracción media de los vecinos exactos que devuelve el índice."""
+    hits = [len(set(found) & set(truth)) / len(truth) for found, truth in zip(approximate, exact) if truth]
+    return float(np.mean(hits)) if hits else 0.0
+
+def benchmark_index(
+    vector_db: VectorDB,
+    domain: str,
+    search_efs: Sequence[int] = (10, 20, 50, 100, 200),
+    k: int = 10,
+    n_queries: int = 100,
+    queries: Optional[np.ndarray] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Mide recall@k y latencia por consulta del índice de `domain` para cada
+    valor de search_ef, tomando la búsqueda exacta como referencia. Al
+    terminar se restaura el search_ef que tenía la colección.
+    """
+    if queries is None:
+        queries = sample_queries(vector_db, domain, n_queries, seed=seed)
+    queries = np.asarray(queries, dtype=np.float32)
+    collection = vector_db.collections[domain]
+
+    started = time.perf_counter()
+    exact = exact_search(vector_db, domain, queries, k)
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    original_ef = vector_db.get_index_config(domain).search_ef
+    rows = []
+    try:
+        for search_ef in search_efs:
+            vector_db.set_search_ef(domain, search_ef)
+            found = []
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                result = collection.query(query_embeddings=[query], n_results=k, include=[])
+                latencies.append((time.perf_counter() - started) * 1000)
+                found.append(result["ids"][0])
+            rows.append({
+                "search_ef": search_ef,
+                "recall": round(recall_at_k(found, exact), 4),
+                "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+                "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3)
+            })
+    finally:
+        vector_db.set_search_ef(domain, original_ef)
+
+    return {
+        "domain": domain,
+        "count": collection.count(),
+        "k": k,
+        "queries": len(queries),
+        "index": vector_db.get_index_config(domain).model_dump(),
+        "exact_latency_ms": round(exact_ms, 3),
+        "results": rows
+    }
+
+def benchmark_compact(
+    vector_db: VectorDB,
+    domain: str,
+    candidates: Sequence[int] = (0, 20, 50, 100),
+    k: int = 10,
+    n_queries: int = 100,
+    queries: Optional[np.ndarray] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Memoria y recall@k del almacén cuantizado de `domain` (modo compacto)
+    frente a la búsqueda exacta en float32, para cada número de candidatos
+    que se vuelven a puntuar (0 = solo distancias int8, sin releer disco).
+    """
+    if not vector_db.compact:
+        raise ValueError("benchmark_compact requiere VectorDB en modo compacto")
+    store = vector_db.compact_store(domain)
+    if queries is None:
+        queries = sample_queries(vector_db, domain, n_queries, seed=seed)
+    queries = np.asarray(queries, dtype=np.float32)
+
+    started = time.perf_counter()
+    exact = exact_search(vector_db, domain, queries, k)
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    rows = []
+    for candidate_count in candidates:
+        found = []
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            result = store.search(
+                query,
+                n_results=k,
+                candidates=candidate_count or None,
+                rescore=candidate_count > 0
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            found.append(result["ids"])
+        rows.append({
+            "rescore_candidates": candidate_count,
+            "recall": round(recall_at_k(found, exact), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3)
+        })
+
+    return {
+        "domain": domain,
+        "count": store.count(),
+        "k": k,
+        "queries": len(queries),
+        "memory": store.memory_usage(),
+        "exact_latency_ms": round(exact_ms, 3),
+        "results": rows
+    }
+
+if __name__ == "__main__":
+    # python -m src.rag.vector_store.index_benchmark medical --ef 10 50 100 -k 10
+    # python -m src.rag.vector_store.index_benchmark medical --compact --candidates 0 20 50 --output informe.json
+    parser = argparse.ArgumentParser(description="Recall vs latencia del índice vectorial de un dominio")
+    parser.add_argument("domain")
+    parser.add_argument("--ef", type=int, nargs="+", default=[10, 20, 50, 100, 200])
+    parser.add_argument("--compact", action="store_true", help="Medir el almacén cuantizado int8")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[0, 20, 50, 100])
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--persist-directory", default="data/chroma_db")
+    parser.add_argument("--output", help="Fichero JSON para el informe (por defecto, al log)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.compact:
+        report = benchmark_compact(
+            VectorDB(args.persist_directory, compact=True),
+            args.domain,
+            candidates=args.candidates,
+            k=args.k,
+            n_queries=args.queries
+        )
+    else:
+        report = benchmark_index(
+            VectorDB(args.persist_directory, compact=False),
+            args.domain,
+            search_efs=args.ef,
+            k=args.k,
+            n_queries=args.queries
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2, ensure_ascii=False)
+        logger.info(f"Informe del benchmark guardado en {args.output}")
+    else:
+        logger.info(json.dumps(report, indent=2, ensure_ascii=False))
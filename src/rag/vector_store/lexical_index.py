@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, List, Sequence, Tuple
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Términos de consulta: palabras y códigos con guiones (CAS 7732-18-5, IL-6)
+_TERM_PATTERN = re.compile(r"\w+(?:-\w+)*")
+
+def query_terms(query: str) -> List[str]:
+    """Términos distintos de una consulta, en minúsculas y en orden de aparición."""
+    return list(dict.fromkeys(term.lower() for term in _TERM_PATTERN.findall(query)))
+
+class LexicalIndex:
+    """
+    Índice invertido BM25 de los fragmentos de cada dominio.
+
+    Cada dominio tiene una tabla FTS5 de SQLite (índice invertido con
+    ranking bm25) y una tabla que relaciona el id del documento en VectorDB
+    con la fila FTS. El tokenizador ignora mayúsculas y tildes y conserva
+    los guiones dentro de un término, de modo que números CAS, símbolos de
+    genes o nombres de fármacos se buscan como términos exactos. Se
+    actualiza al añadir o eliminar documentos, sin reconstrucciones.
+    """
+
+    def __init__(self, path: str, domains: Iterable[str]):
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.domains = list(domains)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            for domain in self.domains:
+                self._connection.execute(
+                    f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {self._table(domain)} USING fts5(
+                        content,
+                        tokenize="unicode61 remove_diacritics 2 tokenchars '-'"
+                    )
+                    """
+                )
+                self._connection.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self._table(domain)}_ids (
+                        rowid INTEGER PRIMARY KEY,
+                        doc_id TEXT NOT NULL UNIQUE
+                    )
+                    """
+                )
+            self._connection.commit()
+
+    def _table(self, domain: str) -> str:
+        if domain not in self.domains:
+            raise ValueError(f"Dominio no válido: {domain}")
+        return f"lexical_{domain}"
+
+    def add(self, domain: str, ids: Sequence[str], texts: Sequence[str]):
+        """Indexa (o reindexa, si el id ya existe) los textos de un dominio."""
+        table = self._table(domain)
+        with self._lock:
+            self._delete(table, ids)
+            for doc_id, text in zip(ids, texts):
+                cursor = self._connection.execute(
+                    f"INSERT INTO {table}_ids (doc_id) VALUES (?)", (doc_id,)
+                )
+                self._connection.execute(
+                    f"INSERT INTO {table} (rowid, content) VALUES (?, ?)",
+                    (cursor.lastrowid, text or "")
+                )
+            self._connection.commit()
+
+    def delete(self, domain: str, ids: Sequence[str]):
+        table = self._table(domain)
+        with self._lock:
+            self._delete(table, ids)
+            self._connection.commit()
+
+    def _delete(self, table: str, ids: Sequence[str]):
+        for doc_id in ids:
+            row = self._connection.execute(
+                f"SELECT rowid FROM {table}_ids WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(f"DELETE FROM {table} WHERE rowid = ?", row)
+                self._connection.execute(f"DELETE FROM {table}_ids WHERE rowid = ?", row)
+
+    def search(self, query: str, domain: str, n_results: int = 10) -> List[Tuple[str, float, str]]:
+        """
+        Documentos que contienen algún término de la consulta, ordenados por
+        BM25. Devuelve (id, puntuación, contenido); mayor puntuación es mejor.
+        """
+        table = self._table(domain)
+        terms = query_terms(query)
+        if not terms or n_results <= 0:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._connection.execute(
+                f"""
+                SELECT ids.doc_id, bm25({table}) AS score, {table}.content
+                FROM {table} JOIN {table}_ids AS ids ON ids.rowid = {table}.rowid
+                WHERE {table} MATCH ?
+                ORDER BY score
+                LIMIT ?
+                """,
+                (match, n_results)
+            ).fetchall()
+        # FTS5 devuelve bm25 negativo (menor es mejor)
+        return [(doc_id, -score, content) for doc_id, score, content in rows]
+
+    def search_many(
+        self,
+        query: str,
+        domains: Sequence[str],
+        n_results: Dict[str, int]
+    ) -> Dict[str, List[Tuple[str, float, str]]]:
+        return {domain: self.search(query, domain, n_results.get(domain, 0)) for domain in domains}
+
+    def count(self, domain: str) -> int:
+        table = self._table(domain)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM {table}_ids").fetchone()[0]
+
+    def clear(self, domain: str):
+        table = self._table(domain)
+        with self._lock:
+            self._connection.execute(f"DELETE FROM {table}")
+            self._connection.execute(f"DELETE FROM {table}_ids")
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,486 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import numpy as np
+from src.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Filas que se decuantizan a la vez al calcular las puntuaciones aproximadas
+SCAN_CHUNK_ROWS = 16384
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cuantización escalar int8 simétrica por vector: codes * scale ≈ vector.
+    Devuelve (codes int8, scales float32).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def distances(query: np.ndarray, dots: np.ndarray, norms: np.ndarray, space: str) -> np.ndarray:
+    """Distancias a partir de productos escalares y normas, como las define Chroma."""
+    query_norm = float(np.linalg.norm(query))
+    if space == "l2":
+        return query_norm ** 2 - 2 * dots + norms ** 2
+    if space == "cosine":
+        return 1 - dots / np.maximum(query_norm * norms, 1e-12)
+    if space == "ip":
+        return 1 - dots
+    raise ValueError(f"Espacio no soportado: {space}")
+
+def matches_filter(metadata: Optional[Dict[str, Any]], where: Dict[str, Any]) -> bool:
+    """Evalúa un filtro de metadatos con la sintaxis `where` de Chroma."""
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            for operator, expected in condition.items():
+                if not _compare(metadata.get(key), operator, expected):
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+def _compare(value: Any, operator: str, expected: Any) -> bool:
+    if operator == "$eq":
+        return value == expected
+    if operator == "$ne":
+        return value != expected
+    if operator == "$in":
+        return value in expected
+    if operator == "$nin":
+        return value not in expected
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > expected
+    if operator == "$gte":
+        return value >= expected
+    if operator == "$lt":
+        return value < expected
+    if operator == "$lte":
+        return value <= expected
+    raise ValueError(f"Operador de filtro no soportado: {operator}")
+
+class QuantizedVectorStore:
+    """
+    Almacén compacto de los embeddings de un dominio.
+
+    En memoria solo viven los códigos int8 de cada vector con su escala y
+    su norma (dimension + 9 bytes por vector, frente a 4 * dimension en
+    float32), más el id de cada fila. Los vectores float32 completos quedan en disco (`vectors.f32`,
+    leído con memmap) y se usan para volver a puntuar de forma exacta los
+    mejores candidatos de la búsqueda aproximada. Ids, textos y metadatos
+    se guardan en SQLite (`records.sqlite3`).
+
+    Los borrados solo marcan la fila; compact() reescribe el almacén sin
+    ellas.
+    """
+
+    def __init__(self, directory: str, space: str = "l2"):
+        self.directory = directory.rstrip(os.sep)
+        self.space = space
+        self._lock = threading.RLock()
+        self._recover()
+        os.makedirs(self.directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self._connection = sqlite3.connect(self._path("records.sqlite3"), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                row INTEGER PRIMARY KEY,
+                doc_id TEXT UNIQUE,
+                document TEXT,
+                metadata TEXT
+            )
+            """
+        )
+        self._connection.commit()
+        self._load()
+
+    def _recover(self):
+        """
+        Termina o deshace una compactación interrumpida. El directorio de
+        staging solo se mueve a su sitio cuando está completo, así que si
+        falta el directorio principal la copia buena es staging o, si aún
+        no existía, la antigua.
+        """
+        staging, previous = f"{self.directory}.compacting", f"{self.directory}.previous"
+        if not os.path.exists(self.directory):
+            if os.path.exists(previous) and os.path.exists(f"{staging}.done"):
+                os.replace(staging, self.directory)
+            elif os.path.exists(previous):
+                os.replace(previous, self.directory)
+        for leftover in (staging, previous):
+            if os.path.exists(leftover):
+                shutil.rmtree(leftover)
+        if os.path.exists(f"{staging}.done"):
+            os.remove(f"{staging}.done")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        """Carga en memoria los códigos, escalas, normas e ids persistidos."""
+        rows = self._connection.execute("SELECT row, doc_id FROM records ORDER BY row").fetchall()
+        self.size = rows[-1][0] + 1 if rows else 0
+        self.dimension = 0
+        self._ids: List[Optional[str]] = [None] * self.size
+        for row, doc_id in rows:
+            self._ids[row] = doc_id
+        self._rows = {doc_id: row for row, doc_id in rows if doc_id is not None}
+
+        if self.size and os.path.exists(self._path("vectors.f32")):
+            self.dimension = os.path.getsize(self._path("vectors.f32")) // 4 // max(self._file_rows(), 1)
+        if self.dimension:
+            # Descartar filas escritas en disco pero no confirmadas en SQLite
+            for name, itemsize in (("vectors.f32", 4 * self.dimension), ("codes.i8", self.dimension),
+                                   ("scales.f32", 4), ("norms.f32", 4)):
+                with open(self._path(name), "r+b") as data_file:
+                    data_file.truncate(self.size * itemsize)
+            self._codes = np.fromfile(self._path("codes.i8"), dtype=np.int8).reshape(self.size, self.dimension)
+            self._scales = np.fromfile(self._path("scales.f32"), dtype=np.float32)
+            self._norms = np.fromfile(self._path("norms.f32"), dtype=np.float32)
+        else:
+            self.size = 0
+            self._ids = []
+            self._codes = np.empty((0, 0), dtype=np.int8)
+            self._scales = np.empty(0, dtype=np.float32)
+            self._norms = np.empty(0, dtype=np.float32)
+        self._live = np.array([doc_id is not None for doc_id in self._ids], dtype=bool)
+        self._vectors: Optional[np.memmap] = None
+
+    def _file_rows(self) -> int:
+        """Filas completas en scales.f32 (una escala float32 por fila)."""
+        path = self._path("scales.f32")
+        return os.path.getsize(path) // 4 if os.path.exists(path) else 0
+
+    def _full_vectors(self) -> np.ndarray:
+        if self._vectors is None or self._vectors.shape[0] != self.size:
+            self._vectors = np.memmap(
+                self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(self.size, self.dimension)
+            )
+        return self._vectors
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Optional[Sequence[str]] = None,
+        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+    ):
+        """
+        Añade (o sustituye, si el id ya existe) vectores con su texto y
+        metadatos. Si algo falla no queda nada a medias: se deshace la
+        transacción de SQLite y se recortan los ficheros de datos.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("Se esperaba un embedding por id")
+        if len(set(ids)) != len(ids):
+            raise ValueError("Ids duplicados en el lote")
+        if self.dimension and vectors.shape[1] != self.dimension:
+            raise ValueError(f"Dimensión {vectors.shape[1]} distinta de la del almacén ({self.dimension})")
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        codes, scales = quantize(vectors)
+        norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        dimension = vectors.shape[1]
+
+        with self._lock:
+            start = self.size
+            try:
+                replaced = self._delete_records(ids)
+                self._connection.executemany(
+                    "INSERT INTO records (row, doc_id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (start + i, doc_id, document, json.dumps(metadata) if metadata is not None else None)
+                        for i, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                    ]
+                )
+                # Los ficheros se escriben antes de confirmar: al cargar se
+                # descartan las filas que SQLite no llegó a registrar
+                for name, data in (("vectors.f32", vectors), ("codes.i8", codes),
+                                   ("scales.f32", scales), ("norms.f32", norms)):
+                    with open(self._path(name), "ab") as data_file:
+                        data_file.write(np.ascontiguousarray(data).tobytes())
+                self._connection.commit()
+            except Exception:
+                self._connection.rollback()
+                self._truncate_files(start, dimension)
+                raise
+
+            self._forget(replaced)
+            self.dimension = dimension
+            self._reserve(start + len(ids))
+            end = start + len(ids)
+            self._codes[start:end] = codes
+            self._scales[start:end] = scales
+            self._norms[start:end] = norms
+            self._live[start:end] = True
+            for i, doc_id in enumerate(ids):
+                self._ids.append(doc_id)
+                self._rows[doc_id] = start + i
+            self.size += len(ids)
+
+    def _truncate_files(self, rows: int, dimension: int):
+        """Recorta los ficheros de datos a `rows` filas."""
+        for name, itemsize in (("vectors.f32", 4 * dimension), ("codes.i8", dimension),
+                               ("scales.f32", 4), ("norms.f32", 4)):
+            if os.path.exists(self._path(name)):
+                with open(self._path(name), "r+b") as data_file:
+                    data_file.truncate(rows * itemsize)
+
+    def _reserve(self, rows: int):
+        """Amplía los búferes en memoria (al doble) para que quepan `rows` filas."""
+        capacity = len(self._scales)
+        if rows <= capacity and self._codes.shape[1] == self.dimension:
+            return
+        capacity = max(rows, 2 * capacity, 1024)
+        codes = np.zeros((capacity, self.dimension), dtype=np.int8)
+        codes[:self.size] = self._codes[:self.size].reshape(-1, self.dimension)
+        self._codes = codes
+        for name, dtype in (("_scales", np.float32), ("_norms", np.float32), ("_live", bool)):
+            buffer = np.zeros(capacity, dtype=dtype)
+            buffer[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, buffer)
+
+    def delete(self, ids: Sequence[str]):
+        with self._lock:
+            try:
+                rows = self._delete_records(ids)
+                self._connection.commit()
+            except Exception:
+                self._connection.rollback()
+                raise
+            self._forget(rows)
+
+    def _delete_records(self, ids: Sequence[str]) -> List[int]:
+        """Marca en SQLite (sin confirmar) las filas de `ids` como borradas."""
+        rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+        self._connection.executemany("UPDATE records SET doc_id = NULL WHERE row = ?", [(row,) for row in rows])
+        return rows
+
+    def _forget(self, rows: Sequence[int]):
+        """Quita de memoria las filas ya borradas en SQLite."""
+        for row in rows:
+            self._rows.pop(self._ids[row], None)
+            self._live[row] = False
+            self._ids[row] = None
+
+    def search(
+        self,
+        query: Sequence[float],
+        n_results: int = 5,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidates: Optional[int] = None,
+        rescore: bool = True
+    ) -> Dict[str, List]:
+        """
+        Busca los `n_results` vecinos más cercanos de `query`.
+
+        Las distancias aproximadas se calculan sobre los códigos int8; los
+        `candidates` mejores (por defecto VECTOR_COMPACT_RESCORE_CANDIDATES)
+        se vuelven a puntuar con los vectores float32 de disco. Con
+        `metadata_filter` (sintaxis where de Chroma) se leen los metadatos
+        de SQLite para acotar las filas. Devuelve el formato de
+        VectorDB.search.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        with self._lock:
+            size = self.size
+            live = self._live[:size].copy()
+            if metadata_filter:
+                live &= self._filter_mask(metadata_filter, size)
+            alive = int(live.sum())
+            if alive == 0 or n_results <= 0:
+                return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            codes, scales, norms = self._codes[:size], self._scales[:size], self._norms[:size]
+
+            dots = np.empty(size, dtype=np.float32)
+            for start in range(0, size, SCAN_CHUNK_ROWS):
+                chunk = codes[start:start + SCAN_CHUNK_ROWS].astype(np.float32)
+                dots[start:start + len(chunk)] = (chunk @ query) * scales[start:start + len(chunk)]
+            approximate = distances(query, dots, norms, self.space)
+            approximate[~live] = np.inf
+
+            candidates = max(n_results, candidates or settings.VECTOR_COMPACT_RESCORE_CANDIDATES) \
+                if rescore else n_results
+            candidates = min(candidates, alive)
+            rows = np.argpartition(approximate, candidates - 1)[:candidates]
+
+            if rescore:
+                rows = np.sort(rows)  # Lectura secuencial del memmap
+                full = np.asarray(self._full_vectors()[rows])
+                scores = distances(query, full @ query, norms[rows], self.space)
+            else:
+                scores = approximate[rows]
+            order = np.argsort(scores, kind="stable")[:n_results]
+            rows, scores = rows[order], scores[order]
+            records = self._records(rows)
+
+        return {
+            "ids": [self._ids[row] for row in rows],
+            "documents": [records[row][0] for row in rows],
+            "metadatas": [records[row][1] for row in rows],
+            "distances": [float(score) for score in scores]
+        }
+
+    def _filter_mask(self, metadata_filter: Dict[str, Any], size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        for row, metadata in self._connection.execute(
+            "SELECT row, metadata FROM records WHERE doc_id IS NOT NULL"
+        ):
+            if row < size and matches_filter(json.loads(metadata) if metadata else None, metadata_filter):
+                mask[row] = True
+        return mask
+
+    def _records(self, rows: Sequence[int]) -> Dict[int, Tuple[Optional[str], Optional[Dict]]]:
+        rows = [int(row) for row in rows]
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        return {
+            row: (document, json.loads(metadata) if metadata else None)
+            for row, document, metadata in self._connection.execute(
+                f"SELECT row, document, metadata FROM records WHERE row IN ({placeholders})", rows
+            )
+        }
+
+    def get_metadatas(self, ids: Sequence[str]) -> Dict[str, Optional[Dict]]:
+        with self._lock:
+            rows = [self._rows[doc_id] for doc_id in ids if doc_id in self._rows]
+            records = self._records(rows)
+            return {self._ids[row]: records[row][1] for row in rows}
+
+    def iter_pages(self, batch_size: int = 1000, include: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre los elementos vivos por páginas, con el formato de collection.get."""
+        include = include or ["embeddings", "documents", "metadatas"]
+        with self._lock:
+            live_rows = np.flatnonzero(self._live[:self.size])
+        for start in range(0, len(live_rows), batch_size):
+            rows = live_rows[start:start + batch_size]
+            with self._lock:
+                page: Dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+                if "embeddings" in include:
+                    page["embeddings"] = np.asarray(self._full_vectors()[rows])
+                if "documents" in include or "metadatas" in include:
+                    records = self._records(rows)
+                    page["documents"] = [records[row][0] for row in rows]
+                    page["metadatas"] = [records[row][1] for row in rows]
+            yield page
+
+    def sample_vectors(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Vectores float32 de `n` elementos vivos elegidos al azar."""
+        with self._lock:
+            live_rows = np.flatnonzero(self._live[:self.size])
+            if not len(live_rows):
+                return np.empty((0, self.dimension), dtype=np.float32)
+            rows = np.sort(rng.choice(live_rows, size=min(n, len(live_rows)), replace=False))
+            return np.asarray(self._full_vectors()[rows])
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM records")
+            self._connection.commit()
+            for name in ("vectors.f32", "codes.i8", "scales.f32", "norms.f32"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._vectors = None
+            self._load()
+
+    def compact(self, batch_size: int = 10000) -> int:
+        """
+        Reescribe el almacén sin las filas eliminadas. Devuelve las filas vivas.
+
+        Las páginas se copian una a una a un directorio de staging (nunca hay
+        más de `batch_size` vectores float32 en memoria), que sustituye al
+        actual cuando está completo; ver _recover para las interrupciones.
+        """
+        staging_dir, previous_dir = f"{self.directory}.compacting", f"{self.directory}.previous"
+        with self._lock:
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir)
+            staging = QuantizedVectorStore(staging_dir, self.space)
+            try:
+                for page in self.iter_pages(batch_size):
+                    staging.add(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+            finally:
+                staging.close()
+            # Marca de staging completo, necesaria para recuperar tras un fallo
+            open(f"{staging_dir}.done", "w").close()
+
+            self.close()
+            os.replace(self.directory, previous_dir)
+            os.replace(staging_dir, self.directory)
+            os.remove(f"{staging_dir}.done")
+            shutil.rmtree(previous_dir)
+            self._open()
+            return self.count()
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Bytes en memoria del almacén: el índice cuantizado (códigos, escala,
+        norma y marca de cada fila; `reserved_bytes` incluye la holgura de
+        los búferes) más la tabla de ids en Python (`id_bytes`). Se compara
+        con lo que ocuparían los mismos vectores en float32 y se añaden los
+        bytes en disco.
+        """
+        row_bytes = self._codes.itemsize * self.dimension + self._scales.itemsize \
+            + self._norms.itemsize + self._live.itemsize
+        # Cada id vivo está en _ids y como clave de _rows: el str se cuenta una vez
+        id_bytes = sys.getsizeof(self._ids) + sys.getsizeof(self._rows) + sum(
+            sys.getsizeof(doc_id) + sys.getsizeof(row) for doc_id, row in self._rows.items()
+        )
+        ram = self.size * row_bytes + id_bytes
+        float32 = self.size * self.dimension * 4
+        return {
+            "vectors": self.count(),
+            "rows": self.size,
+            "dimension": self.dimension,
+            "ram_bytes": int(ram),
+            "id_bytes": int(id_bytes),
+            "reserved_bytes": int(self._codes.nbytes + self._scales.nbytes + self._norms.nbytes
+                                  + self._live.nbytes + id_bytes),
+            "float32_bytes": int(float32),
+            "compression": round(float32 / ram, 2) if self.size else None,
+            "disk_bytes": sum(
+                os.path.getsize(self._path(name))
+                for name in ("vectors.f32", "codes.i8", "scales.f32", "norms.f32", "records.sqlite3")
+                if os.path.exists(self._path(name))
+            )
+        }
+
+    def close(self):
+        with self._lock:
+            self._vectors = None
+            self._connection.close()
+
+if __name__ == "__main__":
+    # Paso de un despliegue al modo compacto: python -m src.rag.vector_store.quantized_store [dominio ...]
+    import asyncio
+    from src.rag.vector_store.vector_db import DOMAINS, VectorDB
+
+    logging.basicConfig(level=logging.INFO)
+    vector_db = VectorDB(settings.CHROMA_PERSIST_DIRECTORY, compact=False)
+    for domain in sys.argv[1:] or DOMAINS:
+        asyncio.run(vector_db.build_compact_store(domain))
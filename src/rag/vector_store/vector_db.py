@@ -1,33 +1,322 @@
 import chromadb
 from chromadb.config import Settings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+from pydantic import BaseModel, Field
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import os
+import numpy as np
+from typing import Any, Dict, Iterator, List, Literal, Optional, Union
+from src.utils.config import settings
+from src.rag.vector_store.lexical_index import LexicalIndex
+from src.rag.vector_store.quantized_store import QuantizedVectorStore
 
 logger = logging.getLogger(__name__)
 
+DOMAINS = ["medical", "botanical", "chemical", "physical", "biological"]
+
+class IndexConfig(BaseModel):
+    """
+    Parámetros del índice HNSW de una colección.
+
+    search_ef se puede cambiar en caliente (más alto = más recall y más
+    latencia). space, construction_ef y m solo se aplican al construir el
+    índice: cambiarlos en una colección existente requiere rebuild_index.
+    """
+
+    space: Literal["l2", "cosine", "ip"] = "l2"
+    construction_ef: int = Field(100, ge=1)
+    search_ef: int = Field(100, ge=1)
+    m: int = Field(16, ge=2)
+
+    @classmethod
+    def for_domain(cls, domain: str) -> "IndexConfig":
+        """Configuración de settings con los ajustes de VECTOR_INDEX_OVERRIDES del dominio."""
+        return cls(**{
+            "space": settings.VECTOR_INDEX_SPACE,
+            "construction_ef": settings.VECTOR_INDEX_CONSTRUCTION_EF,
+            "search_ef": settings.VECTOR_INDEX_SEARCH_EF,
+            "m": settings.VECTOR_INDEX_M,
+            **settings.VECTOR_INDEX_OVERRIDES.get(domain, {})
+        })
+
+    @classmethod
+    def from_collection(cls, collection) -> "IndexConfig":
+        hnsw = (collection.configuration or {}).get("hnsw") or {}
+        return cls(
+            space=hnsw.get("space", "l2"),
+            construction_ef=hnsw.get("ef_construction", 100),
+            search_ef=hnsw.get("ef_search", 100),
+            m=hnsw.get("max_neighbors", 16)
+        )
+
+    def to_chroma(self) -> Dict[str, Any]:
+        return {"hnsw": {
+            "space": self.space,
+            "ef_construction": self.construction_ef,
+            "ef_search": self.search_ef,
+            "max_neighbors": self.m
+        }}
+
+    def requires_rebuild(self, other: "IndexConfig") -> bool:
+        return (self.space, self.construction_ef, self.m) != (other.space, other.construction_ef, other.m)
+
 class VectorDB:
-    def __init__(self, persist_directory: str = "data/chroma_db"):
+    def __init__(
+        self,
+        persist_directory: str = "data/chroma_db",
+        index_configs: Optional[Dict[str, IndexConfig]] = None,
+        embedding_function: Optional[Any] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        compact: Optional[bool] = None
+    ):
+        """
+        `index_configs` fija el índice de cada dominio; los dominios que no
+        aparecen usan IndexConfig.for_domain. `embedding_function` sustituye
+        a la función de embeddings por defecto de Chroma.
+
+        Junto a las colecciones se mantiene un índice léxico BM25 de los
+        mismos fragmentos (por defecto en `persist_directory`).
+
+        En modo compacto (`compact`, por defecto VECTOR_STORE_COMPACT) los
+        vectores no pasan por Chroma: cada dominio usa un
+        QuantizedVectorStore con códigos int8 en memoria y los float32 en
+        disco para volver a puntuar los mejores candidatos.
+        """
+        self.persist_directory = persist_directory
+        self.compact = settings.VECTOR_STORE_COMPACT if compact is None else compact
+        self.compact_stores: Dict[str, QuantizedVectorStore] = {}
         self.client = chromadb.Client(Settings(
             persist_directory=persist_directory,
             is_persistent=True
         ))
+        self.embedding_function = embedding_function or DefaultEmbeddingFunction()
         self.collections = {}
-        self._initialize_collections()
+        self.index_configs: Dict[str, IndexConfig] = {}
+        self._initialize_collections(index_configs or {})
+        self.lexical_index = lexical_index or LexicalIndex(
+            os.path.join(persist_directory, "lexical_index.sqlite3"),
+            DOMAINS
+        )
+        if self.compact:
+            for domain in DOMAINS:
+                self.compact_store(domain)
 
-    def _initialize_collections(self):
+    def compact_store(self, domain: str) -> QuantizedVectorStore:
+        """Almacén cuantizado de un dominio (se crea al pedirlo por primera vez)."""
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        if domain not in self.compact_stores:
+            self.compact_stores[domain] = QuantizedVectorStore(
+                os.path.join(self.persist_directory, "compact", domain),
+                space=self.index_configs[domain].space
+            )
+        return self.compact_stores[domain]
+
+    def _initialize_collections(self, index_configs: Dict[str, IndexConfig]):
         """Inicializa las colecciones para cada dominio"""
-        domains = ["medical", "botanical", "chemical", "physical", "biological"]
-        for domain in domains:
+        for domain in DOMAINS:
             collection_name = f"{domain}_collection"
             try:
+                self._recover_rebuild(collection_name)
+                config = index_configs.get(domain) or IndexConfig.for_domain(domain)
                 self.collections[domain] = self.client.get_or_create_collection(
                     name=collection_name,
-                    metadata={"domain": domain}
+                    metadata={"domain": domain},
+                    configuration=config.to_chroma(),
+                    embedding_function=self.embedding_function
                 )
+                self._sync_index_config(domain, config)
             except Exception as e:
                 logger.error(f"Error inicializando colección {collection_name}: {str(e)}")
                 raise
 
+    def _recover_rebuild(self, name: str):
+        """
+        Termina o deshace una reconstrucción interrumpida. La colección
+        original solo pasa a `<name>_previous` cuando la de staging está
+        completa, así que si falta `name` la copia buena es staging o, si
+        ya no existe, la anterior.
+        """
+        staging_name, previous_name = f"{name}_rebuild", f"{name}_previous"
+        existing = {collection.name for collection in self.client.list_collections()}
+        if name not in existing:
+            if previous_name in existing and staging_name in existing:
+                self._rename_collection(staging_name, name)
+                existing.discard(staging_name)
+                logger.warning(f"Reconstrucción de {name} interrumpida: completada con {staging_name}")
+            elif previous_name in existing:
+                self._rename_collection(previous_name, name)
+                existing.discard(previous_name)
+                logger.warning(f"Reconstrucción de {name} interrumpida: restaurada {previous_name}")
+        for leftover in (staging_name, previous_name):
+            if leftover in existing:
+                self.client.delete_collection(leftover)
+
+    def _rename_collection(self, name: str, new_name: str):
+        self.client.get_collection(name, embedding_function=self.embedding_function).modify(name=new_name)
+
+    def _sync_index_config(self, domain: str, config: IndexConfig):
+        """Aplica search_ef a una colección ya existente y avisa si el resto difiere."""
+        current = IndexConfig.from_collection(self.collections[domain])
+        if current.requires_rebuild(config):
+            logger.warning(
+                f"El índice de {domain} se construyó con {current.model_dump()}; "
+                f"la configuración {config.model_dump()} requiere rebuild_index"
+            )
+        self.index_configs[domain] = current
+        if current.search_ef != config.search_ef:
+            self.set_search_ef(domain, config.search_ef)
+
+    def get_index_config(self, domain: str) -> IndexConfig:
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        return self.index_configs[domain]
+
+    def set_search_ef(self, domain: str, search_ef: int):
+        """Cambia en caliente el ef de búsqueda del índice de un dominio."""
+        config = self.get_index_config(domain).model_copy(update={"search_ef": search_ef})
+        self.collections[domain].modify(configuration={"hnsw": {"ef_search": search_ef}})
+        self.index_configs[domain] = config
+        logger.info(f"search_ef de {domain} = {search_ef}")
+
+    def iter_collection(
+        self,
+        domain: str,
+        batch_size: int = 1000,
+        include: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre una colección por páginas de `batch_size` elementos. Cada
+        página es el resultado de collection.get con los campos de `include`.
+        """
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        if self.compact:
+            return self.compact_store(domain).iter_pages(batch_size, include)
+        return self._iter_chroma(domain, batch_size, include)
+
+    def _iter_chroma(
+        self,
+        domain: str,
+        batch_size: int,
+        include: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        collection = self.collections[domain]
+        include = include or ["embeddings", "documents", "metadatas"]
+        offset = 0
+        while True:
+            page = collection.get(limit=batch_size, offset=offset, include=include)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
+
+    def sample_embeddings(self, domain: str, n: int, seed: int = 0) -> np.ndarray:
+        """Embeddings float32 de hasta `n` elementos del dominio elegidos al azar."""
+        rng = np.random.default_rng(seed)
+        if self.compact:
+            return self.compact_store(domain).sample_vectors(n, rng)
+        collection = self.collections[domain]
+        vectors = []
+        for offset in np.sort(rng.choice(collection.count(), size=min(n, collection.count()), replace=False)):
+            page = collection.get(limit=1, offset=int(offset), include=["embeddings"])
+            vectors.append(np.asarray(page["embeddings"][0], dtype=np.float32))
+        return np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+
+    async def rebuild_index(
+        self,
+        domain: str,
+        config: Optional[IndexConfig] = None,
+        batch_size: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Reconstruye el índice de un dominio con `config` (por defecto la
+        configuración actual), lo que también lo compacta: los documentos
+        eliminados dejan de ocupar nodos del grafo.
+
+        Los elementos se copian con sus embeddings a una colección temporal,
+        que sustituye a la original al terminar; ver _recover_rebuild para
+        las interrupciones. No debe haber escrituras en el dominio durante
+        la reconstrucción.
+
+        En modo compacto se reescribe el almacén cuantizado sin las filas
+        eliminadas (y con el espacio de `config`).
+        """
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        config = config or self.index_configs[domain]
+        try:
+            if self.compact:
+                return await asyncio.to_thread(self._compact_store, domain, config, batch_size)
+            return await asyncio.to_thread(self._rebuild_index, domain, config, batch_size)
+        except Exception as e:
+            logger.error(f"Error reconstruyendo el índice de {domain}: {str(e)}")
+            raise
+
+    def _rebuild_index(self, domain: str, config: IndexConfig, batch_size: int) -> Dict[str, Any]:
+        source = self.collections[domain]
+        name = source.name
+        staging_name, previous_name = f"{name}_rebuild", f"{name}_previous"
+        self._recover_rebuild(name)
+
+        staging = self.client.create_collection(
+            name=staging_name,
+            metadata=source.metadata,
+            configuration=config.to_chroma(),
+            embedding_function=self.embedding_function
+        )
+        copied = 0
+        try:
+            for page in self.iter_collection(domain, batch_size):
+                staging.add(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"]
+                )
+                copied += len(page["ids"])
+        except Exception:
+            self.client.delete_collection(staging_name)
+            raise
+
+        # La original se aparta antes de ocupar su nombre y solo se borra
+        # cuando staging ya está en su sitio
+        source.modify(name=previous_name)
+        staging.modify(name=name)
+        self.client.delete_collection(previous_name)
+        self.collections[domain] = staging
+        self.index_configs[domain] = config
+        logger.info(f"Índice de {domain} reconstruido: {copied} documentos, {config.model_dump()}")
+        return {"domain": domain, "count": copied, "index": config.model_dump()}
+
+    def _compact_store(self, domain: str, config: IndexConfig, batch_size: int) -> Dict[str, Any]:
+        store = self.compact_store(domain)
+        store.space = config.space
+        count = store.compact(batch_size)
+        self.index_configs[domain] = config
+        logger.info(f"Almacén compacto de {domain} reescrito: {count} documentos")
+        return {"domain": domain, "count": count, "index": config.model_dump()}
+
+    async def build_compact_store(self, domain: str, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Copia la colección Chroma de un dominio (embeddings incluidos) a su
+        almacén cuantizado, sustituyendo lo que tuviera. Es el paso previo
+        para pasar un despliegue existente al modo compacto.
+        """
+        def build() -> Dict[str, Any]:
+            store = self.compact_store(domain)
+            store.clear()
+            for page in self._iter_chroma(domain, batch_size):
+                store.add(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+            return store.memory_usage()
+
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        usage = await asyncio.to_thread(build)
+        logger.info(f"Almacén compacto de {domain} construido: {usage}")
+        return usage
+
     async def add_texts(
         self,
         texts: List[str],
@@ -45,11 +334,15 @@ class VectorDB:
             if ids is None:
                 ids = [f"doc_{i}" for i in range(len(texts))]
 
-            self.collections[domain].add(
-                documents=texts,
-                metadatas=metadata,
-                ids=ids
-            )
+            if self.compact:
+                self.compact_store(domain).add(ids, self.embedding_function(texts), texts, metadata)
+            else:
+                self.collections[domain].add(
+                    documents=texts,
+                    metadatas=metadata,
+                    ids=ids
+                )
+            self.lexical_index.add(domain, ids, texts)
             logger.info(f"Añadidos {len(texts)} documentos a la colección {domain}")
 
         except Exception as e:
@@ -70,23 +363,146 @@ class VectorDB:
             if domain not in self.collections:
                 raise ValueError(f"Dominio no válido: {domain}")
 
+            if self.compact:
+                return self.compact_store(domain).search(self.embed_query(query), n_results, metadata_filter)
+
             results = self.collections[domain].query(
                 query_texts=[query],
                 n_results=n_results,
                 where=metadata_filter
             )
 
-            return {
-                "ids": results["ids"][0],
-                "documents": results["documents"][0],
-                "metadatas": results["metadatas"][0],
-                "distances": results["distances"][0]
-            }
+            return self._first_result(results)
 
         except Exception as e:
             logger.error(f"Error en búsqueda para {domain}: {str(e)}")
             raise
 
+    @staticmethod
+    def _first_result(results: Dict) -> Dict:
+        return {
+            "ids": results["ids"][0],
+            "documents": results["documents"][0],
+            "metadatas": results["metadatas"][0],
+            "distances": results["distances"][0]
+        }
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding de una consulta con la función de embeddings de las colecciones."""
+        return np.asarray(self.embedding_function([query])[0], dtype=np.float32).tolist()
+
+    async def search_multi_domain(
+        self,
+        query: str,
+        domains: Optional[List[str]] = None,
+        n_results: Union[int, Dict[str, int]] = 5,
+        metadata_filter: Optional[Dict] = None
+    ) -> Dict[str, Dict]:
+        """
+        Busca una consulta en varios dominios en una sola pasada.
+
+        El embedding de la consulta se calcula una vez y los índices de los
+        dominios se consultan en paralelo, así que la latencia la marca el
+        dominio más lento y no el número de dominios. `n_results` es la cuota
+        de cada dominio: un entero común o un diccionario por dominio (en ese
+        caso, sin `domains`, se buscan sus claves).
+
+        Devuelve por dominio el mismo formato que search; un dominio que
+        falla devuelve listas vacías sin afectar al resto.
+        """
+        if domains is None:
+            domains = list(n_results) if isinstance(n_results, dict) else list(self.collections)
+        invalid = [domain for domain in domains if domain not in self.collections]
+        if invalid:
+            raise ValueError(f"Dominio no válido: {', '.join(invalid)}")
+        quotas = n_results if isinstance(n_results, dict) else dict.fromkeys(domains, n_results)
+
+        embedding = await asyncio.to_thread(self.embed_query, query)
+        searches = [
+            asyncio.to_thread(self._search_embedding, domain, embedding, quotas.get(domain, 0), metadata_filter)
+            for domain in domains
+        ]
+
+        results = {}
+        for domain, result in zip(domains, await asyncio.gather(*searches, return_exceptions=True)):
+            if isinstance(result, Exception):
+                logger.error(f"Error en búsqueda para {domain}: {str(result)}")
+                result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            results[domain] = result
+        return results
+
+    def _search_embedding(
+        self,
+        domain: str,
+        embedding: List[float],
+        n_results: int,
+        metadata_filter: Optional[Dict] = None
+    ) -> Dict:
+        if n_results <= 0:
+            return {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if self.compact:
+            return self.compact_store(domain).search(embedding, n_results, metadata_filter)
+        return self._first_result(self.collections[domain].query(
+            query_embeddings=[embedding],
+            n_results=n_results,
+            where=metadata_filter
+        ))
+
+    async def search_lexical(
+        self,
+        query: str,
+        domains: List[str],
+        n_results: Union[int, Dict[str, int]] = 5
+    ) -> Dict[str, List[Dict]]:
+        """
+        Búsqueda BM25 en el índice léxico de cada dominio. Devuelve por
+        dominio una lista de {"id", "score", "document"} de mayor a menor
+        puntuación.
+        """
+        invalid = [domain for domain in domains if domain not in self.collections]
+        if invalid:
+            raise ValueError(f"Dominio no válido: {', '.join(invalid)}")
+        quotas = n_results if isinstance(n_results, dict) else dict.fromkeys(domains, n_results)
+        hits = await asyncio.to_thread(self.lexical_index.search_many, query, domains, quotas)
+        return {
+            domain: [
+                {"id": doc_id, "score": score, "document": document}
+                for doc_id, score, document in domain_hits
+            ]
+            for domain, domain_hits in hits.items()
+        }
+
+    async def get_metadatas(self, ids: List[str], domain: str) -> Dict[str, Dict]:
+        """Metadatos de los documentos indicados, por id."""
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        if not ids:
+            return {}
+        if self.compact:
+            return self.compact_store(domain).get_metadatas(ids)
+        results = self.collections[domain].get(ids=ids, include=["metadatas"])
+        return dict(zip(results["ids"], results["metadatas"]))
+
+    async def rebuild_lexical_index(self, domain: str, batch_size: int = 1000) -> int:
+        """
+        Vuelve a indexar en BM25 todos los documentos de un dominio (p. ej.
+        colecciones creadas antes de existir el índice léxico). Devuelve
+        cuántos se indexaron.
+        """
+        def rebuild() -> int:
+            self.lexical_index.clear(domain)
+            indexed = 0
+            for page in self.iter_collection(domain, batch_size, include=["documents"]):
+                self.lexical_index.add(domain, page["ids"], page["documents"])
+                indexed += len(page["ids"])
+            return indexed
+
+        if domain not in self.collections:
+            raise ValueError(f"Dominio no válido: {domain}")
+        indexed = await asyncio.to_thread(rebuild)
+        logger.info(f"Índice léxico de {domain} reconstruido: {indexed} documentos")
+        return indexed
+
     async def delete_texts(self, ids: List[str], domain: str):
         """
         Elimina documentos por sus IDs
@@ -95,7 +511,11 @@ class VectorDB:
             if domain not in self.collections:
                 raise ValueError(f"Dominio no válido: {domain}")
 
-            self.collections[domain].delete(ids=ids)
+            if self.compact:
+                self.compact_store(domain).delete(ids)
+            else:
+                self.collections[domain].delete(ids=ids)
+            self.lexical_index.delete(domain, ids)
             logger.info(f"Eliminados {len(ids)} documentos de la colección {domain}")
 
         except Exception as e:
@@ -111,6 +531,14 @@ class VectorDB:
                 raise ValueError(f"Dominio no válido: {domain}")
 
             collection = self.collections[domain]
+            if self.compact:
+                usage = self.compact_store(domain).memory_usage()
+                return {
+                    "count": usage["vectors"],
+                    "domain": domain,
+                    "name": collection.name,
+                    "compact": usage
+                }
             return {
                 "count": collection.count(),
                 "domain": domain,
@@ -0,0 +1,188 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import datetime
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.utils.config import settings
+from src.utils.database import get_async_session, Query, QueryResult
+from src.utils.exceptions import ConfigurationError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Modos de durabilidad del registro de consultas
+FIRE_AND_FORGET = "fire_and_forget"            # Se responde sin esperar a la escritura
+FLUSH_BEFORE_RESPOND = "flush_before_respond"  # Se responde cuando el lote está en disco
+DURABILITY_MODES = (FIRE_AND_FORGET, FLUSH_BEFORE_RESPOND)
+
+# Registro pendiente y, en modo flush_before_respond, el futuro que lo espera
+PendingRecord = Tuple[Dict[str, Any], Optional[asyncio.Future]]
+
+class AuditLogWriter:
+    """
+    Registro diferido (write-behind) de consultas y resultados.
+
+    Las peticiones encolan filas Query/QueryResult y un worker en segundo
+    plano las escribe en lotes, en una única transacción, cuando se
+    acumulan `batch_size` registros o pasan `flush_interval` segundos.
+    Con durabilidad flush_before_respond el llamador espera a que su lote
+    se confirme; las peticiones que llegan durante una escritura comparten
+    la siguiente (group commit).
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        durability: Optional[str] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.session_factory = session_factory or get_async_session
+        self.batch_size = batch_size or settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_LOG_FLUSH_INTERVAL
+        self.durability = durability or settings.AUDIT_LOG_DURABILITY
+        self.max_pending = max_pending or settings.AUDIT_LOG_MAX_PENDING
+        if self.durability not in DURABILITY_MODES:
+            raise ConfigurationError(f"Modo de durabilidad desconocido: {self.durability}")
+
+        self._pending: List[PendingRecord] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self._counters = {"recorded": 0, "written": 0, "batches": 0, "errors": 0, "dropped": 0}
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Primer uso (o nuevo event loop): primitivas y worker propios
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def record(
+        self,
+        user_id: Any,
+        query_text: str,
+        results: List[Dict[str, Any]],
+        durability: Optional[str] = None
+    ):
+        """
+        Encola una consulta con sus resultados (dicts con response,
+        confidence y domain).
+        """
+        durability = durability or self.durability
+        self._ensure_worker()
+        if len(self._pending) >= self.max_pending:
+            # Cola llena: se vacía antes de aceptar más registros
+            await self.flush()
+
+        entry = {
+            "user_id": user_id,
+            "query_text": query_text,
+            "timestamp": datetime.datetime.utcnow(),
+            "results": [dict(result) for result in results]
+        }
+        waiter = self._loop.create_future() if durability == FLUSH_BEFORE_RESPOND else None
+        self._pending.append((entry, waiter))
+        self._counters["recorded"] += 1
+
+        if waiter is not None or len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        if waiter is not None:
+            await waiter
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Escribe los registros pendientes. Devuelve cuántos se escribieron."""
+        if self._flush_lock is None:
+            return 0
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                await self._write([entry for entry, _ in batch])
+            except Exception as e:
+                self._counters["errors"] += 1
+                logger.error(f"Error escribiendo el registro de consultas ({len(batch)} filas): {str(e)}")
+                self._fail(batch, e)
+                return 0
+
+            self._counters["written"] += len(batch)
+            self._counters["batches"] += 1
+            for _, waiter in batch:
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(None)
+            return len(batch)
+
+    def _fail(self, batch: List[PendingRecord], error: Exception):
+        # Quien espera la escritura recibe el error; el resto se reintenta en
+        # el siguiente lote mientras haya sitio en la cola
+        retry = []
+        for entry, waiter in batch:
+            if waiter is not None:
+                if not waiter.done():
+                    waiter.set_exception(DatabaseError(str(error)))
+            elif len(retry) + len(self._pending) < self.max_pending:
+                retry.append((entry, None))
+            else:
+                self._counters["dropped"] += 1
+        self._pending[:0] = retry
+
+    async def _write(self, entries: List[Dict[str, Any]]):
+        session = self.session_factory()
+        try:
+            for entry in entries:
+                query = Query(
+                    user_id=entry["user_id"],
+                    query_text=entry["query_text"],
+                    timestamp=entry["timestamp"]
+                )
+                session.add(query)
+                for result in entry["results"]:
+                    session.add(QueryResult(query=query, **result))
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "durability": self.durability,
+            "pending": len(self._pending),
+            **self._counters
+        }
+
+    async def close(self):
+        """Detiene el worker y escribe lo que quede pendiente."""
+        self._closing = True
+        if self._worker is not None and not self._worker.done():
+            self._wakeup.set()
+            await self._worker
+        self._worker = None
+        await self.flush()
+        self._closing = False
+
+_shared_writer: Optional[AuditLogWriter] = None
+
+def get_audit_log() -> AuditLogWriter:
+    """Devuelve el registro de consultas compartido del proceso."""
+    global _shared_writer
+    if _shared_writer is None:
+        _shared_writer = AuditLogWriter()
+    return _shared_writer
@@ -0,0 +1,24 @@
+from typing import Any, Dict, Iterator, List, Tuple
+
+def length_sorted_batches(
+    tokenizer: Any,
+    encodings: Dict[str, List],
+    batch_size: int,
+    return_tensors: str = "np"
+) -> Iterator[Tuple[List[int], Dict[str, Any]]]:
+    """
+    Recorre textos ya tokenizados (sin relleno) en lotes de `batch_size`
+    ordenados por longitud en tokens, para que cada lote rellene lo mínimo.
+    Devuelve, por lote, las posiciones originales de sus textos y el lote
+    rellenado con tokenizer.pad en el formato `return_tensors`.
+    """
+    input_ids = encodings["input_ids"]
+    order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = tokenizer.pad(
+            {key: [encodings[key][i] for i in indices] for key in encodings.keys()},
+            padding=True,
+            return_tensors=return_tensors
+        )
+        yield indices, batch
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Any, Optional, Dict
 
 class Settings(BaseSettings):
     # API settings
@@ -8,6 +8,27 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = "sqlite:///medical_expert.db"
+    ASYNC_DATABASE_URL: str = ""  # Vacío = DATABASE_URL con driver aiosqlite/asyncpg
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # segundos; -1 para no reciclar conexiones
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Con WAL, sin fsync en cada commit
+
+    # Query audit log (escritura diferida de Query/QueryResult)
+    AUDIT_LOG_DURABILITY: str = "fire_and_forget"  # o "flush_before_respond"
+    AUDIT_LOG_BATCH_SIZE: int = 50
+    AUDIT_LOG_FLUSH_INTERVAL: float = 1.0
+    AUDIT_LOG_MAX_PENDING: int = 10000
+
+    # Query history
+    HISTORY_PAGE_SIZE: int = 20
+    HISTORY_MAX_PAGE_SIZE: int = 100
+    HISTORY_RETENTION_DAYS: int = 90  # Después se mueven a las tablas de archivo
+    HISTORY_ARCHIVE_MONTHS: int = 12  # Meses que se conservan en el archivo
+    HISTORY_ARCHIVE_BATCH_SIZE: int = 1000
     
     # LLM settings
     GROQ_API_KEY: str = ""
@@ -17,8 +38,78 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # External API settings
+    API_GATHER_MODE: str = "concurrent"  # "concurrent" o "sequential"
+    API_DEFAULT_TIMEOUT: float = 10.0
+    API_SOURCE_TIMEOUTS: Dict[str, float] = {
+        "pubmed": 8.0,
+        "pubchem": 6.0,
+        "nasa": 5.0,
+        "uniprot": 8.0,
+        "trefle": 6.0
+    }
+
+    # HTTP client settings (pool por host remoto)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 15.0
+    HTTP2_ENABLED: bool = True
+
+    # External API response cache
+    API_CACHE_ENABLED: bool = True
+    API_CACHE_MEMORY_ENTRIES: int = 2048
+    API_CACHE_PATH: str = "data/api_cache.sqlite3"
+
+    # Translation settings
+    TRANSLATION_CACHE_SIZE: int = 10000
+    TRANSLATION_BACKEND: str = "google"  # "google", "phrase_table" o "marian"
+    TRANSLATION_PHRASE_TABLE: str = "data/phrase_table.tsv"
+    TRANSLATION_MODEL_DIR: str = ""  # Directorio local con los modelos opus-mt-*
+    TRANSLATION_BATCH_SIZE: int = 16
+    TRANSLATION_NUM_THREADS: int = 0  # 0 = valor por defecto de torch
+    TRANSLATION_WORKERS: int = 2  # Traducciones simultáneas fuera del bucle de eventos
+
+    # Exact-match integrated response cache
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1000
+    RESULT_CACHE_TTL: float = 900.0
+
+    # Semantic answer cache (respuestas integradas por similitud de consulta)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Similitud coseno mínima
+    SEMANTIC_CACHE_TTL: float = 6 * 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+
+    # Agent settings
+    AGENT_MAX_CONCURRENCY: int = 8
+
+    # Embedding settings
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_DIR: str = ""  # Vacío = caché solo en memoria
+    EMBEDDING_BACKEND: str = "torch"  # "torch" u "onnx" (CPU, int8)
+    EMBEDDING_ONNX_DIR: str = "data/onnx"
+    EMBEDDING_ONNX_QUANTIZE: bool = True
+    EMBEDDING_NUM_THREADS: int = 0  # 0 = valor por defecto del motor
+
     # Vector DB settings
     CHROMA_PERSIST_DIRECTORY: str = "data/chroma_db"
+    VECTOR_INDEX_SPACE: str = "l2"  # "l2", "cosine" o "ip"
+    VECTOR_INDEX_CONSTRUCTION_EF: int = 100
+    VECTOR_INDEX_SEARCH_EF: int = 100
+    VECTOR_INDEX_M: int = 16
+    # Ajustes por dominio, p. ej. {"medical": {"search_ef": 200, "m": 32}}
+    VECTOR_INDEX_OVERRIDES: Dict[str, Dict[str, Any]] = {}
+    VECTOR_STORE_COMPACT: bool = False  # int8 en memoria + float32 en disco
+    VECTOR_COMPACT_RESCORE_CANDIDATES: int = 50
+    RETRIEVAL_MODE: str = "hybrid"  # "vector", "lexical" o "hybrid" (BM25 + vectores)
+    RETRIEVAL_RRF_K: int = 60
+    RERANKER_ENABLED: bool = False
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANKER_CANDIDATES: int = 20  # Candidatos de la primera etapa por dominio
+    RERANKER_BATCH_SIZE: int = 16
+    RERANKER_TIME_BUDGET: float = 0.3  # segundos por petición
 
     # Environment settings
     ENVIRONMENT: str = "development"
@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, ForeignKey, DateTime, Index
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, relationship
+from sqlalchemy.pool import StaticPool
 import datetime
-from typing import Optional
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 from src.utils.config import settings
 
 Base = declarative_base()
@@ -15,6 +19,12 @@ class User(Base):
 
 class Query(Base):
     __tablename__ = 'queries'
+    __table_args__ = (
+        # Historial de un usuario ordenado por fecha
+        Index('ix_queries_user_id_timestamp', 'user_id', 'timestamp'),
+        # Archivado y retención por antigüedad
+        Index('ix_queries_timestamp', 'timestamp'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     query_text = Column(String)
@@ -24,6 +34,9 @@ class Query(Base):
 
 class QueryResult(Base):
     __tablename__ = 'query_results'
+    __table_args__ = (
+        Index('ix_query_results_query_id_domain', 'query_id', 'domain'),
+    )
     id = Column(Integer, primary_key=True)
     query_id = Column(Integer, ForeignKey('queries.id'))
     response = Column(String)
@@ -31,12 +44,202 @@ class QueryResult(Base):
     domain = Column(String)
     query = relationship("Query", back_populates="results")
 
-def init_db(database_url: Optional[str] = None):
-    engine = create_engine(database_url or settings.DATABASE_URL, echo=settings.DEBUG)
+class QueryArchive(Base):
+    """
+    Consultas antiguas retiradas de `queries`. `bucket` es el mes de la
+    consulta (AAAA-MM) y permite borrar meses completos de una vez.
+    """
+    __tablename__ = 'queries_archive'
+    __table_args__ = (
+        Index('ix_queries_archive_bucket', 'bucket'),
+        Index('ix_queries_archive_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    query_text = Column(String)
+    timestamp = Column(DateTime)
+    bucket = Column(String(7), nullable=False)
+
+class QueryResultArchive(Base):
+    __tablename__ = 'query_results_archive'
+    __table_args__ = (
+        Index('ix_query_results_archive_bucket', 'bucket'),
+        Index('ix_query_results_archive_query_id_domain', 'query_id', 'domain'),
+    )
+    id = Column(Integer, primary_key=True)
+    query_id = Column(Integer)
+    response = Column(String)
+    confidence = Column(Float)
+    domain = Column(String)
+    bucket = Column(String(7), nullable=False)
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker()
+_async_engine: Optional[AsyncEngine] = None
+# expire_on_commit=False: tras el commit los atributos siguen accesibles sin
+# volver a consultar la base de datos (no hay carga perezosa en asyncio)
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+# Driver asíncrono de cada backend, para URLs con un driver síncrono
+# (sqlite, sqlite+pysqlite, postgresql, postgresql+psycopg2...)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg"
+}
+
+def _engine_options(url: URL, is_async: bool = False) -> Dict[str, Any]:
+    options = {"echo": settings.DEBUG, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        if not is_async:
+            # Las sesiones pueden usarse desde otros hilos (p. ej. threadpool de FastAPI)
+            options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+    return options
+
+def _configure_sqlite(engine: Engine):
+    """
+    Activa WAL y synchronous=NORMAL en cada conexión SQLite: los commits
+    dejan de esperar a un fsync y las lecturas no bloquean a las escrituras.
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.close()
+
+def create_db_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Crea un engine con el pool configurado en DB_POOL_*. Las bases SQLite
+    en memoria usan una única conexión compartida (StaticPool).
+    """
+    url = make_url(database_url or settings.DATABASE_URL)
+    engine = create_engine(url, **_engine_options(url))
+    if url.get_backend_name() == "sqlite":
+        _configure_sqlite(engine)
+    return engine
+
+def async_database_url(database_url: Optional[str] = None) -> URL:
+    """
+    URL asíncrona de la base de datos: ASYNC_DATABASE_URL si está definida
+    o, si no, DATABASE_URL con el driver asíncrono correspondiente
+    (sqlite -> aiosqlite, postgresql -> asyncpg).
+    """
+    url = make_url(database_url or settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and not url.get_dialect().is_async:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url
+
+def create_async_db_engine(database_url: Optional[str] = None) -> AsyncEngine:
+    """Versión asíncrona de create_db_engine, con el mismo pool."""
+    url = async_database_url(database_url)
+    engine = create_async_engine(url, **_engine_options(url, is_async=True))
+    if url.get_backend_name() == "sqlite":
+        _configure_sqlite(engine.sync_engine)
+    return engine
+
+def get_engine() -> Engine:
+    """Devuelve el engine del proceso, creándolo en el primer uso."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+def dispose_engine():
+    """Cierra las conexiones del pool (al apagar la aplicación)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+def get_async_engine() -> AsyncEngine:
+    """Devuelve el engine asíncrono del proceso, creándolo en el primer uso."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_db_engine()
+                AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+async def dispose_async_engine():
+    """Cierra las conexiones del pool asíncrono."""
+    global _async_engine
+    engine, _async_engine = _async_engine, None
+    if engine is not None:
+        await engine.dispose()
+
+def init_db(database_url: Optional[str] = None) -> Engine:
+    """
+    Crea las tablas que falten. Es el paso de esquema que se ejecuta una vez
+    al arrancar; las peticiones no lo vuelven a invocar.
+
+    Sin `database_url` actúa sobre el engine del proceso; con ella crea un
+    engine independiente (útil en tests).
+    """
+    engine = create_db_engine(database_url) if database_url else get_engine()
     Base.metadata.create_all(engine)
+    # create_all no añade índices nuevos a tablas que ya existían
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
     return engine
 
-def get_session():
-    engine = init_db()
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+def get_session_factory(engine: Optional[Engine] = None) -> sessionmaker:
+    """Factoría de sesiones ligada al engine indicado o al del proceso."""
+    if engine is None:
+        get_engine()
+        return SessionLocal
+    return sessionmaker(bind=engine)
+
+def get_session() -> Session:
+    """Abre una sesión sobre el pool compartido."""
+    return get_session_factory()()
+
+def get_db() -> Iterator[Session]:
+    """
+    Dependencia de FastAPI: una sesión por petición, que se deshace si el
+    manejador falla y se cierra siempre al terminar.
+    """
+    session = get_session()
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def get_async_session() -> AsyncSession:
+    """Abre una sesión asíncrona: sus commits no bloquean el event loop."""
+    get_async_engine()
+    return AsyncSessionLocal()
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Versión asíncrona de get_db para los manejadores async de FastAPI."""
+    session = get_async_session()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+if __name__ == "__main__":
+    # Migración inicial: python -m src.utils.database
+    init_db()
@@ -0,0 +1,177 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import datetime
+import logging
+from sqlalchemy import and_, delete, exists, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.utils.config import settings
+from src.utils.database import (
+    get_async_session, Query, QueryResult, QueryArchive, QueryResultArchive
+)
+
+logger = logging.getLogger(__name__)
+
+def encode_cursor(timestamp: datetime.datetime, query_id: int) -> str:
+    """Cursor opaco con la posición (timestamp, id) de la última consulta devuelta."""
+    raw = f"{timestamp.isoformat()}|{query_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """Inverso de encode_cursor. Lanza ValueError si el cursor no es válido."""
+    try:
+        timestamp, query_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(timestamp), int(query_id)
+    except Exception:
+        raise ValueError(f"Cursor de historial no válido: {cursor}")
+
+async def get_user_history(
+    session: AsyncSession,
+    user_id: Any,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    domain: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Página del historial de un usuario, de la consulta más reciente a la más
+    antigua.
+
+    La paginación es por clave (keyset): cada página continúa después del
+    (timestamp, id) del cursor usando el índice (user_id, timestamp), por lo
+    que su coste no depende de cuántas páginas o filas haya antes.
+    """
+    limit = min(limit or settings.HISTORY_PAGE_SIZE, settings.HISTORY_MAX_PAGE_SIZE)
+
+    statement = select(Query).where(Query.user_id == user_id)
+    if domain:
+        statement = statement.where(
+            exists().where(and_(QueryResult.query_id == Query.id, QueryResult.domain == domain))
+        )
+    if cursor:
+        timestamp, query_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            Query.timestamp < timestamp,
+            and_(Query.timestamp == timestamp, Query.id < query_id)
+        ))
+    statement = statement.order_by(Query.timestamp.desc(), Query.id.desc()).limit(limit + 1)
+
+    queries = list((await session.execute(statement)).scalars())
+    has_more = len(queries) > limit
+    queries = queries[:limit]
+
+    results: Dict[int, List[Dict[str, Any]]] = {query.id: [] for query in queries}
+    if queries:
+        result_statement = select(QueryResult).where(QueryResult.query_id.in_(list(results)))
+        if domain:
+            result_statement = result_statement.where(QueryResult.domain == domain)
+        for result in (await session.execute(result_statement.order_by(QueryResult.id))).scalars():
+            results[result.query_id].append({
+                "domain": result.domain,
+                "response": result.response,
+                "confidence": result.confidence
+            })
+
+    return {
+        "items": [
+            {
+                "id": query.id,
+                "query": query.query_text,
+                "timestamp": query.timestamp.isoformat() if query.timestamp else None,
+                "results": results[query.id]
+            }
+            for query in queries
+        ],
+        "next_cursor": encode_cursor(queries[-1].timestamp, queries[-1].id) if has_more else None
+    }
+
+def _bucket(timestamp: datetime.datetime) -> str:
+    return timestamp.strftime("%Y-%m")
+
+async def archive_old_queries(
+    session_factory: Callable[[], AsyncSession] = get_async_session,
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime.datetime] = None
+) -> int:
+    """
+    Mueve a las tablas de archivo las consultas (y sus resultados) con más
+    de `retention_days` días. Trabaja en lotes de `batch_size` consultas,
+    cada uno en su propia transacción corta. Devuelve cuántas se movieron.
+    """
+    retention_days = retention_days or settings.HISTORY_RETENTION_DAYS
+    batch_size = batch_size or settings.HISTORY_ARCHIVE_BATCH_SIZE
+    cutoff = (now or datetime.datetime.utcnow()) - datetime.timedelta(days=retention_days)
+
+    archived = 0
+    while True:
+        async with session_factory() as session:
+            rows = (await session.execute(
+                select(Query.id, Query.user_id, Query.query_text, Query.timestamp)
+                .where(Query.timestamp < cutoff)
+                .order_by(Query.timestamp)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+
+            buckets = {row.id: _bucket(row.timestamp) for row in rows}
+            result_rows = (await session.execute(
+                select(
+                    QueryResult.id,
+                    QueryResult.query_id,
+                    QueryResult.response,
+                    QueryResult.confidence,
+                    QueryResult.domain
+                ).where(QueryResult.query_id.in_(list(buckets)))
+            )).all()
+
+            await session.execute(insert(QueryArchive), [
+                {**row._asdict(), "bucket": buckets[row.id]} for row in rows
+            ])
+            if result_rows:
+                await session.execute(insert(QueryResultArchive), [
+                    {**row._asdict(), "bucket": buckets[row.query_id]} for row in result_rows
+                ])
+            await session.execute(delete(QueryResult).where(QueryResult.query_id.in_(list(buckets))))
+            await session.execute(delete(Query).where(Query.id.in_(list(buckets))))
+            await session.commit()
+
+        archived += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    if archived:
+        logger.info(f"Consultas archivadas: {archived}")
+    return archived
+
+async def purge_archive(
+    session_factory: Callable[[], AsyncSession] = get_async_session,
+    keep_months: Optional[int] = None,
+    now: Optional[datetime.datetime] = None
+) -> int:
+    """
+    Borra del archivo los meses completos anteriores a los últimos
+    `keep_months`. Devuelve cuántas consultas archivadas se eliminaron.
+    """
+    keep_months = keep_months or settings.HISTORY_ARCHIVE_MONTHS
+    now = now or datetime.datetime.utcnow()
+    month_index = now.year * 12 + now.month - 1 - keep_months
+    oldest_kept = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+    async with session_factory() as session:
+        await session.execute(delete(QueryResultArchive).where(QueryResultArchive.bucket < oldest_kept))
+        removed = await session.execute(delete(QueryArchive).where(QueryArchive.bucket < oldest_kept))
+        await session.commit()
+    return removed.rowcount
+
+async def run_retention() -> Dict[str, int]:
+    """Archiva las consultas antiguas y purga los meses caducados del archivo."""
+    return {
+        "archived": await archive_old_queries(),
+        "purged": await purge_archive()
+    }
+
+if __name__ == "__main__":
+    # Mantenimiento periódico (cron): python -m src.utils.history
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Retención del historial completada: {asyncio.run(run_retention())}")
@@ -0,0 +1,16 @@
+import re
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza una consulta: minúsculas, sin signos de puntuación y sin
+    espacios repetidos. Se usa tanto para limpiar consultas como para
+    construir claves de caché.
+    """
+    # Convertir a minúsculas
+    query = query.lower()
+
+    # Eliminar caracteres especiales
+    query = re.sub(r'[^\w\s]', ' ', query)
+
+    # Eliminar espacios múltiples
+    return re.sub(r'\s+', ' ', query).strip()
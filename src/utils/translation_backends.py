@@ -0,0 +1,302 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import re
+import threading
+from src.utils.batching import length_sorted_batches
+from src.utils.config import settings
+from src.utils.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+class TranslationBackend(ABC):
+    """
+    Motor de traducción usado por TranslationService.
+
+    Los idiomas se indican con sus códigos ('es', 'en'). translate_batch
+    devuelve una traducción por texto, o None en las posiciones que fallen
+    (el servicio conserva entonces el texto original y no lo cachea).
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[Optional[str]]:
+        pass
+
+class GoogleBackend(TranslationBackend):
+    """
+    Traducción remota con deep_translator.GoogleTranslator.
+
+    Varios textos viajan en una sola llamada separados por una línea "|||";
+    si el separador no sobrevive a la traducción se traducen uno a uno.
+    """
+
+    name = "google"
+    BATCH_SEPARATOR = "\n|||\n"
+    MAX_BATCH_CHARS = 4500  # Google Translate admite hasta 5000 caracteres
+    _SEPARATOR_PATTERN = re.compile(r"\s*\|\s*\|\s*\|\s*")
+
+    def __init__(self):
+        self.translators = {}
+
+    def _translator(self, source: str, target: str):
+        key = (source, target)
+        if key not in self.translators:
+            from deep_translator import GoogleTranslator
+            self.translators[key] = GoogleTranslator(source=source, target=target)
+        return self.translators[key]
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[Optional[str]]:
+        translator = self._translator(source, target)
+        results = []
+        for chunk in self._pack(texts):
+            results.extend(self._translate_chunk(translator, chunk, target))
+        return results
+
+    def _pack(self, texts: List[str]) -> List[List[str]]:
+        """
+        Agrupa los textos en lotes que no superen MAX_BATCH_CHARS. Los textos
+        que contienen el separador viajan solos.
+        """
+        chunks = []
+        current = []
+        size = 0
+        for text in texts:
+            if "|||" in text or len(text) >= self.MAX_BATCH_CHARS:
+                if current:
+                    chunks.append(current)
+                    current, size = [], 0
+                chunks.append([text])
+                continue
+            if current and size + len(self.BATCH_SEPARATOR) + len(text) > self.MAX_BATCH_CHARS:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + len(self.BATCH_SEPARATOR)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _translate_chunk(self, translator, chunk: List[str], target: str) -> List[Optional[str]]:
+        if len(chunk) > 1:
+            try:
+                translated = translator.translate(self.BATCH_SEPARATOR.join(chunk))
+                parts = self._SEPARATOR_PATTERN.split(translated or "")
+                if len(parts) == len(chunk):
+                    return [part.strip() for part in parts]
+                logger.warning("Lote de traducción desalineado; se traduce texto a texto")
+            except Exception as e:
+                logger.error(f"Error en traducción por lotes: {str(e)}")
+
+        return [self._translate_one(translator, text, target) for text in chunk]
+
+    def _translate_one(self, translator, text: str, target: str) -> Optional[str]:
+        try:
+            return translator.translate(text) or text
+        except Exception as e:
+            language = "inglés" if target == 'en' else "español"
+            logger.error(f"Error en traducción a {language}: {str(e)}")
+            return None
+
+class PhraseTableBackend(TranslationBackend):
+    """
+    Traducción local por tabla de frases español-inglés.
+
+    La tabla es un fichero TSV con una entrada "español<TAB>inglés" por
+    línea y sirve en ambos sentidos. Se aplica la frase más larga que
+    coincida en cada posición; las palabras desconocidas se conservan.
+    """
+
+    name = "phrase_table"
+    _TOKEN_PATTERN = re.compile(r"\w+|\s+|[^\w\s]+")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TRANSLATION_PHRASE_TABLE
+        self.tables: Dict[Tuple[str, str], Dict[str, str]] = {('es', 'en'): {}, ('en', 'es'): {}}
+        self.max_phrase_words = 1
+        if self.path and os.path.exists(self.path):
+            self._load(self.path)
+        else:
+            logger.warning(f"Tabla de frases no encontrada: {self.path}")
+
+    def _load(self, path: str):
+        with open(path, encoding="utf-8") as table_file:
+            for line in table_file:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 2:
+                    continue
+                spanish, english = (part.strip().lower() for part in parts)
+                self.add_phrase(spanish, english)
+        logger.info(f"Tabla de frases cargada: {len(self.tables[('es', 'en')])} entradas")
+
+    def add_phrase(self, spanish: str, english: str):
+        self.tables[('es', 'en')].setdefault(spanish, english)
+        self.tables[('en', 'es')].setdefault(english, spanish)
+        self.max_phrase_words = max(
+            self.max_phrase_words,
+            len(spanish.split()),
+            len(english.split())
+        )
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[Optional[str]]:
+        table = self.tables.get((source, target), {})
+        return [self._translate(text, table) for text in texts]
+
+    def _translate(self, text: str, table: Dict[str, str]) -> str:
+        tokens = self._TOKEN_PATTERN.findall(text)
+        output = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if not token[0].isalnum() and token[0] != "_":
+                output.append(token)
+                i += 1
+                continue
+
+            # Probar primero la frase más larga: palabras separadas por espacios
+            match = None
+            for words in range(self.max_phrase_words, 0, -1):
+                end = i + 2 * words - 1
+                if end > len(tokens):
+                    continue
+                span = tokens[i:end]
+                if any(not part.isspace() for part in span[1::2]):
+                    continue
+                phrase = " ".join(span[0::2]).lower()
+                if phrase in table:
+                    match = (table[phrase], end)
+                    break
+
+            if match is None:
+                output.append(token)
+                i += 1
+                continue
+
+            translation, i = match
+            if token[0].isupper():
+                translation = translation[:1].upper() + translation[1:]
+            output.append(translation)
+        return "".join(output)
+
+class MarianBackend(TranslationBackend):
+    """
+    Traducción local con los modelos seq2seq Opus-MT (MarianMT).
+
+    Cada sentido se carga una sola vez por proceso. Los textos se dividen en
+    frases, que se traducen en lotes ordenados por longitud para reducir el
+    relleno. TRANSLATION_MODEL_DIR permite cargar los modelos desde disco en
+    nodos sin conexión.
+    """
+
+    name = "marian"
+    MODELS = {
+        ('es', 'en'): "Helsinki-NLP/opus-mt-es-en",
+        ('en', 'es'): "Helsinki-NLP/opus-mt-en-es"
+    }
+    _SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+    def __init__(
+        self,
+        model_dir: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_length: int = 512
+    ):
+        self.model_dir = model_dir if model_dir is not None else settings.TRANSLATION_MODEL_DIR
+        self.batch_size = batch_size or settings.TRANSLATION_BATCH_SIZE
+        self.max_length = max_length
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, source: str, target: str):
+        key = (source, target)
+        with self._lock:
+            if key not in self._models:
+                try:
+                    import torch
+                    from transformers import MarianMTModel, MarianTokenizer
+                except ImportError as e:
+                    raise ConfigurationError(
+                        f"El backend de traducción 'marian' requiere transformers y torch: {str(e)}"
+                    )
+                if key not in self.MODELS:
+                    raise ConfigurationError(f"Par de idiomas no soportado: {source}->{target}")
+
+                name = self.MODELS[key]
+                if self.model_dir:
+                    name = os.path.join(self.model_dir, name.split("/")[-1])
+                if settings.TRANSLATION_NUM_THREADS:
+                    torch.set_num_threads(settings.TRANSLATION_NUM_THREADS)
+                tokenizer = MarianTokenizer.from_pretrained(name)
+                model = MarianMTModel.from_pretrained(name).eval()
+                logger.info(f"Modelo de traducción cargado: {name}")
+                self._models[key] = (tokenizer, model)
+            return self._models[key]
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[Optional[str]]:
+        import torch
+
+        tokenizer, model = self._model(source, target)
+
+        # Dividir cada texto en frases conservando los separadores
+        segments = []
+        layouts = []
+        for text in texts:
+            pieces = []
+            position = 0
+            for separator in self._SENTENCE_PATTERN.finditer(text):
+                pieces.append((text[position:separator.start()], separator.group()))
+                position = separator.end()
+            pieces.append((text[position:], ""))
+            layout = []
+            for sentence, separator in pieces:
+                if sentence.strip():
+                    layout.append((len(segments), separator))
+                    segments.append(sentence)
+                else:
+                    layout.append((None, sentence + separator))
+            layouts.append(layout)
+
+        translated = [None] * len(segments)
+        try:
+            encodings = tokenizer(segments, truncation=True, max_length=self.max_length) if segments \
+                else {"input_ids": []}
+            for indices, inputs in length_sorted_batches(tokenizer, encodings, self.batch_size, return_tensors="pt"):
+                with torch.inference_mode():
+                    outputs = model.generate(**inputs, max_length=self.max_length)
+                for i, sentence in zip(indices, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                    translated[i] = sentence
+        except Exception as e:
+            logger.error(f"Error en traducción local: {str(e)}")
+            return [None] * len(texts)
+
+        results = []
+        for layout in layouts:
+            parts = []
+            for index, text in layout:
+                parts.append(text if index is None else translated[index] + text)
+            results.append("".join(parts))
+        return results
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    PhraseTableBackend.name: PhraseTableBackend,
+    MarianBackend.name: MarianBackend
+}
+
+_shared_backend: Optional[TranslationBackend] = None
+
+def get_translation_backend() -> TranslationBackend:
+    """Devuelve el backend configurado en TRANSLATION_BACKEND (uno por proceso)."""
+    global _shared_backend
+    if _shared_backend is None:
+        backend_class = BACKENDS.get(settings.TRANSLATION_BACKEND)
+        if backend_class is None:
+            raise ConfigurationError(
+                f"Backend de traducción desconocido: {settings.TRANSLATION_BACKEND}"
+            )
+        _shared_backend = backend_class()
+    return _shared_backend
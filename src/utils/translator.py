@@ -1,29 +1,230 @@
-from deep_translator import GoogleTranslator
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import logging
+import re
+import threading
+from src.utils.config import settings
+from src.utils.lru import LRUCache
+from src.utils.translation_backends import TranslationBackend, get_translation_backend
+
+logger = logging.getLogger(__name__)
+
+# Caché compartida por todas las instancias: cada cliente de API tiene su
+# propio TranslationService y todos traducen la misma consulta
+_translation_cache = LRUCache(settings.TRANSLATION_CACHE_SIZE)
+
+# Hilos en los que se traduce desde código asíncrono (ver to_english_async)
+_translation_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_translation_executor() -> ThreadPoolExecutor:
+    """Ejecutor compartido, acotado a TRANSLATION_WORKERS traducciones a la vez."""
+    global _translation_executor
+    with _executor_lock:
+        if _translation_executor is None:
+            _translation_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.TRANSLATION_WORKERS),
+                thread_name_prefix="translation"
+            )
+        return _translation_executor
+
+# Palabras funcionales frecuentes para detectar el idioma sin llamadas remotas
+_SPANISH_WORDS = {
+    "el", "la", "los", "las", "de", "del", "que", "y", "en", "un", "una", "es",
+    "por", "para", "con", "se", "su", "sus", "al", "lo", "como", "más", "pero",
+    "este", "esta", "estos", "estas", "son", "entre", "sin", "sobre", "también",
+    "muy", "hay", "qué", "cómo", "cuál", "puede", "tiene", "según", "cuando"
+}
+_ENGLISH_WORDS = {
+    "the", "of", "and", "to", "in", "is", "that", "for", "it", "with", "as",
+    "was", "on", "are", "be", "by", "this", "from", "or", "an", "which", "have",
+    "has", "not", "can", "what", "how", "these", "those", "their", "its",
+    "were", "been", "may", "between", "about", "also", "when", "does"
+}
+_WORD_PATTERN = re.compile(r"[a-záéíóúüñ]+")
+_SPANISH_CHARS = re.compile(r"[áéíóúñ¿¡]")
+
+# Fragmentos que nunca deben traducirse: URLs, identificadores y números,
+# y nombres científicos binomiales (Matricaria chamomilla, Homo sapiens)
+_PROTECTED_PATTERN = re.compile(
+    r"(?:https?://|www\.)[^\s<>()\[\]]*[^\s<>()\[\].,;:!?'\"]"
+    r"|\b(?=[\w.:/-]*\d)[A-Za-z0-9]+(?:[-_:./][A-Za-z0-9]+)*\b"
+    r"|\b[A-Z][a-z]{2,} [a-z]{2,}(?:us|um|ii|ae|ensis|oides|ata|atum|atus|ium|"
+    r"ica|icum|icus|alis|ale|ilis|illa|ella|ina|orum|arum|iana|ianus|ens)\b"
+)
+_PLACEHOLDER_PATTERN = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Detecta de forma aproximada si un texto está en español ('es') o en
+    inglés ('en'). Devuelve None si no hay indicios suficientes.
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    spanish = sum(word in _SPANISH_WORDS for word in words) + len(_SPANISH_CHARS.findall(text))
+    english = sum(word in _ENGLISH_WORDS for word in words)
+    if spanish == english:
+        return None
+    return 'es' if spanish > english else 'en'
+
+def _is_binomial_false_positive(match: str) -> bool:
+    genus = match.split()[0].lower()
+    return genus in _SPANISH_WORDS or genus in _ENGLISH_WORDS
+
+def protect_tokens(text: str) -> Tuple[str, List[str]]:
+    """
+    Sustituye los fragmentos intraducibles por marcadores [[n]] y devuelve
+    el texto resultante junto con los fragmentos originales.
+    """
+    tokens = []
+
+    def replace(match):
+        if " " in match.group() and _is_binomial_false_positive(match.group()):
+            return match.group()
+        tokens.append(match.group())
+        return f"[[{len(tokens) - 1}]]"
+
+    return _PROTECTED_PATTERN.sub(replace, text), tokens
+
+def restore_tokens(text: str, tokens: List[str]) -> Optional[str]:
+    """
+    Restaura los fragmentos protegidos. Devuelve None si el traductor ha
+    perdido o alterado algún marcador.
+    """
+    found = [int(index) for index in _PLACEHOLDER_PATTERN.findall(text)]
+    if sorted(found) != list(range(len(tokens))):
+        return None
+    return _PLACEHOLDER_PATTERN.sub(lambda match: tokens[int(match.group(1))], text)
 
 class TranslationService:
-    def __init__(self):
-        self.translator_es_en = GoogleTranslator(source='es', target='en')
-        self.translator_en_es = GoogleTranslator(source='en', target='es')
+    """
+    Traducción español <-> inglés con caché y lotes. El motor concreto
+    (Google, tabla de frases o modelo local) se elige con TRANSLATION_BACKEND.
+    """
+
+    def __init__(self, backend: Optional[TranslationBackend] = None):
+        self.backend = backend or get_translation_backend()
+        self.cache = _translation_cache
 
     def to_english(self, text: str) -> str:
         """Traduce texto de español a inglés"""
-        try:
-            return self.translator_es_en.translate(text)
-        except Exception as e:
-            logger.error(f"Error en traducción a inglés: {str(e)}")
-            return text
+        return self.translate_batch([text], 'en')[0]
 
     def to_spanish(self, text: Union[str, Dict, List]) -> Union[str, Dict, List]:
-        """Traduce texto de inglés a español"""
-        try:
-            if isinstance(text, str):
-                return self.translator_en_es.translate(text)
-            elif isinstance(text, dict):
-                return {k: self.to_spanish(v) for k, v in text.items()}
-            elif isinstance(text, list):
-                return [self.to_spanish(item) for item in text]
-            return text
-        except Exception as e:
-            logger.error(f"Error en traducción a español: {str(e)}")
-            return text
\ No newline at end of file
+        """
+        Traduce texto de inglés a español. Si recibe un dict o una lista,
+        traduce todas las cadenas que contiene en un único lote.
+        """
+        strings = []
+        self._collect_strings(text, strings)
+        translations = dict(zip(strings, self.translate_batch(strings, 'es')))
+        return self._replace_strings(text, translations)
+
+    async def to_english_async(self, text: str) -> str:
+        """
+        to_english fuera del bucle de eventos: el backend local hace trabajo
+        de CPU y el remoto bloquea en la red.
+        """
+        return await self._run_in_executor(self.to_english, text)
+
+    async def to_spanish_async(self, text: Union[str, Dict, List]) -> Union[str, Dict, List]:
+        """to_spanish fuera del bucle de eventos (ver to_english_async)."""
+        return await self._run_in_executor(self.to_spanish, text)
+
+    async def _run_in_executor(self, function, text):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_translation_executor(), function, text)
+
+    def translate_batch(self, texts: List[str], target: str) -> List[str]:
+        """
+        Traduce una lista de textos al idioma `target` ('en' o 'es').
+
+        Los textos ya traducidos se sirven desde la caché, los que ya están
+        en el idioma de destino se devuelven tal cual y el resto se envía al
+        backend en un único lote, con URLs, identificadores, números y
+        nombres científicos protegidos.
+        """
+        results = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            if not isinstance(text, str) or not text.strip():
+                results[text] = text
+                continue
+            cached = self.cache.get((self.backend.name, target, text))
+            if cached is not None:
+                results[text] = cached
+            elif detect_language(text) == target:
+                # Ya está en el idioma de destino
+                results[text] = text
+            else:
+                pending.append(text)
+
+        if pending:
+            self._translate_pending(pending, target, results)
+
+        return [results[text] for text in texts]
+
+    def _translate_pending(self, pending: List[str], target: str, results: Dict[str, str]):
+        source = 'es' if target == 'en' else 'en'
+        masked = {}
+        for text in pending:
+            masked_text, tokens = protect_tokens(text)
+            if not _WORD_PATTERN.search(_PLACEHOLDER_PATTERN.sub("", masked_text).lower()):
+                # Solo contiene fragmentos protegidos: nada que traducir
+                results[text] = text
+            else:
+                masked[text] = (masked_text, tokens)
+
+        originals = list(masked)
+        if not originals:
+            return
+        translations = self.backend.translate_batch(
+            [masked[text][0] for text in originals], source, target
+        )
+
+        retry = []
+        for original, translated in zip(originals, translations):
+            if translated is None:
+                results[original] = original
+                continue
+            restored = restore_tokens(translated, masked[original][1])
+            if restored is None:
+                retry.append(original)
+            else:
+                self._remember(target, original, restored, results)
+
+        # Si se perdió algún marcador se traduce el texto completo sin proteger
+        if retry:
+            logger.warning(f"Marcadores perdidos en {len(retry)} textos; se traducen sin proteger")
+            for original, translated in zip(retry, self.backend.translate_batch(retry, source, target)):
+                if translated is None:
+                    results[original] = original
+                else:
+                    self._remember(target, original, translated, results)
+
+    def _remember(self, target: str, original: str, translated: str, results: Dict[str, str]):
+        self.cache.set((self.backend.name, target, original), translated)
+        results[original] = translated
+
+    def _collect_strings(self, value: Union[str, Dict, List], strings: List[str]):
+        if isinstance(value, str):
+            strings.append(value)
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._collect_strings(item, strings)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect_strings(item, strings)
+
+    def _replace_strings(
+        self,
+        value: Union[str, Dict, List],
+        translations: Dict[str, str]
+    ) -> Union[str, Dict, List]:
+        if isinstance(value, str):
+            return translations.get(value, value)
+        elif isinstance(value, dict):
+            return {k: self._replace_strings(v, translations) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [self._replace_strings(item, translations) for item in value]
+        return value
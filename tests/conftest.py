@@ -0,0 +1,42 @@
+import pytest
+
+# Vocabulario de los modelos diminutos de los tests
+TINY_BERT_WORDS = [
+    "la", "el", "de", "manzanilla", "efectos", "planta", "té", "verde", "radiación",
+    "células", "proteína", "compuesto", "estrés", "sueño", "hojas", "flores",
+    "cafeína", "insomnio", "infusión", "estimulante"
+]
+
+def build_tiny_bert(path, model_class: str = "BertModel", **config) -> str:
+    """
+    Guarda en `path` un modelo BERT diminuto con pesos aleatorios (semilla
+    fija) y su tokenizador: los tests no descargan nada. `model_class` es
+    la clase de transformers y `config` sobrescribe la configuración.
+    """
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    torch.manual_seed(0)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + TINY_BERT_WORDS
+    vocab_file = path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab), encoding="utf-8")
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file))
+    bert_config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=128,
+        **config
+    )
+    getattr(transformers, model_class)(bert_config).save_pretrained(str(path))
+    tokenizer.save_pretrained(str(path))
+    return str(path)
+
+@pytest.fixture(scope="session")
+def tiny_bert(tmp_path_factory):
+    """Fábrica de modelos diminutos: tiny_bert(model_class, **config) -> ruta."""
+    def build(model_class: str = "BertModel", **config) -> str:
+        return build_tiny_bert(tmp_path_factory.mktemp("tiny_bert"), model_class, **config)
+    return build
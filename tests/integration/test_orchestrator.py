@@ -1,6 +1,9 @@
+import asyncio
 import pytest
 from src.orchestrator.orchestrator import Orchestrator
 from src.utils.exceptions import ExpertSystemException
+from src.utils.config import settings
+from src.orchestrator.semantic_cache import SemanticCache
 
 @pytest.fixture
 def orchestrator():
@@ -12,6 +15,12 @@ async def test_orchestrator_initialization(orchestrator):
     assert orchestrator.groq_client is not None
     assert orchestrator.validator is not None
 
+async def test_agents_share_the_orchestrator_clients(orchestrator):
+    assert orchestrator.agents['medical'].pubmed_api is orchestrator.external_apis['pubmed']
+    assert orchestrator.agents['biological'].uniprot_api is orchestrator.external_apis['uniprot']
+    translators = {id(api.translator) for api in orchestrator.external_apis.values()}
+    assert translators == {id(orchestrator.translator)}
+
 async def test_process_query(orchestrator):
     query = "¿Cómo afecta la radiación de microondas a las plantas medicinales?"
     user_id = "test_user"
@@ -48,4 +57,206 @@ async def test_error_handling(orchestrator):
 async def test_domain_specific_queries(orchestrator, query, expected_domains):
     result = await orchestrator.process_query(query, "test_user")
     assert result is not None
-    assert any(domain in str(result["sources"]) for domain in expected_domains)
\ No newline at end of file
+    assert any(domain in str(result["sources"]) for domain in expected_domains)
+
+class _SlowAPI:
+    async def search_articles(self, query):
+        await asyncio.sleep(5)
+        return []
+
+class _FailingAPI:
+    async def search_compound(self, query):
+        raise RuntimeError("servicio no disponible")
+
+class _FastAPI:
+    async def get_relevant_data(self, query):
+        return {"apod": {}}
+
+    async def search_proteins(self, query):
+        return [{"id": "P12345"}]
+
+    async def search_plants(self, query):
+        return [{"nombre_cientifico": "Matricaria chamomilla"}]
+
+async def test_gather_api_data_returns_partial_results(orchestrator, monkeypatch):
+    monkeypatch.setattr(settings, "API_GATHER_MODE", "concurrent")
+    monkeypatch.setattr(settings, "API_SOURCE_TIMEOUTS", {"pubmed": 0.05})
+    fast_api = _FastAPI()
+    orchestrator.external_apis = {
+        'pubmed': _SlowAPI(),
+        'pubchem': _FailingAPI(),
+        'nasa': fast_api,
+        'uniprot': fast_api,
+        'trefle': fast_api
+    }
+
+    api_data, api_timings = await orchestrator._gather_api_data("manzanilla")
+
+    assert api_timings["pubmed"]["status"] == "timeout"
+    assert api_timings["pubchem"]["status"] == "error"
+    assert "error" in api_data["pubchem"]
+    assert api_data["uniprot"] == [{"id": "P12345"}]
+    assert all(timing["status"] == "ok" for name, timing in api_timings.items()
+               if name in ("nasa", "uniprot", "trefle"))
+
+class _FakeAuditLog:
+    def __init__(self):
+        self.records = []
+
+    async def record(self, **record):
+        self.records.append(record)
+
+async def test_stream_query_emits_progressive_events(orchestrator, monkeypatch):
+    from src.orchestrator.scheduler import AgentScheduler
+
+    class _Agent:
+        async def process_query(self, query, context=None):
+            return {"response": "Análisis médico", "confidence": 0.9}
+
+    async def fake_stream(prompt, **kwargs):
+        for token in ["La manzanilla ", "es una planta."]:
+            yield token
+
+    fast_api = _FastAPI()
+    orchestrator.external_apis = {
+        'pubmed': _SlowAPI(),
+        'pubchem': _FailingAPI(),
+        'nasa': fast_api,
+        'uniprot': fast_api,
+        'trefle': fast_api
+    }
+    monkeypatch.setattr(settings, "API_SOURCE_TIMEOUTS", {"pubmed": 0.05})
+    orchestrator.audit_log = _FakeAuditLog()
+    orchestrator.semantic_cache = SemanticCache(enabled=False)
+    monkeypatch.setattr(orchestrator.translator, "to_english", lambda text: text)
+    monkeypatch.setattr(orchestrator.translator, "to_spanish", lambda text: text)
+    monkeypatch.setattr(orchestrator.groq_client, "stream_response", fake_stream)
+    orchestrator.scheduler = AgentScheduler({"medical": _Agent()})
+
+    events = [event async for event in orchestrator.stream_query("manzanilla", "test_user", domain="medical")]
+    kinds = [event["event"] for event in events]
+
+    assert kinds.count("api_result") == 5
+    assert kinds.index("agent_result") > max(i for i, kind in enumerate(kinds) if kind == "api_result")
+    assert [event["data"] for event in events if event["event"] == "token"] == [
+        "La manzanilla ", "es una planta."
+    ]
+    assert kinds[-1] == "done"
+    assert events[-1]["data"]["response"] == "La manzanilla es una planta."
+    record = orchestrator.audit_log.records[0]
+    assert record["user_id"] == "test_user" and record["query_text"] == "manzanilla"
+    assert [result["domain"] for result in record["results"]] == ["integrated", "medical"]
+    assert all(result["response"] == "La manzanilla es una planta." for result in record["results"])
+
+async def test_semantic_cache_hit_skips_the_pipeline(orchestrator):
+    from tests.unit.test_semantic_cache import FakeEmbedder
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("no debería ejecutarse el pipeline")
+
+    orchestrator.audit_log = _FakeAuditLog()
+    orchestrator.semantic_cache = SemanticCache(FakeEmbedder(), threshold=0.8, enabled=True)
+    await orchestrator.semantic_cache.store(
+        "efectos de la manzanilla",
+        {"response": "Es calmante.", "confidence": 0.9, "metadata": {}},
+        ["medical"]
+    )
+    orchestrator._collect_responses = fail
+
+    result = await orchestrator.process_query("¿Qué efectos tiene la manzanilla?", "test_user")
+
+    assert result["response"] == "Es calmante."
+    assert result["metadata"]["semantic_cache"]["hit"] is True
+    assert len(orchestrator.audit_log.records) == 1
+
+async def test_identical_concurrent_queries_run_the_pipeline_once(orchestrator):
+    from src.orchestrator.result_cache import ResultCache
+
+    runs = []
+
+    async def collect(query, context=None, **kwargs):
+        runs.append(query)
+        await asyncio.sleep(0.05)
+        return {"medical": {"response": "ok", "confidence": 0.9}}, {}, {}, {}
+
+    async def integrate(responses, query, context=None):
+        return {"response": "Es calmante.", "confidence": 0.9, "sources": responses}
+
+    orchestrator.audit_log = _FakeAuditLog()
+    orchestrator.semantic_cache = SemanticCache(enabled=False)
+    orchestrator.result_cache = ResultCache(enabled=True)
+    orchestrator._collect_responses = collect
+    orchestrator._integrate_responses = integrate
+
+    results = await asyncio.gather(*(
+        orchestrator.process_query("Efectos de la manzanilla", f"user_{i}") for i in range(4)
+    ))
+    again = await orchestrator.process_query("efectos de la manzanilla?", "user_5")
+
+    assert len(runs) == 1
+    assert sum(bool(result["metadata"].get("coalesced")) for result in results) == 3
+    assert again["metadata"]["result_cache"]["hit"] is True
+    assert len(orchestrator.audit_log.records) == 5
+
+async def test_pending_fetches_are_cancelled_when_agents_fail(orchestrator, monkeypatch):
+    cancelled = asyncio.Event()
+
+    class _HangingAPI(_FastAPI):
+        async def search_articles(self, query):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    class _FailingScheduler:
+        async def run(self, query, context, on_result=None):
+            raise RuntimeError("agentes no disponibles")
+
+    monkeypatch.setattr(settings, "API_GATHER_MODE", "concurrent")
+    monkeypatch.setattr(settings, "API_SOURCE_TIMEOUTS", {"pubmed": 0.05})
+    fast_api = _FastAPI()
+    orchestrator.external_apis = {
+        'pubmed': _HangingAPI(),
+        'pubchem': _FailingAPI(),
+        'nasa': fast_api,
+        'uniprot': fast_api,
+        'trefle': fast_api
+    }
+    orchestrator.scheduler = _FailingScheduler()
+
+    with pytest.raises(RuntimeError):
+        await orchestrator._collect_responses("manzanilla")
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+async def test_agent_fetch_is_bounded_by_the_source_timeout(orchestrator, monkeypatch):
+    from src.orchestrator.scheduler import AgentScheduler
+    from src.agents.medical_agent import MedicalAgent
+
+    monkeypatch.setattr(settings, "API_GATHER_MODE", "concurrent")
+    monkeypatch.setattr(settings, "API_SOURCE_TIMEOUTS", {"pubmed": 0.05})
+    slow_api = _SlowAPI()
+    fast_api = _FastAPI()
+    orchestrator.external_apis = {
+        'pubmed': slow_api,
+        'pubchem': _FailingAPI(),
+        'nasa': fast_api,
+        'uniprot': fast_api,
+        'trefle': fast_api
+    }
+    orchestrator.scheduler = AgentScheduler({"medical": MedicalAgent(pubmed_api=slow_api)})
+    agent_results = {}
+
+    # El agente reutiliza la petición a PubMed que sigue en curso tras el
+    # timeout del orchestrator; su espera debe cortarse con el mismo plazo
+    await asyncio.wait_for(
+        orchestrator._collect_responses(
+            "manzanilla",
+            on_agent=lambda domain, response: agent_results.update({domain: response})
+        ),
+        timeout=1
+    )
+
+    assert agent_results["medical"]["status"] == "error"
+    assert "Plazo agotado" in agent_results["medical"]["message"]
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.utils.audit_log import AuditLogWriter, FLUSH_BEFORE_RESPOND
+from src.utils.database import init_db, create_async_db_engine, Query, QueryResult
+from src.utils.exceptions import DatabaseError
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    url = f"sqlite:///{tmp_path / 'audit.db'}"
+    init_db(url).dispose()
+    engine = create_async_db_engine(url)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+async def _count(session_factory, model):
+    async with session_factory() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar()
+
+def _result(domain):
+    return {"response": "respuesta", "confidence": 0.9, "domain": domain}
+
+async def test_records_are_written_in_one_batch_when_full(session_factory):
+    writer = AuditLogWriter(session_factory, batch_size=3, flush_interval=60)
+    for i in range(3):
+        await writer.record(user_id=1, query_text=f"consulta {i}", results=[_result("integrated")])
+
+    await asyncio.sleep(0.2)
+    assert await _count(session_factory, Query) == 3
+    assert writer.stats()["batches"] == 1
+    await writer.close()
+
+async def test_flush_before_respond_waits_for_the_commit(session_factory):
+    writer = AuditLogWriter(session_factory, batch_size=100, flush_interval=60)
+    await writer.record(
+        user_id=1,
+        query_text="manzanilla",
+        results=[_result("integrated"), _result("medical")],
+        durability=FLUSH_BEFORE_RESPOND
+    )
+
+    assert await _count(session_factory, QueryResult) == 2
+    await writer.close()
+
+async def test_close_writes_pending_records(session_factory):
+    writer = AuditLogWriter(session_factory, batch_size=100, flush_interval=60)
+    await writer.record(user_id=1, query_text="manzanilla", results=[_result("integrated")])
+    assert await _count(session_factory, Query) == 0
+
+    await writer.close()
+    assert await _count(session_factory, Query) == 1
+
+async def test_failed_write_is_retried_or_reported(session_factory):
+    class _BrokenSession:
+        def add(self, obj):
+            pass
+
+        async def commit(self):
+            raise RuntimeError("disco lleno")
+
+        async def rollback(self):
+            pass
+
+        async def close(self):
+            pass
+
+    writer = AuditLogWriter(_BrokenSession, batch_size=100, flush_interval=60)
+    await writer.record(user_id=1, query_text="a", results=[])
+    with pytest.raises(DatabaseError):
+        await writer.record(user_id=1, query_text="b", results=[], durability=FLUSH_BEFORE_RESPOND)
+
+    # El registro sin espera sigue en la cola y se escribe al recuperarse
+    assert writer.stats()["pending"] == 1
+    writer.session_factory = session_factory
+    await writer.close()
+    assert await _count(session_factory, Query) == 1
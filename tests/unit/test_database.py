@@ -1,6 +1,8 @@
 import pytest
 from sqlalchemy.orm import Session
-from src.utils.database import init_db, get_session, User, Query, QueryResult
+from src.utils.database import (
+    init_db, get_session_factory, create_db_engine, get_db, User, Query, QueryResult
+)
 
 @pytest.fixture
 def test_db():
@@ -10,7 +12,7 @@ def test_db():
 
 @pytest.fixture
 def session(test_db):
-    Session = get_session()
+    Session = get_session_factory(test_db)
     session = Session()
     try:
         yield session
@@ -59,4 +61,63 @@ def test_create_query_result(session):
     session.commit()
     
     assert result.id is not None
-    assert result.confidence == 0.9
\ No newline at end of file
+    assert result.confidence == 0.9
+
+def test_file_database_uses_configured_pool(tmp_path, monkeypatch):
+    from src.utils.config import settings
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    try:
+        assert engine.pool.size() == 3
+    finally:
+        engine.dispose()
+
+def test_get_db_rolls_back_and_closes_on_error(monkeypatch):
+    from src.utils import database
+
+    class _Session:
+        rolled_back = closed = False
+
+        def rollback(self):
+            self.rolled_back = True
+
+        def close(self):
+            self.closed = True
+
+    fake = _Session()
+    monkeypatch.setattr(database, "get_session", lambda: fake)
+    dependency = get_db()
+    assert next(dependency) is fake
+    with pytest.raises(RuntimeError):
+        dependency.throw(RuntimeError("fallo en el manejador"))
+    assert fake.rolled_back and fake.closed
+
+def test_async_url_uses_async_driver():
+    from src.utils.database import async_database_url
+    assert async_database_url("sqlite:///medical_expert.db").drivername == "sqlite+aiosqlite"
+    assert async_database_url("postgresql://u:p@db/expert").drivername == "postgresql+asyncpg"
+    assert async_database_url("postgresql+psycopg2://u:p@db/expert").drivername == "postgresql+asyncpg"
+    assert async_database_url("sqlite+pysqlite:///medical_expert.db").drivername == "sqlite+aiosqlite"
+    assert async_database_url("postgresql+asyncpg://u:p@db/expert").drivername == "postgresql+asyncpg"
+
+async def test_async_session_persists_query_and_result(tmp_path):
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from src.utils.database import create_async_db_engine
+
+    path = tmp_path / "async.db"
+    init_db(f"sqlite:///{path}").dispose()
+    engine = create_async_db_engine(f"sqlite:///{path}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with Session() as session:
+            query = Query(user_id=1, query_text="manzanilla")
+            session.add(QueryResult(query=query, response="ok", confidence=0.8, domain="medical"))
+            await session.commit()
+
+        async with Session() as session:
+            stored = (await session.execute(select(QueryResult))).scalars().one()
+            assert stored.query_id == query.id
+            assert stored.domain == "medical"
+    finally:
+        await engine.dispose()
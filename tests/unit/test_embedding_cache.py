@@ -0,0 +1,77 @@
+import numpy as np
+from src.rag.embeddings.embedding_cache import EmbeddingCache, cache_path_for
+
+def _vectors(n, dimension=4):
+    return np.arange(n * dimension, dtype=np.float32).reshape(n, dimension)
+
+def test_capacity_comes_from_the_memory_budget_and_evicts_lru():
+    cache = EmbeddingCache("modelo", 4, max_bytes=3 * 4 * 4)
+    cache.put_many(["a", "b", "c"], _vectors(3))
+    assert cache.capacity == 3
+
+    cache.get("a")
+    cache.put("d", np.ones(4))
+
+    assert cache.get("b") is None
+    np.testing.assert_array_equal(cache.get("a"), _vectors(3)[0])
+    np.testing.assert_array_equal(cache.get("d"), np.ones(4, dtype=np.float32))
+
+def test_get_many_reports_missing_positions():
+    cache = EmbeddingCache("modelo", 4, max_bytes=1024)
+    cache.put_many(["a", "c"], _vectors(2))
+
+    found, missing = cache.get_many(["a", "b", "c"])
+
+    assert missing == [1]
+    np.testing.assert_array_equal(found[[0, 2]], _vectors(2))
+    assert found.dtype == np.float32
+
+def test_memory_mapped_cache_survives_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    cache = EmbeddingCache("modelo", 4, max_bytes=1024, path=path)
+    cache.put_many(["a", "b"], _vectors(2))
+    cache.close()
+
+    restarted = EmbeddingCache("modelo", 4, max_bytes=1024, path=path)
+    np.testing.assert_array_equal(restarted.get("b"), _vectors(2)[1])
+
+    # Otro modelo o dimensión no reutiliza el fichero
+    assert EmbeddingCache("otro", 4, max_bytes=1024, path=path).get("b") is None
+
+def test_encoder_variants_do_not_share_embeddings(tmp_path):
+    paths = {name: cache_path_for("org/modelo", name, str(tmp_path)) for name in ("torch", "onnx", "onnx-int8")}
+    assert len(set(paths.values())) == 3
+
+    path = str(tmp_path / "embeddings.f32")
+    cache = EmbeddingCache("modelo", 4, max_bytes=1024, path=path, encoder_name="onnx")
+    cache.put("a", np.ones(4))
+    cache.close()
+
+    # Aunque compartan fichero, el índice de otro motor se descarta
+    assert EmbeddingCache("modelo", 4, max_bytes=1024, path=path, encoder_name="onnx-int8").get("a") is None
+
+def test_rows_reused_after_the_last_index_flush_are_not_served(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    cache = EmbeddingCache("modelo", 4, max_bytes=2 * 4 * 4, path=path)
+    cache.put_many(["a", "b"], _vectors(2))
+    cache.flush()
+    cache.put("z", np.ones(4))  # Expulsa "a" y reutiliza su fila
+
+    # Reinicio sin volcar el índice: el índice en disco aún apunta "a" a esa fila
+    cache._lock_file.close()
+    restarted = EmbeddingCache("modelo", 4, max_bytes=2 * 4 * 4, path=path)
+
+    assert restarted.get("a") is None
+    np.testing.assert_array_equal(restarted.get("b"), _vectors(2)[1])
+
+def test_each_process_gets_its_own_cache_file(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    first = EmbeddingCache("modelo", 4, max_bytes=1024, path=path)
+    second = EmbeddingCache("modelo", 4, max_bytes=1024, path=path)
+
+    assert first.path == path
+    assert second.path == str(tmp_path / "embeddings.1.f32")
+    first.put("a", np.ones(4))
+    assert second.get("a") is None
+    first.close()
+    second.close()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from src.rag.embeddings.embedding_cache import EmbeddingCache
+from src.rag.embeddings.embedding_manager import EmbeddingManager
+from src.rag.embeddings.encoder_backends import create_encoder
+from src.utils.exceptions import ConfigurationError
+
+@pytest.fixture(scope="module")
+def tiny_model(tiny_bert):
+    return tiny_bert("BertModel")
+
+@pytest.fixture
+def manager(tiny_model):
+    return EmbeddingManager(tiny_model, batch_size=3, cache=EmbeddingCache(tiny_model, 32, max_bytes=1 << 20))
+
+TEXTS = [
+    "manzanilla",
+    "efectos de la manzanilla en el sueño",
+    "té verde",
+    "radiación de células",
+    "hojas y flores de la planta de té verde con efectos",
+    "proteína"
+]
+
+def test_batch_returns_contiguous_float32_matrix(manager):
+    embeddings = manager.get_embeddings_batch(TEXTS)
+
+    assert embeddings.shape == (len(TEXTS), 32)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+def test_batching_and_padding_do_not_change_embeddings(manager):
+    batched = manager.get_embeddings_batch(TEXTS)
+    manager.cache.clear()
+    one_by_one = np.stack([manager.get_embeddings_batch([text])[0] for text in TEXTS])
+
+    np.testing.assert_allclose(batched, one_by_one, atol=1e-5)
+    np.testing.assert_allclose(manager.get_embedding(TEXTS[1]), batched[1], atol=1e-5)
+
+def test_empty_batch(manager):
+    assert manager.get_embeddings_batch([]).shape == (0, 32)
+
+def test_cached_texts_are_not_recomputed(manager, monkeypatch):
+    first = manager.get_embeddings_batch(TEXTS[:4])
+    computed = []
+    original = manager._compute_embeddings
+    monkeypatch.setattr(manager, "_compute_embeddings", lambda texts, batch_size=None: (
+        computed.extend(texts) or original(texts, batch_size)
+    ))
+
+    second = manager.get_embeddings_batch(TEXTS + [TEXTS[5]])
+
+    assert computed == [TEXTS[4], TEXTS[5]]
+    np.testing.assert_array_equal(second[:4], first)
+    np.testing.assert_array_equal(second[5], second[6])
+
+def test_unknown_backend_is_rejected(tiny_model):
+    with pytest.raises(ConfigurationError):
+        create_encoder(tiny_model, backend="tensorrt")
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_onnx_backend_matches_torch_embeddings(tiny_model, manager, tmp_path, quantize):
+    pytest.importorskip("onnxruntime")
+    from src.rag.embeddings.encoder_backends import OnnxEncoder
+
+    encoder = OnnxEncoder(tiny_model, model_dir=str(tmp_path), quantize=quantize)
+    assert encoder.name == ("onnx-int8" if quantize else "onnx")
+    onnx_manager = EmbeddingManager(
+        tiny_model,
+        batch_size=3,
+        cache=EmbeddingCache(tiny_model, 32, max_bytes=1 << 20),
+        encoder=encoder
+    )
+
+    expected = manager.get_embeddings_batch(TEXTS)
+    embeddings = onnx_manager.get_embeddings_batch(TEXTS)
+
+    assert embeddings.shape == expected.shape and embeddings.dtype == np.float32
+    cosine = np.sum(embeddings * expected, axis=1)
+    assert cosine.min() >= 0.99
+    if not quantize:
+        np.testing.assert_allclose(embeddings, expected, atol=1e-4)
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from src.external_apis.fetch_context import FetchContext
+
+
+async def test_identical_calls_are_deduplicated():
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["articulo"]
+
+    fetch_context = FetchContext()
+    first, second = await asyncio.gather(
+        fetch_context.fetch("pubmed", "Efectos de la manzanilla", search),
+        fetch_context.fetch("pubmed", "efectos de la  manzanilla?", search)
+    )
+
+    assert first == second == ["articulo"]
+    assert len(calls) == 1
+    assert fetch_context.stats() == {"hits": 1, "misses": 1}
+
+async def test_different_apis_are_not_shared():
+    fetch_context = FetchContext()
+
+    async def search():
+        return []
+
+    await fetch_context.fetch("pubmed", "manzanilla", search)
+    await fetch_context.fetch("trefle", "manzanilla", search)
+
+    assert fetch_context.stats() == {"hits": 0, "misses": 2}
+
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def search():
+        await asyncio.sleep(0.05)
+        return ["articulo"]
+
+    fetch_context = FetchContext()
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(fetch_context.fetch("pubmed", "manzanilla", search), 0.01)
+
+    assert await fetch_context.fetch("pubmed", "manzanilla", search) == ["articulo"]
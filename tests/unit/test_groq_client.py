@@ -0,0 +1,61 @@
+import pytest
+from types import SimpleNamespace
+from src.llm.groq_client import GroqClient
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for token in self.tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    def __init__(self, stream):
+        self.stream = stream
+        self.kwargs = None
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+        return self.stream
+
+
+@pytest.fixture
+def groq_client(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    return GroqClient()
+
+def _use_stream(groq_client, stream):
+    completions = FakeCompletions(stream)
+    groq_client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+async def test_stream_response_yields_tokens(groq_client):
+    stream = FakeStream(["La ", None, "manzanilla", " calma"])
+    completions = _use_stream(groq_client, stream)
+
+    tokens = [token async for token in groq_client.stream_response("consulta", context={"k": "v"})]
+
+    assert tokens == ["La ", "manzanilla", " calma"]
+    assert completions.kwargs["stream"] is True
+    assert completions.kwargs["messages"][0]["role"] == "system"
+    assert stream.closed
+
+async def test_stream_is_closed_when_consumer_stops(groq_client):
+    stream = FakeStream(["uno", "dos", "tres"])
+    _use_stream(groq_client, stream)
+
+    tokens = groq_client.stream_response("consulta")
+    assert await tokens.__anext__() == "uno"
+    await tokens.aclose()
+
+    assert stream.closed
@@ -0,0 +1,73 @@
+import datetime
+import pytest
+from sqlalchemy import func, inspect, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.utils.database import (
+    init_db, create_async_db_engine, Query, QueryResult, QueryArchive, QueryResultArchive
+)
+from src.utils.history import get_user_history, archive_old_queries, purge_archive
+
+NOW = datetime.datetime(2026, 10, 18, 12, 0)
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    url = f"sqlite:///{tmp_path / 'history.db'}"
+    init_db(url).dispose()
+    engine = create_async_db_engine(url)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        for day in range(5):
+            query = Query(user_id=1, query_text=f"consulta {day}", timestamp=NOW - datetime.timedelta(days=day))
+            session.add(QueryResult(query=query, response="r", confidence=0.9, domain="integrated"))
+            if day % 2 == 0:
+                session.add(QueryResult(query=query, response="r", confidence=0.8, domain="medical"))
+        session.add(Query(user_id=2, query_text="otro usuario", timestamp=NOW))
+        session.add(Query(user_id=1, query_text="antigua", timestamp=NOW - datetime.timedelta(days=400)))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+def test_init_db_creates_history_indexes(tmp_path):
+    engine = init_db(f"sqlite:///{tmp_path / 'indexes.db'}")
+    inspector = inspect(engine)
+    assert {"ix_queries_user_id_timestamp", "ix_queries_timestamp"} <= {
+        index["name"] for index in inspector.get_indexes("queries")
+    }
+    assert "ix_query_results_query_id_domain" in {
+        index["name"] for index in inspector.get_indexes("query_results")
+    }
+    engine.dispose()
+
+async def test_history_pages_follow_the_cursor(session_factory):
+    async with session_factory() as session:
+        first = await get_user_history(session, 1, limit=4)
+        second = await get_user_history(session, 1, limit=4, cursor=first["next_cursor"])
+
+    assert [item["query"] for item in first["items"]] == [f"consulta {day}" for day in range(4)]
+    assert [item["query"] for item in second["items"]] == ["consulta 4", "antigua"]
+    assert second["next_cursor"] is None
+    assert {result["domain"] for result in first["items"][0]["results"]} == {"integrated", "medical"}
+
+async def test_history_filters_by_domain(session_factory):
+    async with session_factory() as session:
+        page = await get_user_history(session, 1, domain="medical")
+
+    assert [item["query"] for item in page["items"]] == ["consulta 0", "consulta 2", "consulta 4"]
+    assert all(len(item["results"]) == 1 for item in page["items"])
+
+async def test_invalid_cursor_is_rejected(session_factory):
+    async with session_factory() as session:
+        with pytest.raises(ValueError):
+            await get_user_history(session, 1, cursor="no-es-un-cursor")
+
+async def test_old_queries_are_archived_by_month_and_purged(session_factory):
+    archived = await archive_old_queries(session_factory, retention_days=3, batch_size=1, now=NOW)
+    assert archived == 2
+
+    async with session_factory() as session:
+        assert (await session.execute(select(func.count()).select_from(Query))).scalar() == 5
+        buckets = set((await session.execute(select(QueryArchive.bucket))).scalars())
+        assert buckets == {"2025-09", "2026-10"}
+        assert (await session.execute(select(func.count()).select_from(QueryResultArchive))).scalar() == 2
+
+    assert await purge_archive(session_factory, keep_months=12, now=NOW) == 1
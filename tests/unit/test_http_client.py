@@ -0,0 +1,102 @@
+import asyncio
+import gc
+import http.server
+import threading
+import warnings
+import httpx
+import pytest
+from src.external_apis.http_client import AsyncHTTPClient
+
+
+def _handler(request):
+    return httpx.Response(200, json={"host": request.url.host, "params": dict(request.url.params)})
+
+
+async def test_one_pool_per_host():
+    client = AsyncHTTPClient(http2=False, transport=httpx.MockTransport(_handler))
+
+    first = await client.get("https://rest.uniprot.org/uniprotkb/search", params={"query": "insulin"})
+    await client.get("https://rest.uniprot.org/uniprotkb/stream")
+    await client.get("https://trefle.io/api/v1/plants/search")
+
+    assert first.is_success
+    assert first.json() == {"host": "rest.uniprot.org", "params": {"query": "insulin"}}
+    assert len(client._clients) == 2
+
+    await client.aclose()
+    assert client._clients == {}
+
+
+@pytest.fixture
+def local_server():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_client_is_closed_when_its_loop_finishes(local_server):
+    client = AsyncHTTPClient(http2=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", ResourceWarning)
+        asyncio.run(client.get(local_server))
+        (_, stale, _), = client._clients.values()
+        assert stale.is_closed
+
+        asyncio.run(client.get(local_server))
+        gc.collect()
+
+    asyncio.run(client.aclose())
+    assert client._clients == {}
+
+
+def test_sockets_are_closed_if_the_loop_was_not_finalized(local_server):
+    client = AsyncHTTPClient(http2=False)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(client.get(local_server))
+    loop.close()
+    (_, stale, _), = client._clients.values()
+    sockets = [
+        connection._connection._network_stream.get_extra_info("socket")
+        for connection in stale._transport._pool.connections
+    ]
+
+    asyncio.run(client.get(local_server))
+
+    assert sockets and all(sock.fileno() == -1 for sock in sockets)
+
+
+def test_client_of_a_running_loop_is_closed_in_that_loop(local_server):
+    client = AsyncHTTPClient(http2=False)
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(client.get(local_server), other_loop).result(timeout=5)
+    (_, stale, _), = client._clients.values()
+
+    async def request_and_wait():
+        await client.get(local_server)
+        for _ in range(100):
+            if stale.is_closed:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(request_and_wait())
+
+    assert stale.is_closed
+    other_loop.call_soon_threadsafe(other_loop.stop)
+    thread.join(timeout=5)
+    other_loop.close()
@@ -0,0 +1,61 @@
+import pytest
+
+from src.rag.vector_store.lexical_index import LexicalIndex, query_terms
+
+DOCUMENTS = {
+    "d1": "La cafeína (CAS 58-08-2) es un estimulante del sistema nervioso.",
+    "d2": "Matricaria chamomilla se usa como infusión para el sueño.",
+    "d3": "El gen BRCA1 y la interleucina IL-6 participan en la inflamación.",
+    "d4": "El té verde contiene cafeína y catequinas."
+}
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"), ["medical", "botanical"])
+    index.add("medical", list(DOCUMENTS), list(DOCUMENTS.values()))
+    yield index
+    index.close()
+
+def ids(hits):
+    return [doc_id for doc_id, _, _ in hits]
+
+def test_query_terms_keep_hyphenated_codes():
+    assert query_terms("¿Qué es el CAS 58-08-2 y la IL-6? cas") == ["qué", "es", "el", "cas", "58-08-2", "y", "la", "il-6"]
+
+def test_exact_codes_and_symbols_are_found(index):
+    assert ids(index.search("58-08-2", "medical")) == ["d1"]
+    assert ids(index.search("il-6", "medical")) == ["d3"]
+    assert ids(index.search("BRCA1", "medical")) == ["d3"]
+    assert ids(index.search("matricaria chamomilla", "medical")) == ["d2"]
+
+def test_matching_ignores_case_and_accents(index):
+    assert set(ids(index.search("CAFEINA", "medical"))) == {"d1", "d4"}
+
+def test_rarer_terms_rank_higher(index):
+    hits = index.search("cafeína catequinas", "medical")
+
+    assert ids(hits)[0] == "d4"
+    assert hits[0][1] > hits[1][1] > 0
+    assert hits[0][2] == DOCUMENTS["d4"]
+
+def test_domains_are_independent(index):
+    assert index.search("cafeína", "botanical") == []
+    with pytest.raises(ValueError):
+        index.search("cafeína", "astrology")
+
+def test_incremental_update_and_delete(index):
+    index.add("medical", ["d1"], ["La teobromina abunda en el cacao."])
+    index.delete("medical", ["d4"])
+
+    assert index.search("cafeína", "medical") == []
+    assert ids(index.search("teobromina", "medical")) == ["d1"]
+    assert index.count("medical") == 3
+
+def test_index_persists(index, tmp_path):
+    reopened = LexicalIndex(str(tmp_path / "lexical.sqlite3"), ["medical", "botanical"])
+
+    assert ids(reopened.search("58-08-2", "medical")) == ["d1"]
+    reopened.close()
+
+def test_queries_without_terms_return_nothing(index):
+    assert index.search("¿?", "medical") == []
@@ -0,0 +1,165 @@
+import os
+import numpy as np
+import pytest
+
+from src.rag.vector_store.quantized_store import QuantizedVectorStore, matches_filter, quantize
+
+DIMENSION = 32
+
+def random_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def exact_ids(vectors, query, k):
+    distances = np.sum((vectors - query) ** 2, axis=1)
+    return [f"v{i}" for i in np.argsort(distances)[:k]]
+
+@pytest.fixture
+def vectors():
+    return random_vectors(500)
+
+@pytest.fixture
+def store(tmp_path, vectors):
+    store = QuantizedVectorStore(str(tmp_path / "medical"), space="l2")
+    ids = [f"v{i}" for i in range(len(vectors))]
+    store.add(ids, vectors, [f"texto {i}" for i in range(len(vectors))], [{"n": i} for i in range(len(vectors))])
+    yield store
+    store.close()
+
+def test_quantization_error_is_small(vectors):
+    codes, scales = quantize(vectors)
+
+    assert codes.dtype == np.int8
+    np.testing.assert_allclose(codes * scales[:, None], vectors, atol=scales.max() / 2 + 1e-6)
+
+def test_rescored_search_is_exact(store, vectors):
+    query = random_vectors(1, seed=1)[0]
+
+    result = store.search(query, n_results=10, candidates=50)
+
+    assert result["ids"] == exact_ids(vectors, query, 10)
+    expected = np.sum((vectors[int(result["ids"][0][1:])] - query) ** 2)
+    assert result["distances"][0] == pytest.approx(float(expected), abs=1e-5)
+    assert result["documents"][0] == f"texto {result['ids'][0][1:]}"
+    assert result["metadatas"][0] == {"n": int(result["ids"][0][1:])}
+
+def test_recall_without_rescoring_is_high(store, vectors):
+    queries = random_vectors(20, seed=2)
+    recall = np.mean([
+        len(set(store.search(query, 10, rescore=False)["ids"]) & set(exact_ids(vectors, query, 10))) / 10
+        for query in queries
+    ])
+
+    assert recall >= 0.9
+
+def test_memory_is_a_fraction_of_float32(tmp_path):
+    store = QuantizedVectorStore(str(tmp_path / "large"))
+    vectors = np.random.default_rng(0).normal(size=(1024, 384)).astype(np.float32)
+    store.add([f"v{i}" for i in range(1024)], vectors, [""] * 1024, [None] * 1024)
+
+    usage = store.memory_usage()
+
+    assert usage["vectors"] == 1024 and usage["dimension"] == 384
+    assert usage["float32_bytes"] == 1024 * 384 * 4
+    assert usage["ram_bytes"] == 1024 * (384 + 9) + usage["id_bytes"]
+    assert usage["id_bytes"] > 1024 * 50
+    assert usage["compression"] >= 2.5
+    store.close()
+
+def test_store_reloads_from_disk(store, tmp_path, vectors):
+    query = random_vectors(1, seed=3)[0]
+    expected = store.search(query, n_results=5)
+    store.close()
+
+    reopened = QuantizedVectorStore(str(tmp_path / "medical"), space="l2")
+
+    assert reopened.count() == 500
+    assert reopened.search(query, n_results=5) == expected
+    reopened.close()
+
+def test_delete_replace_and_compact(store, tmp_path, vectors):
+    store.delete(["v0", "v1"])
+    store.add(["v2"], vectors[:1], ["nuevo"], [{"n": -1}])
+
+    result = store.search(vectors[0], n_results=1)
+    assert result["ids"] == ["v2"] and result["documents"] == ["nuevo"]
+    assert store.count() == 498
+
+    assert store.compact() == 498
+    assert store.size == 498
+    assert store.search(vectors[0], n_results=1)["ids"] == ["v2"]
+    assert store.get_metadatas(["v2", "v0"]) == {"v2": {"n": -1}}
+
+def test_metadata_filter(store, vectors):
+    result = store.search(vectors[10], n_results=3, metadata_filter={"n": {"$in": [10, 20, 30]}})
+
+    assert result["ids"][0] == "v10"
+    assert set(result["ids"]) == {"v10", "v20", "v30"}
+
+def test_filter_syntax():
+    metadata = {"source": "pubmed", "year": 2020}
+
+    assert matches_filter(metadata, {"source": "pubmed"})
+    assert matches_filter(metadata, {"$and": [{"year": {"$gte": 2019}}, {"source": {"$ne": "trefle"}}]})
+    assert not matches_filter(metadata, {"$or": [{"year": {"$lt": 2000}}, {"source": "nasa"}]})
+    assert not matches_filter(None, {"year": {"$gt": 1}})
+
+def test_empty_store(tmp_path):
+    store = QuantizedVectorStore(str(tmp_path / "empty"))
+
+    assert store.search(np.ones(DIMENSION), n_results=3)["ids"] == []
+    assert store.memory_usage()["vectors"] == 0
+    store.close()
+
+def test_failed_add_leaves_store_usable(store, tmp_path, vectors):
+    with pytest.raises(ValueError):
+        store.add(["a", "a"], vectors[:2])
+
+    # Un fallo de SQLite a mitad del lote se deshace por completo
+    store._connection.execute("CREATE TRIGGER reject BEFORE INSERT ON records WHEN NEW.doc_id = 'b' "
+                              "BEGIN SELECT RAISE(ABORT, 'rechazado'); END")
+    with pytest.raises(Exception):
+        store.add(["a", "b"], vectors[:2])
+    store._connection.execute("DROP TRIGGER reject")
+
+    store.add(["c"], vectors[:1])
+    assert store.count() == 501 and store.size == 501
+    assert os.path.getsize(tmp_path / "medical" / "scales.f32") == 501 * 4
+    assert set(store.search(vectors[0], n_results=2)["ids"]) == {"v0", "c"}
+
+def test_compaction_interrupted_before_swap_keeps_data(store, tmp_path, vectors, monkeypatch):
+    store.delete(["v0"])
+    monkeypatch.setattr(os, "replace", lambda *args: (_ for _ in ()).throw(OSError("fallo")))
+
+    with pytest.raises(OSError):
+        store.compact(batch_size=100)
+    monkeypatch.undo()
+
+    reopened = QuantizedVectorStore(str(tmp_path / "medical"))
+    assert reopened.count() == 499
+    assert not os.path.exists(tmp_path / "medical.compacting")
+    reopened.close()
+
+def test_compaction_interrupted_between_renames_is_completed(store, tmp_path):
+    store.delete(["v0"])
+    replace = os.replace
+    calls = []
+
+    def crash_on_second(source, target):
+        calls.append(source)
+        if len(calls) == 2:
+            raise OSError("fallo")
+        replace(source, target)
+
+    os.replace = crash_on_second
+    try:
+        with pytest.raises(OSError):
+            store.compact(batch_size=100)
+    finally:
+        os.replace = replace
+
+    assert not os.path.exists(tmp_path / "medical")
+    reopened = QuantizedVectorStore(str(tmp_path / "medical"))
+    assert reopened.count() == 499 and reopened.size == 499
+    assert not os.path.exists(tmp_path / "medical.previous")
+    reopened.close()
@@ -0,0 +1,75 @@
+import time
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from src.rag.retriever.reranker import CrossEncoderReranker
+
+@pytest.fixture(scope="module")
+def tiny_cross_encoder(tiny_bert):
+    return tiny_bert("BertForSequenceClassification", num_labels=1)
+
+QUERY = "manzanilla para el insomnio"
+PASSAGES = [
+    "té verde",
+    "la manzanilla de flores y hojas en infusión",
+    "cafeína",
+    "efectos de la cafeína estimulante",
+    "manzanilla",
+    "el sueño"
+]
+
+def documents():
+    return [{"id": f"d{i}", "content": text, "rank": i + 1} for i, text in enumerate(PASSAGES)]
+
+def test_batched_scores_match_single_pair_scores(tiny_cross_encoder):
+    batched = CrossEncoderReranker(tiny_cross_encoder, batch_size=4).score(QUERY, PASSAGES)
+    single = CrossEncoderReranker(tiny_cross_encoder, batch_size=1).score(QUERY, PASSAGES)
+
+    assert batched.dtype == np.float32 and batched.shape == (len(PASSAGES),)
+    np.testing.assert_allclose(batched, single, atol=1e-5)
+
+async def test_rerank_orders_by_cross_encoder_score(tiny_cross_encoder):
+    reranker = CrossEncoderReranker(tiny_cross_encoder, batch_size=4, time_budget=30)
+    scores = reranker.score(QUERY, PASSAGES)
+
+    reranked = await reranker.rerank(QUERY, documents(), top_k=3)
+
+    expected = [f"d{i}" for i in np.argsort(-scores, kind="stable")[:3]]
+    assert [document["id"] for document in reranked] == expected
+    assert [document["rank"] for document in reranked] == [1, 2, 3]
+    assert reranked[0]["rerank_score"] == pytest.approx(float(scores.max()), abs=1e-5)
+    assert reranker.stats()["reranked"] == 1
+
+async def test_exhausted_budget_keeps_first_stage_order(tiny_cross_encoder, monkeypatch):
+    reranker = CrossEncoderReranker(tiny_cross_encoder, time_budget=0.05)
+    original = reranker.score
+    monkeypatch.setattr(reranker, "score", lambda *args: time.sleep(0.2) or original(*args))
+
+    reranked = await reranker.rerank(QUERY, documents(), top_k=2)
+
+    assert reranked == documents()[:2]
+    assert reranker.stats()["budget_exceeded"] == 1
+
+def test_deadline_stops_scoring_between_batches(tiny_cross_encoder):
+    reranker = CrossEncoderReranker(tiny_cross_encoder, batch_size=2)
+
+    assert reranker.score(QUERY, PASSAGES, deadline=time.monotonic() - 1) is None
+
+async def test_rerank_groups_splits_results_per_domain(tiny_cross_encoder):
+    reranker = CrossEncoderReranker(tiny_cross_encoder, time_budget=30)
+    groups = {"botanical": documents()[:4], "medical": documents()[4:], "chemical": []}
+
+    reranked = await reranker.rerank_groups(QUERY, groups, {"botanical": 2, "medical": 5, "chemical": 3})
+
+    assert len(reranked["botanical"]) == 2 and len(reranked["medical"]) == 2
+    assert reranked["chemical"] == []
+    assert {document["id"] for document in reranked["medical"]} == {"d4", "d5"}
+
+async def test_model_errors_fall_back_to_first_stage_order(tmp_path):
+    reranker = CrossEncoderReranker(str(tmp_path / "missing"), time_budget=30)
+
+    assert await reranker.rerank(QUERY, documents(), top_k=3) == documents()[:3]
+    assert reranker.stats()["errors"] == 1
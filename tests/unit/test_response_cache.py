@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from src.external_apis.cache import CachePolicy, ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(
+        policies={
+            'pubchem': CachePolicy(ttl=60, negative_ttl=10, stale_ttl=60),
+            'nasa': CachePolicy(ttl=86400, negative_ttl=60, date_scoped=True)
+        },
+        memory_entries=16,
+        enabled=True,
+        clock=clock
+    )
+
+async def test_fresh_entry_is_served_from_cache(cache):
+    fetch = CountingFetch({"cid": 2244})
+
+    assert await cache.get_or_fetch('pubchem', 'aspirin', fetch) == {"cid": 2244}
+    assert await cache.get_or_fetch('pubchem', 'aspirin', fetch) == {"cid": 2244}
+
+    assert fetch.calls == 1
+    assert cache.stats()["apis"]["pubchem"]["hits"] == 1
+    assert cache.stats()["apis"]["pubchem"]["misses"] == 1
+
+async def test_not_found_uses_negative_ttl(cache, clock):
+    fetch = CountingFetch(None)
+
+    await cache.get_or_fetch('pubchem', 'desconocido', fetch)
+    await cache.get_or_fetch('pubchem', 'desconocido', fetch)
+    assert fetch.calls == 1
+    assert cache.stats()["apis"]["pubchem"]["negative_hits"] == 1
+
+    clock.now += 11
+    await cache.get_or_fetch('pubchem', 'desconocido', fetch)
+    assert fetch.calls == 2
+
+async def test_stale_entry_is_served_while_revalidating(cache, clock):
+    await cache.get_or_fetch('pubchem', 'aspirin', CountingFetch("antiguo"))
+    clock.now += 90
+    refresh = CountingFetch("nuevo")
+
+    assert await cache.get_or_fetch('pubchem', 'aspirin', refresh) == "antiguo"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert refresh.calls == 1
+    assert await cache.get_or_fetch('pubchem', 'aspirin', refresh) == "nuevo"
+    assert cache.stats()["apis"]["pubchem"]["stale_hits"] == 1
+
+async def test_nasa_entries_are_scoped_to_the_day(cache, clock):
+    fetch = CountingFetch({"title": "APOD"})
+
+    await cache.get_or_fetch('nasa', 'apod', fetch)
+    await cache.get_or_fetch('nasa', 'apod', fetch)
+    clock.now += 86400
+    await cache.get_or_fetch('nasa', 'apod', fetch)
+
+    assert fetch.calls == 2
+
+async def test_disk_tier_survives_restart(tmp_path, clock):
+    path = str(tmp_path / "api_cache.sqlite3")
+    first = ResponseCache(disk_path=path, enabled=True, clock=clock)
+    await first.get_or_fetch('uniprot', 'insulin', CountingFetch({"results": [1]}))
+    first.close()
+
+    second = ResponseCache(disk_path=path, enabled=True, clock=clock)
+    fetch = CountingFetch({"results": [2]})
+
+    assert await second.get_or_fetch('uniprot', 'insulin', fetch) == {"results": [1]}
+    assert fetch.calls == 0
+    second.close()
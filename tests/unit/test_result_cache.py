@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from src.orchestrator.result_cache import ResultCache, SingleFlight, result_key
+
+async def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"response": "ok"}
+
+    results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert flight.in_flight() == 0
+
+async def test_errors_reach_every_caller_and_free_the_key():
+    flight = SingleFlight()
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("groq caído")
+
+    results = await asyncio.gather(flight.do("k", broken), flight.do("k", broken), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.in_flight() == 0
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    first = asyncio.ensure_future(flight.do("k", compute))
+    second = asyncio.ensure_future(flight.do("k", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == ("ok", True)
+
+def test_key_normalizes_query_and_hashes_context():
+    assert result_key("¿Efectos de la manzanilla?") == result_key("efectos de la  manzanilla")
+    assert result_key("manzanilla", {"edad": 30}) != result_key("manzanilla", {"edad": 31})
+    assert result_key("manzanilla", {"a": 1, "b": 2}) == result_key("manzanilla", {"b": 2, "a": 1})
+
+def test_cache_returns_copies_and_expires():
+    now = [0.0]
+    cache = ResultCache(max_entries=10, ttl=60, enabled=True, clock=lambda: now[0])
+    cache.set("k", {"response": "ok", "metadata": {}})
+
+    hit = cache.get("k")
+    hit["response"] = "modificada"
+    assert cache.get("k")["response"] == "ok"
+    assert hit["metadata"]["result_cache"]["hit"] is True
+
+    now[0] = 61
+    assert cache.get("k") is None
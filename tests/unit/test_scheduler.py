@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from src.agents.base_agent import BaseAgent
+from src.orchestrator.scheduler import AgentScheduler
+from src.utils.exceptions import ConfigurationError
+
+
+class FakeAgent(BaseAgent):
+    def __init__(self, name, log, delay=0.05, fail=False):
+        super().__init__()
+        self.name = name
+        self.log = log
+        self.delay = delay
+        self.fail = fail
+
+    async def process_query(self, query, context=None):
+        self.log.append(("start", self.name))
+        await asyncio.sleep(self.delay)
+        self.log.append(("end", self.name))
+        if self.fail:
+            raise RuntimeError("fallo simulado")
+        return {
+            "response": self.name,
+            "confidence": 0.9,
+            "inputs": sorted((context or {}).get("agent_outputs", {}))
+        }
+
+    async def validate_response(self, response):
+        return True
+
+
+class DependentAgent(FakeAgent):
+    depends_on = ("medical",)
+
+
+class LimitedAgent(FakeAgent):
+    max_concurrency = 1
+
+
+async def test_independent_agents_run_concurrently():
+    log = []
+    scheduler = AgentScheduler({
+        name: FakeAgent(name, log) for name in ("medical", "botanical", "chemical")
+    })
+
+    results = await scheduler.run("consulta")
+
+    assert list(results) == ["medical", "botanical", "chemical"]
+    assert [event for event, _ in log[:3]] == ["start", "start", "start"]
+
+async def test_dependent_agent_receives_dependency_output():
+    log = []
+    scheduler = AgentScheduler({
+        "chemical": DependentAgent("chemical", log),
+        "medical": FakeAgent("medical", log)
+    })
+
+    results = await scheduler.run("consulta")
+
+    assert scheduler.execution_order == ["medical", "chemical"]
+    assert log.index(("end", "medical")) < log.index(("start", "chemical"))
+    assert results["chemical"]["inputs"] == ["medical"]
+
+async def test_failed_agent_returns_error():
+    scheduler = AgentScheduler({"medical": FakeAgent("medical", [], fail=True)})
+
+    results = await scheduler.run("consulta")
+
+    assert results["medical"] == {"error": "fallo simulado"}
+
+async def test_concurrency_is_capped_per_agent_type():
+    log = []
+    scheduler = AgentScheduler({"medical": LimitedAgent("medical", log)})
+
+    await asyncio.gather(scheduler.run("uno"), scheduler.run("dos"))
+
+    assert [event for event, _ in log] == ["start", "end", "start", "end"]
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ConfigurationError):
+        AgentScheduler({"chemical": DependentAgent("chemical", [])})
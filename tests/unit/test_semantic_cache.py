@@ -0,0 +1,91 @@
+import pytest
+from src.orchestrator.semantic_cache import SemanticCache
+
+class FakeEmbedder:
+    """Embeddings por bolsa de palabras sobre un vocabulario fijo."""
+
+    VOCABULARY = ["efectos", "manzanilla", "tiene", "que", "radiación", "plantas", "cafeína"]
+
+    def __init__(self):
+        self.calls = []
+
+    def get_embedding(self, text):
+        self.calls.append(text)
+        words = text.split()
+        return [float(words.count(word)) for word in self.VOCABULARY]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def cache(clock):
+    return SemanticCache(FakeEmbedder(), threshold=0.8, ttl=60, max_entries=2, enabled=True, clock=clock)
+
+def _answer(text):
+    return {"response": text, "confidence": 0.9, "metadata": {"api_timings": {}}}
+
+async def test_paraphrase_hits_the_cache(cache):
+    await cache.store("Efectos de la manzanilla", _answer("calmante"), ["medical", "botanical"])
+
+    hit = await cache.lookup("¿Qué efectos tiene la manzanilla?")
+    assert hit["response"] == "calmante"
+    assert hit["metadata"]["semantic_cache"]["cached_query"] == "Efectos de la manzanilla"
+    assert hit["metadata"]["api_timings"] == {}
+    assert await cache.lookup("radiación en plantas") is None
+
+async def test_entries_expire_after_ttl(cache, clock):
+    await cache.store("efectos de la manzanilla", _answer("calmante"), ["medical"])
+    clock.now += 61
+    assert await cache.lookup("efectos de la manzanilla") is None
+    assert cache.stats()["entries"] == 0
+
+async def test_invalidation_is_per_domain(cache):
+    await cache.store("efectos de la manzanilla", _answer("calmante"), ["medical", "botanical"])
+    await cache.store("radiación en plantas", _answer("daño celular"), ["physical"])
+
+    assert cache.invalidate("botanical") == 1
+    assert await cache.lookup("efectos de la manzanilla") is None
+    assert (await cache.lookup("radiación en plantas"))["response"] == "daño celular"
+
+async def test_oldest_entry_is_evicted_when_full(cache):
+    await cache.store("efectos de la manzanilla", _answer("a"), [])
+    await cache.store("radiación en plantas", _answer("b"), [])
+    await cache.store("cafeína", _answer("c"), [])
+
+    assert await cache.lookup("efectos de la manzanilla") is None
+    assert (await cache.lookup("cafeína"))["response"] == "c"
+
+async def test_cache_disables_itself_without_embedding_model(monkeypatch):
+    cache = SemanticCache(enabled=True)
+
+    def missing_model():
+        raise OSError("modelo no disponible")
+    monkeypatch.setattr(cache, "_get_embedder", missing_model)
+
+    assert await cache.lookup("manzanilla") is None
+    assert cache.enabled is False
+
+async def test_failed_embedding_skips_the_cache_without_disabling_it(cache):
+    embedder = cache._embedder
+    cache._embedder = type("Flaky", (), {"get_embedding": lambda self, text: 1 / 0})()
+
+    assert await cache.lookup("efectos de la manzanilla") is None
+    assert cache.enabled is True
+
+    cache._embedder = embedder
+    await cache.store("efectos de la manzanilla", _answer("calmante"), [])
+    assert (await cache.lookup("efectos de la manzanilla"))["response"] == "calmante"
+
+async def test_store_after_a_miss_reuses_the_query_embedding(cache):
+    assert await cache.lookup("efectos de la manzanilla") is None
+    await cache.store("efectos de la manzanilla", _answer("calmante"), ["medical"])
+
+    assert len(cache._embedder.calls) == 1
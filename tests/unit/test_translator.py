@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.utils.translator import TranslationService
+from src.utils.translation_backends import GoogleBackend, PhraseTableBackend, TranslationBackend
+
+
+class FakeTranslator:
+    """Traductor remoto simulado: pone en mayúsculas y cuenta las llamadas."""
+
+    def __init__(self, keep_separator=True):
+        self.calls = []
+        self.keep_separator = keep_separator
+
+    def translate(self, text):
+        self.calls.append(text)
+        if not self.keep_separator:
+            text = text.replace("|||", "")
+        return text.upper()
+
+
+@pytest.fixture
+def backend():
+    google = GoogleBackend()
+    google.translators = {('en', 'es'): FakeTranslator(), ('es', 'en'): FakeTranslator()}
+    return google
+
+@pytest.fixture
+def translator(backend):
+    service = TranslationService(backend=backend)
+    service.cache.clear()
+    yield service
+    service.cache.clear()
+
+def test_repeated_translations_hit_the_cache(translator, backend):
+    assert translator.to_english("hola mundo") == "HOLA MUNDO"
+    assert TranslationService(backend=backend).to_english("hola mundo") == "HOLA MUNDO"
+    assert len(backend.translators[('es', 'en')].calls) == 1
+
+def test_nested_structures_are_translated_in_one_call(translator, backend):
+    result = translator.to_spanish([
+        {"title": "green tea", "abstract": "antioxidant effects"},
+        {"title": "chamomile", "abstract": "green tea", "year": 2020}
+    ])
+
+    assert result == [
+        {"title": "GREEN TEA", "abstract": "ANTIOXIDANT EFFECTS"},
+        {"title": "CHAMOMILE", "abstract": "GREEN TEA", "year": 2020}
+    ]
+    assert len(backend.translators[('en', 'es')].calls) == 1
+
+def test_batch_falls_back_when_separator_is_lost(translator, backend):
+    fake = FakeTranslator(keep_separator=False)
+    backend.translators[('en', 'es')] = fake
+
+    assert translator.translate_batch(["leaf", "root"], 'es') == ["LEAF", "ROOT"]
+    assert fake.calls[1:] == ["leaf", "root"]
+
+def test_failed_translation_returns_original_and_is_not_cached(translator, backend):
+    class BrokenTranslator:
+        def translate(self, text):
+            raise RuntimeError("sin conexión")
+
+    backend.translators[('en', 'es')] = BrokenTranslator()
+    assert translator.to_spanish("leaf") == "leaf"
+    assert ('google', 'es', "leaf") not in translator.cache
+
+def test_phrase_table_backend_prefers_longest_phrase(tmp_path):
+    table = tmp_path / "phrase_table.tsv"
+    table.write_text(
+        "té verde\tgreen tea\n"
+        "té\ttea\n"
+        "efectos\teffects\n"
+        "de\tof\n"
+        "del\tof the\n",
+        encoding="utf-8"
+    )
+    backend = PhraseTableBackend(str(table))
+
+    assert backend.translate_batch(["Efectos del té verde."], 'es', 'en') == ["Effects of the green tea."]
+    assert backend.translate_batch(["green tea effects"], 'en', 'es') == ["té verde efectos"]
+
+def test_text_already_in_target_language_is_not_sent(translator, backend):
+    assert translator.to_spanish("¿Qué efectos tiene la manzanilla?") == "¿Qué efectos tiene la manzanilla?"
+    assert translator.to_english("The effects of chamomile on sleep") == "The effects of chamomile on sleep"
+    assert backend.translators[('en', 'es')].calls == []
+    assert backend.translators[('es', 'en')].calls == []
+
+def test_identifiers_urls_and_binomials_are_protected(translator, backend):
+    text = "Camellia sinensis reduces stress (PMID 12345, see https://pubmed.ncbi.nlm.nih.gov/12345)."
+
+    assert translator.to_spanish(text) == (
+        "Camellia sinensis REDUCES STRESS (PMID 12345, SEE https://pubmed.ncbi.nlm.nih.gov/12345)."
+    )
+    sent = backend.translators[('en', 'es')].calls[0]
+    assert "Camellia" not in sent and "https" not in sent
+
+def test_untranslatable_text_skips_the_backend(translator, backend):
+    assert translator.to_spanish(["Matricaria chamomilla", "P12345", "3.5"]) == [
+        "Matricaria chamomilla", "P12345", "3.5"
+    ]
+    assert backend.translators[('en', 'es')].calls == []
+
+class SlowBackend(TranslationBackend):
+    """Backend que bloquea su hilo, como una pasada de un modelo local."""
+
+    name = "slow"
+
+    def __init__(self):
+        self.threads = set()
+
+    def translate_batch(self, texts, source, target):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        return [text.upper() for text in texts]
+
+async def test_async_translation_does_not_block_the_event_loop():
+    backend = SlowBackend()
+    translator = TranslationService(backend=backend)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    result = await translator.to_spanish_async(["green leaf", "the root"])
+    task.cancel()
+
+    assert result == ["GREEN LEAF", "THE ROOT"]
+    assert ticks >= 5
+    assert all(name.startswith("translation") for name in backend.threads)
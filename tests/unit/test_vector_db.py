@@ -0,0 +1,394 @@
+import hashlib
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+
+from src.orchestrator.query_processor import QueryProcessor
+from src.rag.retriever.document_retriever import DocumentRetriever, reciprocal_rank_fusion
+from src.rag.vector_store.index_benchmark import benchmark_compact, benchmark_index, exact_search, recall_at_k
+from src.rag.vector_store.vector_db import IndexConfig, VectorDB
+
+class HashEmbedding(chromadb.EmbeddingFunction):
+    """Embeddings deterministas a partir del hash del texto: sin modelos."""
+
+    def __init__(self, dimension: int = 16):
+        self.dimension = dimension
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        return [
+            np.random.default_rng(int(hashlib.md5(text.encode()).hexdigest()[:8], 16))
+            .normal(size=self.dimension).astype(np.float32)
+            for text in input
+        ]
+
+    @staticmethod
+    def name() -> str:
+        return "hash-test"
+
+    def get_config(self):
+        return {"dimension": self.dimension}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding(config["dimension"])
+
+@pytest.fixture
+def vector_db(tmp_path):
+    return VectorDB(
+        str(tmp_path / "chroma"),
+        index_configs={"medical": IndexConfig(space="cosine", search_ef=40, m=8)},
+        embedding_function=HashEmbedding()
+    )
+
+async def add_documents(vector_db, count, domain="medical"):
+    texts = [f"documento {i}" for i in range(count)]
+    await vector_db.add_texts(
+        texts,
+        [{"n": i} for i in range(count)],
+        domain,
+        ids=[f"doc_{i}" for i in range(count)]
+    )
+    return texts
+
+def test_collections_use_configured_index(vector_db):
+    hnsw = vector_db.collections["medical"].configuration["hnsw"]
+
+    assert (hnsw["space"], hnsw["ef_search"], hnsw["max_neighbors"]) == ("cosine", 40, 8)
+    assert vector_db.get_index_config("botanical") == IndexConfig.for_domain("botanical")
+
+def test_search_ef_is_applied_to_existing_collections(vector_db, tmp_path):
+    reopened = VectorDB(
+        str(tmp_path / "chroma"),
+        index_configs={"medical": IndexConfig(space="cosine", search_ef=120, m=8)},
+        embedding_function=HashEmbedding()
+    )
+
+    assert reopened.get_index_config("medical").search_ef == 120
+    assert reopened.collections["medical"].configuration["hnsw"]["ef_search"] == 120
+
+def test_overrides_from_settings(monkeypatch):
+    from src.utils.config import settings
+    monkeypatch.setattr(settings, "VECTOR_INDEX_OVERRIDES", {"chemical": {"search_ef": 300, "m": 32}})
+
+    config = IndexConfig.for_domain("chemical")
+
+    assert (config.search_ef, config.m) == (300, 32)
+    assert config.space == settings.VECTOR_INDEX_SPACE
+
+async def test_rebuild_index_keeps_documents_and_changes_parameters(vector_db):
+    await add_documents(vector_db, 30)
+    await vector_db.delete_texts(["doc_0", "doc_1"], "medical")
+
+    stats = await vector_db.rebuild_index("medical", IndexConfig(space="l2", m=12, search_ef=64))
+
+    collection = vector_db.collections["medical"]
+    assert stats["count"] == 28
+    assert collection.name == "medical_collection"
+    assert collection.configuration["hnsw"]["space"] == "l2"
+    assert collection.configuration["hnsw"]["max_neighbors"] == 12
+    stored = collection.get(ids=["doc_5"], include=["documents", "metadatas"])
+    assert stored["documents"] == ["documento 5"] and stored["metadatas"] == [{"n": 5}]
+    assert [c.name for c in vector_db.client.list_collections()].count("medical_collection") == 1
+
+    results = await vector_db.search("documento 7", "medical", n_results=1)
+    assert results["ids"] == ["doc_7"]
+
+def reopen(tmp_path):
+    return VectorDB(
+        str(tmp_path / "chroma"),
+        index_configs={"medical": IndexConfig(space="cosine", search_ef=40, m=8)},
+        embedding_function=HashEmbedding()
+    )
+
+async def interrupted_rebuild(vector_db, copy_finished):
+    """Deja medical_collection como quedaría si el proceso muriera a mitad de rebuild."""
+    await add_documents(vector_db, 10)
+    source = vector_db.collections["medical"]
+    page = next(vector_db.iter_collection("medical"))
+    staging = vector_db.client.create_collection(
+        "medical_collection_rebuild",
+        configuration=IndexConfig(space="l2").to_chroma(),
+        embedding_function=vector_db.embedding_function
+    )
+    copied = len(page["ids"]) if copy_finished else 3
+    staging.add(ids=page["ids"][:copied], embeddings=page["embeddings"][:copied])
+    if copy_finished:
+        source.modify(name="medical_collection_previous")
+
+async def test_rebuild_interrupted_during_copy_is_rolled_back(vector_db, tmp_path):
+    await interrupted_rebuild(vector_db, copy_finished=False)
+
+    reopened = reopen(tmp_path)
+
+    names = [c.name for c in reopened.client.list_collections()]
+    assert "medical_collection_rebuild" not in names
+    assert reopened.collections["medical"].count() == 10
+    assert reopened.get_index_config("medical").space == "cosine"
+
+async def test_rebuild_interrupted_during_swap_is_completed(vector_db, tmp_path):
+    await interrupted_rebuild(vector_db, copy_finished=True)
+
+    reopened = reopen(tmp_path)
+
+    names = [c.name for c in reopened.client.list_collections()]
+    assert not {"medical_collection_rebuild", "medical_collection_previous"} & set(names)
+    assert reopened.collections["medical"].name == "medical_collection"
+    assert reopened.collections["medical"].count() == 10
+    assert reopened.get_index_config("medical").space == "l2"
+
+async def test_rebuild_interrupted_after_staging_was_lost_restores_original(vector_db, tmp_path):
+    await add_documents(vector_db, 10)
+    vector_db.collections["medical"].modify(name="medical_collection_previous")
+
+    reopened = reopen(tmp_path)
+
+    assert reopened.collections["medical"].count() == 10
+    assert "medical_collection_previous" not in [c.name for c in reopened.client.list_collections()]
+
+async def test_exact_search_matches_brute_force(vector_db):
+    texts = await add_documents(vector_db, 50)
+    vectors = np.stack(HashEmbedding()(texts))
+    queries = vectors[:3] + 0.01
+
+    neighbours = exact_search(vector_db, "medical", queries, k=5, batch_size=7)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T, axis=1)[:, :5]
+    assert neighbours == [[f"doc_{i}" for i in row] for row in expected]
+
+def test_recall_at_k():
+    assert recall_at_k([["a", "b"], ["c", "x"]], [["a", "b"], ["c", "d"]]) == 0.75
+
+async def test_benchmark_reports_recall_and_restores_search_ef(vector_db):
+    await add_documents(vector_db, 200)
+
+    report = benchmark_index(vector_db, "medical", search_efs=(10, 100), k=5, n_queries=20)
+
+    assert report["count"] == 200 and report["queries"] == 20
+    assert [row["search_ef"] for row in report["results"]] == [10, 100]
+    assert report["results"][-1]["recall"] >= 0.95
+    assert all(row["latency_ms_p50"] >= 0 for row in report["results"])
+    assert vector_db.get_index_config("medical").search_ef == 40
+
+async def test_multi_domain_search_embeds_query_once(vector_db):
+    for domain in ("medical", "botanical", "chemical"):
+        await add_documents(vector_db, 10, domain)
+    vector_db.embedding_function.calls = 0
+
+    results = await vector_db.search_multi_domain(
+        "documento 3",
+        domains=["medical", "botanical", "chemical"],
+        n_results=2
+    )
+
+    assert vector_db.embedding_function.calls == 1
+    for domain in ("medical", "botanical", "chemical"):
+        single = await vector_db.search("documento 3", domain, n_results=2)
+        assert results[domain]["ids"] == single["ids"]
+        assert results[domain]["ids"][0] == "doc_3"
+
+async def test_multi_domain_search_applies_quotas_and_isolates_failures(vector_db, monkeypatch):
+    for domain in ("medical", "botanical", "physical"):
+        await add_documents(vector_db, 10, domain)
+
+    def broken_query(**kwargs):
+        raise RuntimeError("índice no disponible")
+    monkeypatch.setattr(vector_db.collections["physical"], "query", broken_query)
+
+    results = await vector_db.search_multi_domain(
+        "documento 1",
+        n_results={"medical": 4, "botanical": 1, "physical": 3}
+    )
+
+    assert list(results) == ["medical", "botanical", "physical"]
+    assert len(results["medical"]["ids"]) == 4
+    assert results["botanical"]["ids"] == ["doc_1"]
+    assert results["physical"]["ids"] == []
+
+async def test_multi_domain_search_rejects_unknown_domain(vector_db):
+    with pytest.raises(ValueError):
+        await vector_db.search_multi_domain("documento", domains=["medical", "astrology"])
+
+async def test_query_processor_retrieves_all_domains_in_one_search(vector_db):
+    await add_documents(vector_db, 5, "botanical")
+    await add_documents(vector_db, 5, "chemical")
+    vector_db.embedding_function.calls = 0
+    processor = QueryProcessor(DocumentRetriever(vector_db))
+
+    data = await processor.process_query("documento 2 planta compuesto")
+
+    assert data["domains"] == ["botanical", "chemical"]
+    assert vector_db.embedding_function.calls == 1
+    assert set(data["relevant_documents"]) == {"botanical", "chemical"}
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["c", "a", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+class UnitHashEmbedding(HashEmbedding):
+    def __call__(self, input):
+        return [vector / np.linalg.norm(vector) for vector in super().__call__(input)]
+
+    @staticmethod
+    def name() -> str:
+        return "unit-hash-test"
+
+    @staticmethod
+    def build_from_config(config):
+        return UnitHashEmbedding(config["dimension"])
+
+@pytest.mark.parametrize("space", ["cosine", "ip", "l2"])
+async def test_similarity_follows_the_index_space(tmp_path, space):
+    vector_db = VectorDB(
+        str(tmp_path / "chroma"),
+        index_configs={"medical": IndexConfig(space=space)},
+        embedding_function=UnitHashEmbedding()
+    )
+    texts = await add_documents(vector_db, 10)
+    vectors = dict(zip([f"doc_{i}" for i in range(10)], UnitHashEmbedding()(texts)))
+
+    documents = await DocumentRetriever(vector_db).retrieve_documents(
+        "documento 3", "medical", n_results=10, similarity_threshold=-1.0, mode="vector", rerank=False
+    )
+
+    assert documents[0]["id"] == "doc_3"
+    for document in documents:
+        expected = float(vectors["doc_3"] @ vectors[document["id"]])
+        assert document["similarity"] == pytest.approx(expected, abs=1e-4)
+
+async def add_chemistry(vector_db):
+    await vector_db.add_texts(
+        [
+            "La cafeína (CAS 58-08-2) es un alcaloide estimulante.",
+            "El ácido acetilsalicílico reduce la fiebre.",
+            "La teobromina está presente en el cacao."
+        ],
+        [{"source": "pubchem"}, {"source": "pubmed"}, {"source": "pubchem"}],
+        "chemical",
+        ids=["caffeine", "aspirin", "theobromine"]
+    )
+
+async def test_hybrid_retrieval_finds_exact_identifiers(vector_db):
+    await add_chemistry(vector_db)
+    retriever = DocumentRetriever(vector_db)
+
+    vector_only = await retriever.retrieve_documents("58-08-2", "chemical", n_results=1, mode="vector")
+    hybrid = await retriever.retrieve_documents("58-08-2", "chemical", n_results=2, mode="hybrid")
+
+    assert "caffeine" not in [document["id"] for document in vector_only]
+    assert hybrid[0]["id"] == "caffeine"
+    assert hybrid[0]["metadata"] == {"source": "pubchem"}
+    assert "lexical" in hybrid[0]["sources"] and hybrid[0]["bm25"] > 0
+    assert [document["rank"] for document in hybrid] == list(range(1, len(hybrid) + 1))
+
+async def test_lexical_mode_in_multi_domain_retrieval(vector_db):
+    await add_chemistry(vector_db)
+    await add_documents(vector_db, 3, "medical")
+    vector_db.embedding_function.calls = 0
+    retriever = DocumentRetriever(vector_db)
+
+    results = await retriever.retrieve_multi_domain(
+        "teobromina cacao",
+        domains=["chemical", "medical"],
+        mode="lexical"
+    )
+
+    assert vector_db.embedding_function.calls == 0
+    assert [document["id"] for document in results["chemical"]] == ["theobromine"]
+    assert results["medical"] == []
+
+async def test_invalid_retrieval_mode(vector_db):
+    with pytest.raises(ValueError):
+        await DocumentRetriever(vector_db).retrieve_multi_domain("cafeína", mode="sparse")
+
+async def test_lexical_index_follows_ingestion_and_can_be_rebuilt(vector_db):
+    await add_chemistry(vector_db)
+    await vector_db.delete_texts(["aspirin"], "chemical")
+
+    assert (await vector_db.search_lexical("acetilsalicílico", ["chemical"]))["chemical"] == []
+
+    vector_db.lexical_index.clear("chemical")
+    assert await vector_db.rebuild_lexical_index("chemical") == 2
+    hits = (await vector_db.search_lexical("cafeína", ["chemical"]))["chemical"]
+    assert [hit["id"] for hit in hits] == ["caffeine"]
+
+class ReverseReranker:
+    """Reranker de prueba: invierte el orden de cada dominio."""
+
+    def __init__(self):
+        self.received = {}
+
+    async def rerank_groups(self, query, groups, top_k):
+        self.received = {domain: len(documents) for domain, documents in groups.items()}
+        return {domain: documents[::-1][:top_k[domain]] for domain, documents in groups.items()}
+
+async def test_reranking_widens_first_stage_and_cuts_to_quota(vector_db, monkeypatch):
+    from src.utils.config import settings
+    monkeypatch.setattr(settings, "RERANKER_CANDIDATES", 6)
+    await add_documents(vector_db, 10, "medical")
+    reranker = ReverseReranker()
+    retriever = DocumentRetriever(vector_db, reranker=reranker)
+
+    results = await retriever.retrieve_multi_domain(
+        "documento 4",
+        domains=["medical"],
+        n_results=2,
+        mode="lexical",
+        rerank=True
+    )
+
+    assert reranker.received == {"medical": 6}
+    assert len(results["medical"]) == 2
+    assert results["medical"][0]["id"] != "doc_4"
+
+@pytest.fixture
+def compact_db(tmp_path):
+    return VectorDB(
+        str(tmp_path / "chroma"),
+        index_configs={"medical": IndexConfig(space="cosine")},
+        embedding_function=HashEmbedding(),
+        compact=True
+    )
+
+async def test_compact_mode_stores_vectors_outside_chroma(compact_db):
+    await add_documents(compact_db, 20)
+    await add_chemistry(compact_db)
+
+    assert compact_db.collections["medical"].count() == 0
+    results = await compact_db.search("documento 7", "medical", n_results=2)
+    assert results["ids"][0] == "doc_7" and results["metadatas"][0] == {"n": 7}
+
+    multi = await compact_db.search_multi_domain("documento 3", domains=["medical", "chemical"], n_results=1)
+    assert multi["medical"]["ids"] == ["doc_3"]
+
+    hybrid = await DocumentRetriever(compact_db).retrieve_documents("58-08-2", "chemical", n_results=2)
+    assert hybrid[0]["id"] == "caffeine" and hybrid[0]["metadata"] == {"source": "pubchem"}
+
+    await compact_db.delete_texts(["doc_7"], "medical")
+    stats = await compact_db.get_collection_stats("medical")
+    assert stats["count"] == 19 and stats["compact"]["rows"] == 20
+    assert (await compact_db.rebuild_index("medical"))["count"] == 19
+
+async def test_build_compact_store_from_existing_collection(vector_db, tmp_path):
+    await add_documents(vector_db, 30)
+
+    usage = await vector_db.build_compact_store("medical")
+
+    assert usage["vectors"] == 30
+    reopened = VectorDB(str(tmp_path / "chroma"), embedding_function=HashEmbedding(), compact=True)
+    expected = await vector_db.search("documento 4", "medical", n_results=3)
+    assert (await reopened.search("documento 4", "medical", n_results=3))["ids"] == expected["ids"]
+
+async def test_benchmark_compact_reports_memory_and_recall(compact_db):
+    await add_documents(compact_db, 300)
+
+    report = benchmark_compact(compact_db, "medical", candidates=(0, 50), k=5, n_queries=20)
+
+    assert report["count"] == 300 and report["memory"]["vectors"] == 300
+    assert [row["rescore_candidates"] for row in report["results"]] == [0, 50]
+    assert report["results"][-1]["recall"] == 1.0